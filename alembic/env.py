@@ -5,6 +5,7 @@ from sqlalchemy import pool
 
 from alembic import context
 import os
+import re
 import sys
 
 # Add the app directory to the path
@@ -24,6 +25,18 @@ if config.config_file_name is not None:
 from app.models import Base
 target_metadata = Base.metadata
 
+# FTS5 search indexes and their shadow tables are created by raw SQL in
+# migration f51d8e3a6b70 and are not in the metadata
+SEARCH_INDEX_TABLE = re.compile(r"^\w+_fts(_(data|idx|docsize|config|content))?$")
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep autogenerate from proposing to drop the search index tables."""
+    if type_ == "table" and reflected and compare_to is None and SEARCH_INDEX_TABLE.match(name):
+        return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -47,6 +60,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -76,7 +90,8 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            include_object=include_object
         )
 
         with context.begin_transaction():
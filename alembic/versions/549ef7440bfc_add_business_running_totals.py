@@ -0,0 +1,51 @@
+"""add business running totals
+
+Revision ID: 549ef7440bfc
+Revises: b6d1a683c308
+Create Date: 2026-10-16 20:55:12.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '549ef7440bfc'
+down_revision: Union[str, Sequence[str], None] = 'b6d1a683c308'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('businesses') as batch_op:
+        batch_op.add_column(sa.Column('vibe_score_sum', sa.Float(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('scored_reviews', sa.Integer(), server_default='0', nullable=False))
+
+    # Seed the running totals from the existing reviews
+    op.execute(
+        """
+        UPDATE businesses SET
+            vibe_score_sum = COALESCE((
+                SELECT SUM(reviews.vibe_score) FROM reviews
+                WHERE reviews.business_id = businesses.id
+            ), 0),
+            scored_reviews = (
+                SELECT COUNT(reviews.vibe_score) FROM reviews
+                WHERE reviews.business_id = businesses.id
+            ),
+            total_reviews = (
+                SELECT COUNT(*) FROM reviews
+                WHERE reviews.business_id = businesses.id
+            )
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('businesses') as batch_op:
+        batch_op.drop_column('scored_reviews')
+        batch_op.drop_column('vibe_score_sum')
@@ -0,0 +1,34 @@
+"""add business listing indexes
+
+Revision ID: 55337ee63575
+Revises: 549ef7440bfc
+Create Date: 2026-10-16 21:12:40.903117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '55337ee63575'
+down_revision: Union[str, Sequence[str], None] = '549ef7440bfc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_businesses_category_score_id', 'businesses', ['category', 'aggregated_vibe_score', 'id'], unique=False)
+    op.create_index('ix_businesses_score_id', 'businesses', ['aggregated_vibe_score', 'id'], unique=False)
+    op.create_index('ix_businesses_total_reviews_id', 'businesses', ['total_reviews', 'id'], unique=False)
+    op.create_index('ix_businesses_created_at_id', 'businesses', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_businesses_created_at_id', table_name='businesses')
+    op.drop_index('ix_businesses_total_reviews_id', table_name='businesses')
+    op.drop_index('ix_businesses_score_id', table_name='businesses')
+    op.drop_index('ix_businesses_category_score_id', table_name='businesses')
@@ -0,0 +1,28 @@
+"""add reviews business created_at index
+
+Revision ID: 71ea7ed86f74
+Revises: 55337ee63575
+Create Date: 2026-10-16 21:31:07.226514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '71ea7ed86f74'
+down_revision: Union[str, Sequence[str], None] = '55337ee63575'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_reviews_business_created_at_id', 'reviews', ['business_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reviews_business_created_at_id', table_name='reviews')
@@ -0,0 +1,60 @@
+"""add business daily rollups
+
+Revision ID: c3e91a0d5f27
+Revises: 0b4dcc3765a5
+Create Date: 2026-10-16 22:04:31.582907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e91a0d5f27'
+down_revision: Union[str, Sequence[str], None] = '0b4dcc3765a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('business_daily_rollups',
+    sa.Column('business_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('review_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('scored_reviews', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('vibe_score_sum', sa.Float(), server_default='0', nullable=False),
+    sa.Column('positive_reviews', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('neutral_reviews', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('negative_reviews', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['business_id'], ['businesses.id'], ),
+    sa.PrimaryKeyConstraint('business_id', 'day')
+    )
+
+    # Seed the rollups from the existing reviews
+    op.execute(
+        """
+        INSERT INTO business_daily_rollups (
+            business_id, day, review_count, scored_reviews, vibe_score_sum,
+            positive_reviews, neutral_reviews, negative_reviews
+        )
+        SELECT
+            business_id,
+            DATE(created_at),
+            COUNT(*),
+            COUNT(vibe_score),
+            COALESCE(SUM(vibe_score), 0),
+            SUM(CASE WHEN sentiment = 'positive' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN sentiment = 'neutral' THEN 1 ELSE 0 END),
+            SUM(CASE WHEN sentiment = 'negative' THEN 1 ELSE 0 END)
+        FROM reviews
+        GROUP BY business_id, DATE(created_at)
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('business_daily_rollups')
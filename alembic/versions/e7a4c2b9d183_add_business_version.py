@@ -0,0 +1,30 @@
+"""add business version
+
+Revision ID: e7a4c2b9d183
+Revises: c3e91a0d5f27
+Create Date: 2026-10-16 22:41:18.093562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a4c2b9d183'
+down_revision: Union[str, Sequence[str], None] = 'c3e91a0d5f27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('businesses') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('businesses') as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,102 @@
+"""add fts5 search indexes
+
+Revision ID: f51d8e3a6b70
+Revises: e7a4c2b9d183
+Create Date: 2026-10-16 23:02:47.661204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f51d8e3a6b70'
+down_revision: Union[str, Sequence[str], None] = 'e7a4c2b9d183'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # FTS5 is SQLite only; other databases have no search indexes
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    # External-content indexes: the text stays in reviews/businesses only
+    op.execute(
+        "CREATE VIRTUAL TABLE reviews_fts USING fts5("
+        "content, content='reviews', content_rowid='id', tokenize='porter unicode61')"
+    )
+    op.execute(
+        "CREATE VIRTUAL TABLE businesses_fts USING fts5("
+        "name, category, content='businesses', content_rowid='id', tokenize='porter unicode61')"
+    )
+
+    # Kept in sync by triggers; score and aggregate updates do not touch
+    # the indexed columns and leave the indexes alone
+    op.execute(
+        """
+        CREATE TRIGGER reviews_fts_insert AFTER INSERT ON reviews BEGIN
+            INSERT INTO reviews_fts(rowid, content) VALUES (new.id, new.content);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER reviews_fts_delete AFTER DELETE ON reviews BEGIN
+            INSERT INTO reviews_fts(reviews_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER reviews_fts_update AFTER UPDATE OF content ON reviews BEGIN
+            INSERT INTO reviews_fts(reviews_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO reviews_fts(rowid, content) VALUES (new.id, new.content);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER businesses_fts_insert AFTER INSERT ON businesses BEGIN
+            INSERT INTO businesses_fts(rowid, name, category) VALUES (new.id, new.name, new.category);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER businesses_fts_delete AFTER DELETE ON businesses BEGIN
+            INSERT INTO businesses_fts(businesses_fts, rowid, name, category)
+            VALUES ('delete', old.id, old.name, old.category);
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER businesses_fts_update AFTER UPDATE OF name, category ON businesses BEGIN
+            INSERT INTO businesses_fts(businesses_fts, rowid, name, category)
+            VALUES ('delete', old.id, old.name, old.category);
+            INSERT INTO businesses_fts(rowid, name, category) VALUES (new.id, new.name, new.category);
+        END
+        """
+    )
+
+    # Index the existing rows
+    op.execute("INSERT INTO reviews_fts(reviews_fts) VALUES ('rebuild')")
+    op.execute("INSERT INTO businesses_fts(businesses_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for trigger in (
+        'businesses_fts_update', 'businesses_fts_delete', 'businesses_fts_insert',
+        'reviews_fts_update', 'reviews_fts_delete', 'reviews_fts_insert',
+    ):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS businesses_fts")
+    op.execute("DROP TABLE IF EXISTS reviews_fts")
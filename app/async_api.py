@@ -0,0 +1,152 @@
+"""
+Async versions of the business, review and auth routes.
+
+Served instead of the sync routes in app.main when DATABASE_ASYNC is set.
+The route logic is shared with the sync routes (see app.queries) and runs
+through AsyncSession.run_sync: each statement's IO is awaited on the event
+loop instead of holding a threadpool thread for the whole request, so
+concurrency is bounded by the database connection pool.
+"""
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db, get_async_read_db
+from app.models import User
+from app.schemas import (
+    UserCreate, UserLogin, UserResponse, LoginResponse,
+    BusinessResponse, BusinessSort, VibeSummaryResponse, VibeTrendResponse,
+    ReviewCreate, ReviewResponse, ReviewSentiment, ReviewSearchHit, BusinessSearchHit, MessageResponse
+)
+from app.auth import get_current_user_async, get_current_identity_async, revoke_user_tokens_async, TokenIdentity
+from app.queries import (
+    register_user, login_user, business_page, business_detail, business_vibe, business_vibe_trend,
+    require_business, initial_review_scores_async, store_review, business_reviews_page,
+    review_search_results, business_search_results
+)
+
+router = APIRouter()
+
+
+# User registration endpoint
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def register_new_user(user_info: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(register_user, user_info)
+
+
+# User login endpoint
+@router.post("/login", response_model=LoginResponse)
+async def authenticate_user(login_info: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(login_user, login_info)
+
+
+# Revoke all tokens of the current user endpoint
+@router.post("/tokens/revoke", response_model=MessageResponse)
+async def revoke_tokens(
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    await revoke_user_tokens_async(current_user, db)
+    return {"message": "All access tokens have been revoked"}
+
+
+# List businesses endpoint
+@router.get("/businesses", response_model=List[BusinessResponse])
+async def list_businesses(
+    request: Request,
+    category: Optional[str] = None,
+    min_score: Optional[float] = Query(None, ge=0, le=100),
+    sort: BusinessSort = BusinessSort.id,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await db.run_sync(business_page, request, category, min_score, sort, limit, cursor)
+
+
+# Get single business endpoint
+@router.get("/businesses/{business_id}", response_model=BusinessResponse)
+async def retrieve_business(business_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    return await db.run_sync(business_detail, request, business_id)
+
+
+# Trailing-window and time-decayed vibe score endpoint
+@router.get("/businesses/{business_id}/vibe", response_model=VibeSummaryResponse)
+async def retrieve_business_vibe(
+    business_id: int,
+    window_days: int = Query(30, ge=1, le=365),
+    half_life_days: float = Query(30, gt=0, le=365),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await db.run_sync(business_vibe, business_id, window_days, half_life_days)
+
+
+# Vibe score trend endpoint (daily or wider buckets, oldest first)
+@router.get("/businesses/{business_id}/vibe/trend", response_model=VibeTrendResponse)
+async def retrieve_business_vibe_trend(
+    business_id: int,
+    days: int = Query(90, ge=1, le=730),
+    bucket_days: int = Query(1, ge=1, le=90),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await db.run_sync(business_vibe_trend, business_id, days, bucket_days)
+
+
+# Create review endpoint
+@router.post(
+    "/businesses/{business_id}/reviews",
+    response_model=ReviewResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"model": ReviewResponse}}
+)
+async def submit_review(
+    business_id: int,
+    review_info: ReviewCreate,
+    response: Response,
+    current_user: TokenIdentity = Depends(get_current_identity_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    await db.run_sync(require_business, business_id)
+    sentiment_analysis = await initial_review_scores_async(review_info.content)
+    return await db.run_sync(store_review, response, business_id, review_info, sentiment_analysis, current_user.id)
+
+
+# Get reviews for business endpoint (newest first)
+@router.get("/businesses/{business_id}/reviews", response_model=List[ReviewResponse])
+async def fetch_business_reviews(
+    business_id: int,
+    request: Request,
+    sentiment: Optional[ReviewSentiment] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await db.run_sync(business_reviews_page, request, business_id, sentiment, limit, cursor)
+
+
+# Full-text review search (best match first)
+@router.get("/search/reviews", response_model=List[ReviewSearchHit])
+async def search_reviews(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    business_id: Optional[int] = None,
+    sentiment: Optional[ReviewSentiment] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await db.run_sync(review_search_results, response, q, business_id, sentiment, limit, cursor)
+
+
+# Full-text business search over names and categories
+@router.get("/search/businesses", response_model=List[BusinessSearchHit])
+async def search_businesses(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await db.run_sync(business_search_results, response, q, category, limit, cursor)
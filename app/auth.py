@@ -1,12 +1,18 @@
 import hashlib
 import secrets
+from dataclasses import dataclass
+from typing import Optional
 from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.security import APIKeyHeader, HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 from . import models
-from .database import get_db
+from .cache import LRUCache
+from .database import get_db, get_async_db
+from .metrics import register_cache_stats
 import os
 from dotenv import load_dotenv
 load_dotenv()
@@ -18,6 +24,18 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")  # ← Added default
 ACCESS_TOKEN_EXPIRE_HOURS = int(os.getenv("ACCESS_TOKEN_EXPIRE_HOURS", "24"))
+# "database" loads the user on every request; "stateless" trusts the verified
+# token and serves users from a short-lived in-process cache
+AUTH_MODE = os.getenv("AUTH_MODE", "database")
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+# Verified token claims kept to skip re-checking signatures (0 disables)
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+# Shared secret of the maintenance (admin) endpoints; empty disables them
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
+# Secret of Prometheus scrapers (X-Metrics-Key header); empty leaves /metrics
+# to the admin key only
+METRICS_API_KEY = os.getenv("METRICS_API_KEY", "")
 # Validate SECRET_KEY exists
 if not SECRET_KEY:
     raise ValueError("SECRET_KEY must be set in .env file")
@@ -25,6 +43,12 @@ if not SECRET_KEY:
 # HTTP Bearer token security
 security = HTTPBearer()
 
+# Admin key header of the maintenance endpoints
+admin_key_header = APIKeyHeader(name="X-Admin-Key", auto_error=False)
+
+# Key header of metrics scrapers
+metrics_key_header = APIKeyHeader(name="X-Metrics-Key", auto_error=False)
+
 # ============================================
 # JWT TOKEN
 # ============================================
@@ -54,10 +78,17 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     return encoded_jwt
 
 
+# SHA-256 digest of a token -> its verified claims, kept until the token expires
+_token_cache = LRUCache(AUTH_TOKEN_CACHE_SIZE)
+
+
 def decode_access_token(token: str) -> dict:
     """
     Decode and validate a JWT token
     
+    Verified claims are cached by token digest until the token's exp, so a
+    client reusing its token skips signature verification and parsing.
+    
     Args:
         token: JWT token string
         
@@ -67,21 +98,91 @@ def decode_access_token(token: str) -> dict:
     Raises:
         HTTPException: If token is invalid or expired
     """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = _token_cache.get(digest)
+    if payload is not None:
+        return dict(payload)
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    # Tokens without an expiry are not cached
+    expires_at = payload.get("exp")
+    if isinstance(expires_at, (int, float)):
+        _token_cache.set(digest, payload, expires_at=expires_at)
+    return dict(payload)
 
 
 # ============================================
 # Authentication Dependency
 # ============================================
 
+@dataclass(frozen=True)
+class TokenIdentity:
+    """Identity of the caller, as asserted by a verified access token."""
+    id: int
+    username: str
+
+
+# user_id -> column snapshot of the User row, used in stateless mode
+_user_cache = LRUCache(AUTH_USER_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL)
+
+# Identity checks never need the password hash, so it is not cached
+_USER_COLUMNS = ("id", "username", "email", "created_at", "token_version")
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _token_claims(token: str) -> dict:
+    """
+    Decode a bearer token and check it names a user.
+    """
+    payload = decode_access_token(token)
+    
+    if payload.get("user_id") is None:
+        raise _credentials_exception()
+    return payload
+
+
+def _cached_user(user_id: int, db: Session) -> Optional[dict]:
+    """
+    Return a column snapshot of the user, loading it at most once per TTL.
+    """
+    snapshot = _user_cache.get(user_id)
+    if snapshot is None:
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        if user is None:
+            return None
+        snapshot = _snapshot(user)
+    return snapshot
+
+
+def _snapshot(user: models.User) -> dict:
+    """
+    Cache and return the column values of a freshly loaded user.
+    """
+    snapshot = {column: getattr(user, column) for column in _USER_COLUMNS}
+    _user_cache.set(user.id, snapshot)
+    return snapshot
+
+
+def _token_is_current(payload: dict, token_version: int) -> bool:
+    # Tokens issued before token_version existed carry no "ver" claim
+    return payload.get("ver", 0) == token_version
+
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security), 
     db: Session = Depends(get_db)
@@ -90,6 +191,10 @@ def get_current_user(
     Dependency to get the current authenticated user from JWT token.
     This protects endpoints that require authentication.
     
+    In stateless mode the user is rebuilt from the in-process cache and
+    attached to the session without querying the database; hashed_password
+    is not cached and is loaded only if accessed.
+    
     Usage in endpoint:
         current_user: models.User = Depends(get_current_user)
     
@@ -101,35 +206,215 @@ def get_current_user(
         User object from database
         
     Raises:
-        HTTPException: If token is invalid or user not found
+        HTTPException: If token is invalid, revoked or user not found
     """
-    token = credentials.credentials
-    
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    payload = _token_claims(credentials.credentials)
+    user_id = payload["user_id"]
     
-    try:
-        # Decode JWT token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("user_id")
+    if AUTH_MODE == "stateless":
+        snapshot = _cached_user(user_id, db)
+        if snapshot is None or not _token_is_current(payload, snapshot["token_version"]):
+            raise _credentials_exception()
         
-        if user_id is None:
-            raise credentials_exception
-            
-    except JWTError:
-        raise credentials_exception
+        user = models.User(**snapshot)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
     
     # Retrieve user from database
     user = db.query(models.User).filter(models.User.id == user_id).first()
     
-    if user is None:
-        raise credentials_exception
+    if user is None or not _token_is_current(payload, user.token_version):
+        raise _credentials_exception()
+        
+    return user
+
+
+def get_current_identity(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> TokenIdentity:
+    """
+    Dependency for endpoints that only need to know who the caller is.
+    
+    In stateless mode the identity comes from the verified token, and
+    revocation is checked against the cached token version, so the
+    database is consulted at most once per user per AUTH_USER_CACHE_TTL.
+    In database mode this is equivalent to get_current_user.
+    
+    Raises:
+        HTTPException: If token is invalid, revoked or user not found
+    """
+    if AUTH_MODE != "stateless":
+        user = get_current_user(credentials, db)
+        return TokenIdentity(id=user.id, username=user.username)
+    
+    payload = _token_claims(credentials.credentials)
+    snapshot = _cached_user(payload["user_id"], db)
+    if snapshot is None or not _token_is_current(payload, snapshot["token_version"]):
+        raise _credentials_exception()
+    
+    return TokenIdentity(id=snapshot["id"], username=snapshot["username"])
+
+
+def _revoke_statement(user_id: int):
+    return (
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(token_version=models.User.token_version + 1)
+    )
+
+
+def revoke_user_tokens(user: models.User, db: Session):
+    """
+    Invalidate every token issued to a user so far.
+    
+    The version is incremented in SQL: in stateless mode the user is a
+    cached snapshot whose token_version can be AUTH_USER_CACHE_TTL old.
+    Other workers notice within AUTH_USER_CACHE_TTL in stateless mode.
+    """
+    db.execute(_revoke_statement(user.id), execution_options={"synchronize_session": False})
+    db.commit()
+    _user_cache.pop(user.id)
+
+
+# ============================================
+# Async Authentication Dependency
+# ============================================
+
+async def _cached_user_async(user_id: int, db: AsyncSession) -> Optional[dict]:
+    """
+    Async counterpart of _cached_user.
+    """
+    snapshot = _user_cache.get(user_id)
+    if snapshot is None:
+        user = await db.get(models.User, user_id)
+        if user is None:
+            return None
+        snapshot = _snapshot(user)
+    return snapshot
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> models.User:
+    """
+    Async counterpart of get_current_user for routes on an AsyncSession.
+    
+    Raises:
+        HTTPException: If token is invalid, revoked or user not found
+    """
+    payload = _token_claims(credentials.credentials)
+    user_id = payload["user_id"]
+    
+    if AUTH_MODE == "stateless":
+        snapshot = await _cached_user_async(user_id, db)
+        if snapshot is None or not _token_is_current(payload, snapshot["token_version"]):
+            raise _credentials_exception()
         
+        user = models.User(**snapshot)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+    
+    user = await db.get(models.User, user_id)
+    
+    if user is None or not _token_is_current(payload, user.token_version):
+        raise _credentials_exception()
+    
     return user
 
+
+async def get_current_identity_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> TokenIdentity:
+    """
+    Async counterpart of get_current_identity.
+    
+    Raises:
+        HTTPException: If token is invalid, revoked or user not found
+    """
+    if AUTH_MODE != "stateless":
+        user = await get_current_user_async(credentials, db)
+        return TokenIdentity(id=user.id, username=user.username)
+    
+    payload = _token_claims(credentials.credentials)
+    snapshot = await _cached_user_async(payload["user_id"], db)
+    if snapshot is None or not _token_is_current(payload, snapshot["token_version"]):
+        raise _credentials_exception()
+    
+    return TokenIdentity(id=snapshot["id"], username=snapshot["username"])
+
+
+async def revoke_user_tokens_async(user: models.User, db: AsyncSession):
+    """
+    Async counterpart of revoke_user_tokens.
+    """
+    await db.execute(_revoke_statement(user.id), execution_options={"synchronize_session": False})
+    await db.commit()
+    _user_cache.pop(user.id)
+
+
+# ============================================
+# Admin Dependency
+# ============================================
+
+def is_admin_key(admin_key: Optional[str]) -> bool:
+    """
+    Whether admin_key matches ADMIN_API_KEY (always False when it is unset).
+    """
+    return bool(ADMIN_API_KEY and admin_key) and secrets.compare_digest(
+        admin_key.encode(), ADMIN_API_KEY.encode()
+    )
+
+
+def require_admin(admin_key: Optional[str] = Depends(admin_key_header)):
+    """
+    Dependency guarding maintenance endpoints with the ADMIN_API_KEY secret.
+    
+    Usage in endpoint:
+        dependencies=[Depends(require_admin)]
+    
+    Raises:
+        HTTPException: If admin access is disabled or the key does not match
+    """
+    if not is_admin_key(admin_key):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access denied"
+        )
+
+
+def require_metrics_access(
+    metrics_key: Optional[str] = Depends(metrics_key_header),
+    admin_key: Optional[str] = Depends(admin_key_header)
+):
+    """
+    Dependency guarding /metrics with METRICS_API_KEY or ADMIN_API_KEY.
+    
+    Raises:
+        HTTPException: If neither key matches (always when both are unset)
+    """
+    metrics_key_valid = bool(METRICS_API_KEY and metrics_key) and secrets.compare_digest(
+        metrics_key.encode(), METRICS_API_KEY.encode()
+    )
+    if not metrics_key_valid and not is_admin_key(admin_key):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Metrics access denied"
+        )
+
+
+def auth_cache_stats() -> dict:
+    """
+    Hit/miss counters of the verified-token and user caches.
+    """
+    return {"auth_tokens": _token_cache.stats(), "auth_users": _user_cache.stats()}
+
+
+register_cache_stats(auth_cache_stats)
+
+
 def hash_password(password: str) -> str:
     """
     Hash a password using SHA-256 with salt.
@@ -1,19 +1,137 @@
-from sqlalchemy import create_engine
+import time
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./app.db"
+from app.cache import LRUCache
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}  # needed for SQLite
+from app.config import (
+    DATABASE_URL, DATABASE_ASYNC, DATABASE_POOL_SIZE, DATABASE_MAX_OVERFLOW,
+    DATABASE_POOL_TIMEOUT, DATABASE_POOL_RECYCLE, DATABASE_POOL_PRE_PING,
+    SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE, READ_DATABASE_URL, READ_YOUR_WRITES_WINDOW
 )
 
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+
+
+def is_sqlite(database_url: str) -> bool:
+    return make_url(database_url).get_backend_name() == "sqlite"
+
+
+def read_only_sqlite_url(database_url: str) -> str:
+    """
+    Return a URL opening the same SQLite file with mode=ro.
+
+    In-memory databases cannot be shared between connections this way and
+    are returned unchanged.
+    """
+    url = make_url(database_url)
+    if not url.database or url.database == ":memory:" or url.query.get("uri"):
+        return database_url
+    url = url.set(database=f"file:{url.database}").update_query_dict({"mode": "ro", "uri": "true"})
+    return url.render_as_string(hide_password=False)
+
+
+def engine_options(database_url: str) -> dict:
+    """
+    Keyword arguments for create_engine / create_async_engine.
+
+    SQLite keeps SQLAlchemy's default pool for the file and gets its tuning
+    from pragmas on connect (see set_sqlite_pragmas). Server databases get
+    a sized connection pool that checks connections before handing them out.
+    """
+    if is_sqlite(database_url):
+        return {"connect_args": {"check_same_thread": False}}  # needed for SQLite
+
+    return {
+        "pool_size": DATABASE_POOL_SIZE,
+        "max_overflow": DATABASE_MAX_OVERFLOW,
+        "pool_timeout": DATABASE_POOL_TIMEOUT,
+        "pool_recycle": DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": DATABASE_POOL_PRE_PING,
+    }
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Apply the SQLITE_* settings to a new SQLite connection.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS:d}")
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE:d}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE:d}")
+    finally:
+        cursor.close()
+
+
+def set_sqlite_read_pragmas(dbapi_connection, connection_record):
+    """
+    Tune a read-only SQLite connection and make it refuse writes.
+
+    The journal mode and synchronous setting belong to the writer and are
+    left alone.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS:d}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE:d}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE:d}")
+        cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+
+def create_database_engine(database_url: str, read_only: bool = False) -> Engine:
+    """
+    Create a sync engine for database_url with the configured profile.
+    """
+    database_engine = create_engine(database_url, **engine_options(database_url))
+    if is_sqlite(database_url):
+        pragmas = set_sqlite_read_pragmas if read_only else set_sqlite_pragmas
+        event.listen(database_engine, "connect", pragmas)
+    return database_engine
+
+
+def read_database_url() -> str:
+    """
+    URL of the database serving GET routes (see READ_DATABASE_URL).
+    """
+    if READ_DATABASE_URL:
+        return READ_DATABASE_URL
+    if is_sqlite(SQLALCHEMY_DATABASE_URL):
+        return read_only_sqlite_url(SQLALCHEMY_DATABASE_URL)
+    return SQLALCHEMY_DATABASE_URL
+
+
+engine = create_database_engine(SQLALCHEMY_DATABASE_URL)
+
+# Reads share the primary engine unless they go to a replica or a
+# read-only SQLite connection
+READ_SQLALCHEMY_DATABASE_URL = read_database_url()
+if READ_SQLALCHEMY_DATABASE_URL == SQLALCHEMY_DATABASE_URL:
+    read_engine = engine
+else:
+    read_engine = create_database_engine(READ_SQLALCHEMY_DATABASE_URL, read_only=True)
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine
 )
 
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=read_engine
+)
+
 Base = declarative_base()
 def get_db():
     db = SessionLocal()
@@ -21,3 +139,152 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ============================================
+# Read routing
+# ============================================
+
+# Cookie holding the time of the client's last write (epoch seconds), the
+# fallback for clients that are not identified by a bearer token
+LAST_WRITE_COOKIE = "vibecheck_last_write"
+
+# user_id -> time of the user's last write, for the READ_YOUR_WRITES_WINDOW;
+# kept per worker process
+_recent_writers = LRUCache(100000, ttl=READ_YOUR_WRITES_WINDOW)
+
+
+def remember_write(response: Response, user_id: Optional[int] = None):
+    """
+    Send the primary the client's reads for READ_YOUR_WRITES_WINDOW seconds.
+
+    Bearer-token clients are recognized by user_id; the cookie also covers
+    clients that keep cookies when their next read lands on another worker.
+    """
+    if READ_YOUR_WRITES_WINDOW > 0:
+        if user_id is not None:
+            _recent_writers.set(user_id, time.time())
+        response.set_cookie(
+            LAST_WRITE_COOKIE,
+            f"{time.time():.3f}",
+            max_age=int(READ_YOUR_WRITES_WINDOW) + 1,
+            httponly=True,
+            samesite="lax"
+        )
+
+
+def _bearer_user_id(request: Request) -> Optional[int]:
+    """
+    User ID of a request's bearer token, or None without a valid one.
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    # app.auth imports this module
+    from app.auth import decode_access_token
+    try:
+        return decode_access_token(token).get("user_id")
+    except HTTPException:
+        return None
+
+
+def reads_from_primary(request: Request) -> bool:
+    """
+    Whether the client wrote recently enough to need the primary.
+    """
+    if READ_YOUR_WRITES_WINDOW <= 0 or read_engine is engine:
+        return False
+    if len(_recent_writers):
+        user_id = _bearer_user_id(request)
+        if user_id is not None and _recent_writers.get(user_id) is not None:
+            return True
+    try:
+        last_write = float(request.cookies.get(LAST_WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    return time.time() - last_write < READ_YOUR_WRITES_WINDOW
+
+
+def get_read_db(request: Request):
+    """
+    Session for GET routes, on the read database unless the client has just
+    written (see remember_write).
+    """
+    session_factory = SessionLocal if reads_from_primary(request) else ReadSessionLocal
+    db = session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Async drivers used in place of the default sync driver of each backend
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_database_url(database_url: str) -> str:
+    """
+    Convert a sync database URL to the equivalent async driver URL.
+
+    URLs that already name an async driver are returned unchanged.
+    """
+    url = make_url(database_url)
+    if url.drivername in ASYNC_DRIVERS:
+        url = url.set(drivername=ASYNC_DRIVERS[url.drivername])
+    return url.render_as_string(hide_password=False)
+
+
+# Async engines and sessions, only created when the async routes are enabled
+async_engine = None
+async_read_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(
+        async_database_url(SQLALCHEMY_DATABASE_URL),
+        **engine_options(SQLALCHEMY_DATABASE_URL)
+    )
+    if is_sqlite(SQLALCHEMY_DATABASE_URL):
+        # Connect events fire on the sync engine that drives the async one
+        event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+
+    # expire_on_commit=False: attributes cannot be lazily reloaded on an
+    # AsyncSession, so committed rows must stay readable for the response
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+    if read_engine is engine:
+        async_read_engine = async_engine
+    else:
+        async_read_engine = create_async_engine(
+            async_database_url(READ_SQLALCHEMY_DATABASE_URL),
+            **engine_options(READ_SQLALCHEMY_DATABASE_URL)
+        )
+        if is_sqlite(READ_SQLALCHEMY_DATABASE_URL):
+            event.listen(async_read_engine.sync_engine, "connect", set_sqlite_read_pragmas)
+
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db(request: Request):
+    session_factory = AsyncSessionLocal if reads_from_primary(request) else AsyncReadSessionLocal
+    async with session_factory() as db:
+        yield db
@@ -0,0 +1,252 @@
+"""
+Opt-in SQL diagnostics: per-request statement log, N+1 detection and a
+slow-query log with query plans.
+
+With QUERY_DIAGNOSTICS set, QueryDiagnosticsMiddleware records every
+statement of a request (shape, parameters, duration), logs statement
+shapes repeated N_PLUS_ONE_THRESHOLD times or more as suspected N+1
+queries and reports the count in an X-Query-Count header. Statements slower
+than SLOW_QUERY_MS are logged with their EXPLAIN (QUERY PLAN) output.
+
+Tests can check query budgets without the middleware:
+
+    with assert_max_queries(3):
+        client.get("/businesses/1/reviews")
+
+Parameters are logged as-is (including password hashes), so this is a
+development and staging tool.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import SLOW_QUERY_MS, N_PLUS_ONE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+# Longest parameter repr written to the log
+MAX_LOGGED_PARAMETERS = 500
+
+# A parenthesized list of bind placeholders (?, :name, %(name)s or $1), as
+# expanded for IN clauses
+_PLACEHOLDER = r"(?:\?|:\w+|%\(\w+\)s|%s|\$\d+)"
+_PLACEHOLDER_LIST = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Statements EXPLAIN is run for when they are slow
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Normalize a statement so runs differing only in IN-list length compare equal.
+    """
+    return _PLACEHOLDER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+@dataclass
+class RecordedQuery:
+    statement: str
+    parameters: object
+    duration: float
+    shape: str
+
+
+class QueryRecorder:
+    """
+    Statements executed while the recorder is active, in order.
+    """
+
+    def __init__(self):
+        self.queries: List[RecordedQuery] = []
+        self._lock = threading.Lock()
+
+    def add(self, query: RecordedQuery):
+        with self._lock:
+            self.queries.append(query)
+
+    def __len__(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_duration(self) -> float:
+        return sum(query.duration for query in self.queries)
+
+    def repeated_shapes(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+        """
+        Statement shapes run at least threshold times, most frequent first.
+        """
+        counts = Counter(query.shape for query in self.queries)
+        return [(shape, count) for shape, count in counts.most_common() if count >= threshold]
+
+
+# Recorder of the current request (set by QueryDiagnosticsMiddleware)
+_request_recorder: ContextVar[Optional[QueryRecorder]] = ContextVar("request_recorder", default=None)
+
+# Recorders opened by record_queries(); they see statements from every
+# thread, since test clients run the app on another thread
+_global_recorders: List[QueryRecorder] = []
+_global_lock = threading.Lock()
+
+
+@contextmanager
+def record_queries():
+    """
+    Record every statement executed by the process inside the block.
+    """
+    install_query_hooks()
+    recorder = QueryRecorder()
+    with _global_lock:
+        _global_recorders.append(recorder)
+    try:
+        yield recorder
+    finally:
+        with _global_lock:
+            _global_recorders.remove(recorder)
+
+
+@contextmanager
+def assert_max_queries(limit: int, n_plus_one_threshold: Optional[int] = None):
+    """
+    Fail with the statements listed if the block runs more than limit
+    statements, or repeats one shape n_plus_one_threshold times.
+    """
+    with record_queries() as recorder:
+        yield recorder
+
+    problems = []
+    if len(recorder) > limit:
+        problems.append(f"{len(recorder)} statements executed, budget is {limit}")
+    if n_plus_one_threshold is not None:
+        for shape, count in recorder.repeated_shapes(n_plus_one_threshold):
+            problems.append(f"N+1 suspected, {count}x: {shape}")
+    if problems:
+        listing = "\n".join(f"  {query.statement}" for query in recorder.queries)
+        raise AssertionError("; ".join(problems) + "\nStatements:\n" + listing)
+
+
+class QueryDiagnosticsMiddleware:
+    """
+    ASGI middleware recording each request's statements and flagging N+1 shapes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recorder = QueryRecorder()
+
+        async def send_with_query_count(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(len(recorder)).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _request_recorder.set(recorder)
+        try:
+            await self.app(scope, receive, send_with_query_count)
+        finally:
+            _request_recorder.reset(token)
+            request_line = f"{scope['method']} {scope['path']}"
+            for shape, count in recorder.repeated_shapes():
+                logger.warning("N+1 suspected on %s: %d x %s", request_line, count, shape)
+            logger.debug(
+                "%s ran %d statements in %.1f ms", request_line, len(recorder), recorder.total_duration * 1000
+            )
+
+
+# ============================================
+# SQLAlchemy hooks
+# ============================================
+
+def _short(parameters) -> str:
+    text = repr(parameters)
+    if len(text) > MAX_LOGGED_PARAMETERS:
+        text = text[:MAX_LOGGED_PARAMETERS] + "..."
+    return text
+
+
+def explain(conn, statement: str, parameters) -> Optional[str]:
+    """
+    Query plan of a statement, from a raw cursor so no hooks fire again.
+    """
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "\n".join("  " + " | ".join(str(value) for value in row) for row in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("diagnostics_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["diagnostics_query_started"].pop()
+
+    recorders = []
+    request_recorder = _request_recorder.get()
+    if request_recorder is not None:
+        recorders.append(request_recorder)
+    if _global_recorders:
+        with _global_lock:
+            recorders.extend(_global_recorders)
+    if recorders:
+        query = RecordedQuery(statement, parameters, duration, statement_shape(statement))
+        for recorder in recorders:
+            recorder.add(query)
+
+    if duration * 1000 >= SLOW_QUERY_MS:
+        plan = None
+        if not executemany:
+            try:
+                plan = explain(conn, statement, parameters)
+            except Exception:
+                logger.debug("EXPLAIN failed for slow statement", exc_info=True)
+        logger.warning(
+            "Slow statement (%.1f ms): %s\n  parameters: %s%s",
+            duration * 1000, statement, _short(parameters), f"\n  plan:\n{plan}" if plan else ""
+        )
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("diagnostics_query_started"):
+        connection.info["diagnostics_query_started"].pop()
+
+
+_hooks_installed = False
+_hooks_lock = threading.Lock()
+
+
+def install_query_hooks():
+    """
+    Record and time the statements of every engine (async ones included).
+    """
+    global _hooks_installed
+    with _hooks_lock:
+        if _hooks_installed:
+            return
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        _hooks_installed = True
@@ -0,0 +1,350 @@
+"""
+Client for the remote DS sentiment service.
+
+The service is called with a batch of review texts:
+
+    POST DS_SERVICE_ENDPOINT  {"reviews": ["...", "..."]}
+    200 OK                    {"results": [{"vibe_score": 72.5, "sentiment": "positive",
+                                            "keywords": "[...]"}, ...]}
+
+Reviews scored within DS_SERVICE_BATCH_WINDOW_MS of each other are coalesced
+into one call over a pooled HTTP session. Failures trip a circuit breaker,
+and any review the service cannot score falls back to the local lexicon
+scorer, so callers always get a result. Every result carries the
+scorer_version of whichever scorer produced it.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.config import (
+    DS_SERVICE_ENDPOINT, DS_SERVICE_MODEL_VERSION, DS_SERVICE_CONNECT_TIMEOUT, DS_SERVICE_READ_TIMEOUT,
+    DS_SERVICE_POOL_SIZE, DS_SERVICE_BATCH_WINDOW_MS, DS_SERVICE_MAX_BATCH_SIZE,
+    DS_SERVICE_FAILURE_THRESHOLD, DS_SERVICE_RESET_TIMEOUT
+)
+from app.lexicon import extract_keywords, sentiment_label
+from app.utils import analyze_review_sentiments, lexicon_scorer
+
+logger = logging.getLogger(__name__)
+
+
+class DSServiceError(Exception):
+    """Raised when the DS service cannot score a batch."""
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are refused for reset_timeout seconds. The next call after that is let
+    through as a trial: success closes the circuit, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        """
+        True while calls are being refused (does not start a trial).
+        """
+        with self._lock:
+            return (
+                self.state == self.OPEN
+                and time.monotonic() - self._opened_at < self.reset_timeout
+            )
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Let a single trial request through
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class DSServiceClient:
+    """
+    Micro-batching client for the DS sentiment service.
+
+    score() enqueues a review and blocks until its batch returns; a
+    dispatcher thread drains the queue into batches and hands them to a
+    pool of sender threads sharing one keep-alive HTTP session.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = DS_SERVICE_ENDPOINT,
+        connect_timeout: float = DS_SERVICE_CONNECT_TIMEOUT,
+        read_timeout: float = DS_SERVICE_READ_TIMEOUT,
+        pool_size: int = DS_SERVICE_POOL_SIZE,
+        batch_window_ms: float = DS_SERVICE_BATCH_WINDOW_MS,
+        max_batch_size: int = DS_SERVICE_MAX_BATCH_SIZE,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        session: Optional[requests.Session] = None,
+        model_version: str = DS_SERVICE_MODEL_VERSION,
+        result_timeout: Optional[float] = None,
+    ):
+        self.endpoint = endpoint
+        self.version = f"ds-{model_version}"
+        self.timeout = (connect_timeout, read_timeout)
+        self.batch_window = batch_window_ms / 1000.0
+        # How long score() waits for its batch before scoring locally; by
+        # default the batch window plus one HTTP call and a second of slack
+        if result_timeout is None:
+            result_timeout = self.batch_window + connect_timeout + read_timeout + 1.0
+        self.result_timeout = result_timeout
+        self.max_batch_size = max_batch_size
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(
+            DS_SERVICE_FAILURE_THRESHOLD, DS_SERVICE_RESET_TIMEOUT
+        )
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+        self._queue: "queue.Queue[Optional[Tuple[str, Future]]]" = queue.Queue()
+        self._senders = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="ds-sender")
+        self._dispatcher: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    # ============================================
+    # Public API
+    # ============================================
+
+    def score(self, review_content: str) -> dict:
+        """
+        Score one review, coalescing it with concurrent submissions.
+
+        Falls back to the lexicon scorer if the batch has not returned
+        within result_timeout.
+
+        Parameters:
+            review_content: The text content of the review
+
+        Returns:
+            Dictionary with vibe_score, sentiment, and keywords (as JSON string)
+        """
+        if self.circuit_breaker.is_open():
+            return _fallback([review_content])[0]
+
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                return _fallback([review_content])[0]
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(
+                    target=self._dispatch_loop, name="ds-dispatcher", daemon=True
+                )
+                self._dispatcher.start()
+            self._queue.put((review_content, future))
+        try:
+            return future.result(timeout=self.result_timeout)
+        except FutureTimeoutError:
+            logger.warning("DS service batch timed out, using lexicon scorer")
+            return _fallback([review_content])[0]
+
+    def score_many(self, review_contents: List[str]) -> List[dict]:
+        """
+        Score a list of reviews directly, in chunks of max_batch_size.
+
+        Parameters:
+            review_contents: The text content of each review
+
+        Returns:
+            One result per review, in input order
+        """
+        results: List[dict] = []
+        for start in range(0, len(review_contents), self.max_batch_size):
+            results.extend(self._score_batch(review_contents[start:start + self.max_batch_size]))
+        return results
+
+    def close(self):
+        """
+        Stop the dispatcher, flush queued reviews and release connections.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            dispatcher = self._dispatcher
+        if dispatcher is not None:
+            self._queue.put(None)
+            dispatcher.join()
+        self._senders.shutdown(wait=True)
+        self.session.close()
+
+    # ============================================
+    # Batching
+    # ============================================
+
+    def _dispatch_loop(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+
+            # Collect whatever else arrives within the batch window
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._senders.submit(self._send, batch)
+
+    def _send(self, batch: List[Tuple[str, Future]]):
+        contents = [content for content, _ in batch]
+        try:
+            results = self._score_batch(contents)
+        except Exception as exc:  # never leave a caller waiting
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    # ============================================
+    # Transport
+    # ============================================
+
+    def _score_batch(self, review_contents: List[str]) -> List[dict]:
+        if not review_contents:
+            return []
+        if not self.circuit_breaker.allow_request():
+            return _fallback(review_contents)
+
+        try:
+            results = self._post(review_contents)
+        except DSServiceError as exc:
+            logger.warning("DS service unavailable, using lexicon scorer: %s", exc)
+            self.circuit_breaker.record_failure()
+            return _fallback(review_contents)
+        except Exception:
+            # Any failure counts, or a half-open circuit would never settle
+            logger.exception("DS service call failed, using lexicon scorer")
+            self.circuit_breaker.record_failure()
+            return _fallback(review_contents)
+
+        self.circuit_breaker.record_success()
+        return results
+
+    def _post(self, review_contents: List[str]) -> List[dict]:
+        try:
+            response = self.session.post(
+                self.endpoint, json={"reviews": review_contents}, timeout=self.timeout
+            )
+            response.raise_for_status()
+            results = response.json()["results"]
+        except (requests.RequestException, ValueError, KeyError, TypeError) as exc:
+            raise DSServiceError(str(exc)) from exc
+
+        if not isinstance(results, list) or len(results) != len(review_contents):
+            raise DSServiceError("DS service returned a mismatched batch")
+
+        try:
+            return [
+                _normalize_result(content, result, self.version)
+                for content, result in zip(review_contents, results)
+            ]
+        except (KeyError, TypeError, ValueError) as exc:
+            raise DSServiceError(f"Malformed DS service result: {exc}") from exc
+
+
+def _fallback(review_contents: List[str]) -> List[dict]:
+    """
+    Score reviews locally with the lexicon scorer.
+    """
+    return [
+        dict(result, scorer_version=lexicon_scorer.version)
+        for result in analyze_review_sentiments(review_contents)
+    ]
+
+
+def _normalize_result(review_content: str, result: dict, scorer_version: str) -> dict:
+    """
+    Shape a DS service result like analyze_review_sentiment's output.
+    """
+    vibe_score = max(0.0, min(100.0, float(result["vibe_score"])))
+    keywords = result.get("keywords")
+    if keywords is None:
+        keywords = extract_keywords(review_content)
+    elif not isinstance(keywords, str):
+        keywords = json.dumps(keywords)
+    return {
+        "vibe_score": vibe_score,
+        "sentiment": result.get("sentiment") or sentiment_label(vibe_score),
+        "keywords": keywords,
+        "scorer_version": scorer_version,
+    }
+
+
+_client: Optional[DSServiceClient] = None
+_client_lock = threading.Lock()
+
+
+def get_ds_client() -> DSServiceClient:
+    """
+    Return the process-wide DS service client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = DSServiceClient()
+    return _client
+
+
+def close_ds_client():
+    """
+    Close the process-wide DS service client if one was created.
+    """
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
@@ -0,0 +1,140 @@
+"""
+Streaming export of reviews and businesses as NDJSON or CSV.
+
+Rows are read with yield_per, so the driver hands them over in batches of
+EXPORT_BATCH_SIZE (a server-side cursor on PostgreSQL), and each batch is
+encoded and emitted before the next is fetched. Memory use stays constant
+however many rows are exported. Rows are plain column tuples, not ORM
+objects, and are ordered by id.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.sql import Select
+
+from app.config import EXPORT_BATCH_SIZE
+from app.database import ReadSessionLocal
+from app.models import Business, Review
+from app.schemas import ExportFormat, ReviewSentiment
+from app.utils import to_utc_naive
+
+REVIEW_EXPORT_COLUMNS = (
+    Review.id, Review.user_id, Review.business_id, Review.content,
+    Review.vibe_score, Review.sentiment, Review.keywords, Review.created_at,
+)
+
+BUSINESS_EXPORT_COLUMNS = (
+    Business.id, Business.name, Business.category, Business.location,
+    Business.aggregated_vibe_score, Business.total_reviews, Business.created_at,
+)
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def review_export_statement(
+    business_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sentiment: Optional[ReviewSentiment] = None,
+) -> Select:
+    """
+    Select reviews to export; since is inclusive and until exclusive.
+
+    Timezone-aware bounds are converted to UTC, the zone reviews are stored in.
+    """
+    statement = select(*REVIEW_EXPORT_COLUMNS)
+    if business_id is not None:
+        statement = statement.where(Review.business_id == business_id)
+    if since is not None:
+        statement = statement.where(Review.created_at >= to_utc_naive(since))
+    if until is not None:
+        statement = statement.where(Review.created_at < to_utc_naive(until))
+    if sentiment is not None:
+        statement = statement.where(Review.sentiment == sentiment.value)
+    return statement.order_by(Review.id)
+
+
+def business_export_statement(category: Optional[str] = None) -> Select:
+    """
+    Select businesses to export.
+    """
+    statement = select(*BUSINESS_EXPORT_COLUMNS)
+    if category is not None:
+        statement = statement.where(Business.category == category)
+    return statement.order_by(Business.id)
+
+
+def stream_row_batches(
+    statement: Select,
+    session_factory=ReadSessionLocal,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[Sequence]:
+    """
+    Yield the statement's rows in batches of at most batch_size.
+
+    The session lives as long as the generator, and is closed when the
+    export finishes or the client disconnects.
+    """
+    db = session_factory()
+    try:
+        result = db.execute(statement.execution_options(yield_per=batch_size))
+        for batch in result.partitions():
+            yield batch
+    finally:
+        db.close()
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_ndjson(batches: Iterator[Sequence], columns: Sequence) -> Iterator[str]:
+    """
+    Encode row batches as NDJSON, one chunk of lines per batch.
+    """
+    keys = [column.key for column in columns]
+    for batch in batches:
+        yield "".join(
+            json.dumps(dict(zip(keys, map(_json_value, row)))) + "\n" for row in batch
+        )
+
+
+def encode_csv(batches: Iterator[Sequence], columns: Sequence) -> Iterator[str]:
+    """
+    Encode row batches as CSV with a header line, one chunk per batch.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in columns])
+    for batch in batches:
+        writer.writerows(
+            [_json_value(value) for value in row] for row in batch
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when nothing matched
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_rows(
+    statement: Select,
+    columns: Sequence,
+    export_format: ExportFormat = ExportFormat.ndjson,
+    session_factory=ReadSessionLocal
+) -> Iterator[str]:
+    """
+    Stream the statement's rows encoded in export_format.
+    """
+    batches = stream_row_batches(statement, session_factory)
+    if export_format == ExportFormat.csv:
+        return encode_csv(batches, columns)
+    return encode_ndjson(batches, columns)
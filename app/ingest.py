@@ -0,0 +1,220 @@
+"""
+Bulk review ingestion.
+
+Reviews arrive as a JSON array or an NDJSON stream and are stored in chunks
+of BULK_INGEST_CHUNK_SIZE. Each chunk is validated, scored in one batch,
+inserted with a single executemany and folded into each affected business's
+running totals and daily rollups once, in one transaction.
+
+Bulk ingestion is a partner and backfill tool: the route needs the admin
+key as well as a user token, and backdated reviews may not be dated in the
+future.
+"""
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import AsyncIterator, List, Tuple
+
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.config import BULK_INGEST_MAX_ERRORS
+from app.database import SessionLocal
+from app.models import Business, Review
+from app.rollups import DailyRollupDeltas
+from app.schemas import BulkReviewItem
+from app.scoring import score_reviews
+from app.utils import apply_business_metrics_delta, to_utc_naive
+
+logger = logging.getLogger(__name__)
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# Stands in for an NDJSON line that is not valid JSON
+_INVALID = object()
+
+
+class BulkIngestReport:
+    """
+    Running counts and per-item errors of one bulk request.
+
+    Items are identified by their 0-based position in the array or stream.
+    """
+
+    def __init__(self, max_errors: int = BULK_INGEST_MAX_ERRORS):
+        self.max_errors = max_errors
+        self.received = 0
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, index: int, detail: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"index": index, "detail": detail})
+
+    def as_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "created": self.created,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["index"]),
+        }
+
+
+async def read_bulk_records(request: Request, report: BulkIngestReport) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Yield (index, decoded JSON value) for each item of a bulk request body.
+
+    NDJSON bodies are decoded line by line as they stream in, so memory use
+    does not grow with the size of the upload. Lines that are not valid
+    JSON are reported and skipped.
+
+    Raises:
+        HTTPException: If a JSON body is not an array
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type not in NDJSON_CONTENT_TYPES:
+        try:
+            records = json.loads(await request.body())
+        except ValueError:
+            records = None
+        if not isinstance(records, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Expected a JSON array of reviews or an NDJSON stream"
+            )
+        for index, record in enumerate(records):
+            report.received += 1
+            yield index, record
+        return
+
+    index = 0
+    pending = b""
+    async for body_chunk in request.stream():
+        pending += body_chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                record = _decode_line(line, index, report)
+                if record is not _INVALID:
+                    yield index, record
+                index += 1
+
+    if pending.strip():
+        record = _decode_line(pending, index, report)
+        if record is not _INVALID:
+            yield index, record
+
+
+def _decode_line(line: bytes, index: int, report: BulkIngestReport):
+    report.received += 1
+    try:
+        return json.loads(line)
+    except ValueError:
+        report.fail(index, "Invalid JSON")
+        return _INVALID
+
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'item'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+def ingest_review_chunk(
+    records: List[Tuple[int, object]],
+    user_id: int,
+    report: BulkIngestReport,
+    session_factory=SessionLocal
+):
+    """
+    Validate, score and store one chunk of bulk review records.
+
+    Parameters:
+        records: (index, decoded JSON value) pairs from read_bulk_records
+        user_id: Author of every review in the chunk
+        report: Report receiving counts and per-item errors
+        session_factory: Creates the session of the chunk's transaction
+    """
+    now = datetime.utcnow()
+    items = []
+    for index, record in records:
+        try:
+            item = BulkReviewItem.model_validate(record)
+        except ValidationError as error:
+            report.fail(index, _validation_detail(error))
+            continue
+        # Future timestamps would skew the windowed and decayed scores
+        if item.created_at is not None and to_utc_naive(item.created_at) > now:
+            report.fail(index, "created_at: must not be in the future")
+            continue
+        items.append((index, item))
+    if not items:
+        return
+
+    valid_items = []
+    db = session_factory()
+    try:
+        business_ids = {item.business_id for _, item in items}
+        existing_ids = set(db.scalars(select(Business.id).where(Business.id.in_(business_ids))))
+
+        for index, item in items:
+            if item.business_id in existing_ids:
+                valid_items.append((index, item))
+            else:
+                report.fail(index, f"Business with ID {item.business_id} does not exist")
+        if not valid_items:
+            return
+
+        results = score_reviews([item.content for _, item in valid_items])
+
+        rows = []
+        deltas = defaultdict(lambda: [0.0, 0, 0])
+        rollups = DailyRollupDeltas()
+        for (_, item), sentiment_analysis in zip(valid_items, results):
+            vibe_score = sentiment_analysis.get("vibe_score")
+            row = {
+                "user_id": user_id,
+                "business_id": item.business_id,
+                "content": item.content,
+                "vibe_score": vibe_score,
+                "sentiment": sentiment_analysis.get("sentiment"),
+                "keywords": sentiment_analysis.get("keywords"),
+                "created_at": to_utc_naive(item.created_at) if item.created_at else now,
+            }
+            rows.append(row)
+            rollups.add(item.business_id, row["created_at"], vibe_score, row["sentiment"])
+            delta = deltas[item.business_id]
+            if vibe_score is not None:
+                delta[0] += vibe_score
+                delta[1] += 1
+            delta[2] += 1
+
+        db.execute(insert(Review), rows)
+
+        # One running-totals update per business for the whole chunk
+        for business_id, (score_sum, scored_reviews, total_reviews) in deltas.items():
+            apply_business_metrics_delta(
+                business_id,
+                db,
+                score_sum=score_sum,
+                scored_reviews=scored_reviews,
+                total_reviews=total_reviews,
+            )
+        rollups.apply(db)
+
+        db.commit()
+        report.created += len(rows)
+    except SQLAlchemyError:
+        db.rollback()
+        logger.exception("Storing a bulk review chunk failed")
+        for index, _ in valid_items:
+            report.fail(index, "Review could not be stored")
+    finally:
+        db.close()
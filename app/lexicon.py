@@ -0,0 +1,194 @@
+import hashlib
+import json
+import re
+from itertools import islice
+from typing import Iterable, List, Sequence, Set
+
+
+# Words are runs of word characters, optionally joined by apostrophes
+# ("don't"), so trailing punctuation no longer hides a match
+TOKEN_PATTERN = re.compile(r"\w+(?:'\w+)*")
+
+KEYWORD_STRIP_CHARS = '.,!?;:'
+
+# Trie key holding the (final token, phrase index) pairs of the phrases
+# that end one token after a node (never a token itself)
+PHRASE_ENDS = None
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split already-lowercased text into word tokens.
+    """
+    return TOKEN_PATTERN.findall(text)
+
+
+class PhraseMatcher:
+    """
+    Token trie that finds every phrase occurring in a tokenized text in a
+    single left-to-right pass.
+
+    Phrases match on tokens, so punctuation around a phrase does not hide
+    it. The final word of a phrase also matches longer forms of that word
+    ("highly recommend" matches "highly recommended"), as plain substring
+    matching used to.
+    """
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases = list(phrases)
+
+        # Each node maps a token to a child node, walking every phrase
+        # token except the last
+        self._root: dict = {}
+        self._max_phrase_tokens = 0
+        for index, phrase in enumerate(self.phrases):
+            phrase_tokens = tokenize(phrase.lower())
+            if not phrase_tokens:
+                continue
+            self._max_phrase_tokens = max(self._max_phrase_tokens, len(phrase_tokens))
+            node = self._root
+            for token in phrase_tokens[:-1]:
+                node = node.setdefault(token, {})
+            node.setdefault(PHRASE_ENDS, []).append((phrase_tokens[-1], index))
+
+        self._first_tokens = frozenset(t for t in self._root if t is not PHRASE_ENDS)
+        self._single_token_phrases = PHRASE_ENDS in self._root
+
+    def find(self, tokens: Sequence[str]) -> Set[int]:
+        """
+        Return the indices of all phrases that occur in the token sequence.
+        """
+        matched: Set[int] = set()
+
+        if self._single_token_phrases:
+            starts = range(len(tokens))
+        elif self._first_tokens.isdisjoint(tokens):
+            # Most reviews contain no phrase opener at all
+            return matched
+        else:
+            first_tokens = self._first_tokens
+            starts = [i for i, token in enumerate(tokens) if token in first_tokens]
+
+        root = self._root
+        span = self._max_phrase_tokens
+        for position in starts:
+            node = root
+            for token in tokens[position:position + span]:
+                for final_token, index in node.get(PHRASE_ENDS, ()):
+                    if token.startswith(final_token):
+                        matched.add(index)
+                node = node.get(token)
+                if node is None:
+                    break
+        return matched
+
+
+class LexiconScorer:
+    """
+    Keyword/phrase sentiment scorer with its lexicon compiled once.
+
+    The review is tokenized once; single words are looked up per token in
+    a set and phrases are matched over the same tokens by a PhraseMatcher.
+    """
+
+    def __init__(
+        self,
+        positive_words: Iterable[str],
+        negative_words: Iterable[str],
+        positive_phrases: Iterable[str],
+        negative_phrases: Iterable[str],
+        word_weight: int = 15,
+        phrase_weight: int = 2,
+    ):
+        self.positive_words = frozenset(positive_words)
+        self.negative_words = frozenset(negative_words)
+        self.word_weight = word_weight
+        self.phrase_weight = phrase_weight
+
+        positive_phrases = list(positive_phrases)
+        negative_phrases = list(negative_phrases)
+
+        # Identifies this exact lexicon, so cached scores from a different
+        # lexicon are never reused
+        fingerprint = json.dumps([
+            sorted(self.positive_words), sorted(self.negative_words),
+            positive_phrases, negative_phrases, word_weight, phrase_weight,
+        ])
+        self.version = "lexicon-" + hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+        self._phrase_matcher = PhraseMatcher(positive_phrases + negative_phrases)
+        self._positive_phrase_count = len(positive_phrases)
+
+    def score(self, review_content: str) -> dict:
+        """
+        Score a single review.
+
+        Parameters:
+            review_content: The text content of the review
+
+        Returns:
+            Dictionary with vibe_score, sentiment, and keywords (as JSON string)
+        """
+        review_lower = review_content.lower()
+
+        tokens = tokenize(review_lower)
+
+        # Each lexicon entry counts once, however often it appears
+        distinct_tokens = set(tokens)
+        positive_count = len(distinct_tokens & self.positive_words)
+        negative_count = len(distinct_tokens & self.negative_words)
+
+        positive_phrase_count = 0
+        negative_phrase_count = 0
+        for index in self._phrase_matcher.find(tokens):
+            if index < self._positive_phrase_count:
+                positive_phrase_count += self.phrase_weight
+            else:
+                negative_phrase_count += self.phrase_weight
+
+        # Base score of 50 (neutral), +/- word_weight per word,
+        # phrases count phrase_weight times as much
+        vibe_score = (
+            50
+            + (positive_count + positive_phrase_count) * self.word_weight
+            - (negative_count + negative_phrase_count) * self.word_weight
+        )
+        vibe_score = max(0, min(100, vibe_score))  # Clamp between 0-100
+
+        return {
+            "vibe_score": vibe_score,
+            "sentiment": sentiment_label(vibe_score),
+            "keywords": extract_keywords(review_lower),
+        }
+
+    def score_many(self, review_contents: Iterable[str]) -> List[dict]:
+        """
+        Score a batch of reviews, returning results in input order.
+        """
+        score = self.score
+        return [score(content) for content in review_contents]
+
+
+def sentiment_label(vibe_score: float) -> str:
+    """
+    Map a 0-100 vibe score to its sentiment label.
+    """
+    if vibe_score >= 65:
+        return "positive"
+    elif vibe_score >= 40:
+        return "neutral"
+    return "negative"
+
+
+def extract_keywords(review_content: str) -> str:
+    """
+    Extract up to five keywords (words longer than 4 characters).
+
+    Returns:
+        Keywords as a JSON string for storage
+    """
+    words = review_content.lower().split()
+    keywords_list = list(islice(
+        (w.strip(KEYWORD_STRIP_CHARS) for w in words if len(w) > 4), 5
+    ))
+    return json.dumps(keywords_list)
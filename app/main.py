@@ -1,19 +1,80 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import APIRouter, FastAPI, Depends, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import timedelta
+from typing import List, Optional
+from datetime import datetime
+from contextlib import asynccontextmanager
 
-from app.database import get_db
-from app.models import User, Business, Review
+from app.database import get_db, get_read_db, remember_write, async_engine, async_read_engine
+from app.models import User
 from app.schemas import (
     UserCreate, UserLogin, UserResponse, LoginResponse,
-    BusinessResponse, ReviewCreate, ReviewResponse, MessageResponse
+    BusinessResponse, BusinessSort, VibeSummaryResponse, VibeTrendResponse,
+    ReviewCreate, ReviewResponse, ReviewSentiment, MessageResponse,
+    ReviewSearchHit, BusinessSearchHit, BulkReviewResponse, ExportFormat, RecomputeMetricsResponse
 )
-from app.auth import hash_password, verify_password, create_access_token, get_current_user, ACCESS_TOKEN_EXPIRE_HOURS
-from app.utils import analyze_review_sentiment, refresh_business_metrics
+from app.auth import (
+    get_current_user, get_current_identity, get_current_identity_async, revoke_user_tokens,
+    require_admin, require_metrics_access, TokenIdentity, ADMIN_API_KEY
+)
+from app.utils import reconcile_business_metrics
+from app.scoring import close_scoring_cache
+from app.ds_client import close_ds_client
+from app.pipeline import scoring_pipeline
+from app.config import (
+    REVIEW_SCORING_MODE, DATABASE_ASYNC, BULK_INGEST_CHUNK_SIZE, METRICS_ENABLED, QUERY_DIAGNOSTICS,
+    PROFILE_SAMPLE_RATE
+)
+from app.ingest import BulkIngestReport, read_bulk_records, ingest_review_chunk
+from app.export import (
+    review_export_statement, business_export_statement, export_rows,
+    REVIEW_EXPORT_COLUMNS, BUSINESS_EXPORT_COLUMNS, EXPORT_MEDIA_TYPES
+)
+from app.queries import (
+    register_user, login_user, business_page, business_detail, business_vibe, business_vibe_trend,
+    require_business, initial_review_scores, store_review, business_reviews_page,
+    review_search_results, business_search_results
+)
+from app.metrics import MetricsMiddleware, install_sqlalchemy_hooks, render_metrics, METRICS_CONTENT_TYPE
+from app.diagnostics import QueryDiagnosticsMiddleware, install_query_hooks
+from app.profiler import ProfilerMiddleware
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if REVIEW_SCORING_MODE == "async":
+        scoring_pipeline.start()
+    yield
+    scoring_pipeline.stop()
+    # Flush pending DS service batches and release pooled connections
+    close_ds_client()
+    close_scoring_cache()
+    if async_read_engine is not None and async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+
 
 # Create FastAPI application
-app = FastAPI(title="VibeCheck Business Platform", version="1.0.0")
+app = FastAPI(title="VibeCheck Business Platform", version="1.0.0", lifespan=lifespan)
+
+# Per-route latency and SQL usage, served on /metrics
+if METRICS_ENABLED:
+    install_sqlalchemy_hooks()
+    app.add_middleware(MetricsMiddleware)
+
+# Per-request statement log, N+1 warnings and slow-query plans (opt-in)
+if QUERY_DIAGNOSTICS:
+    install_query_hooks()
+    app.add_middleware(QueryDiagnosticsMiddleware)
+
+# Stack sampling of admin-requested or randomly sampled requests
+if PROFILE_SAMPLE_RATE > 0 or ADMIN_API_KEY:
+    app.add_middleware(ProfilerMiddleware)
+
+
+# Business, review and auth routes (sync database layer)
+router = APIRouter()
 
 
 # Root route
@@ -22,146 +83,227 @@ def home():
     return {"status": "active", "message": "VibeCheck Business Platform API"}
 
 
+# Prometheus metrics endpoint (scrapers send X-Metrics-Key)
+if METRICS_ENABLED:
+    @app.get(
+        "/metrics",
+        response_class=PlainTextResponse,
+        include_in_schema=False,
+        dependencies=[Depends(require_metrics_access)]
+    )
+    def metrics():
+        return PlainTextResponse(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 # User registration endpoint
-@app.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def register_new_user(user_info: UserCreate, db: Session = Depends(get_db)):
-    # Check username availability
-    username_exists = db.query(User).filter(User.username == user_info.username).first()
-    if username_exists:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="This username is already taken"
-        )
-    
-    # Check email availability
-    email_exists = db.query(User).filter(User.email == user_info.email).first()
-    if email_exists:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="This email is already registered"
-        )
-    
-    # Hash password and create user
-    password_hash = hash_password(user_info.password)
-    user_instance = User(
-        username=user_info.username,
-        email=user_info.email,
-        hashed_password=password_hash
-    )
-    
-    db.add(user_instance)
-    db.commit()
-    db.refresh(user_instance)
-    
-    return user_instance
+    return register_user(db, user_info)
 
 
 # User login endpoint
-@app.post("/login", response_model=LoginResponse)
+@router.post("/login", response_model=LoginResponse)
 def authenticate_user(login_info: UserLogin, db: Session = Depends(get_db)):
-    # Retrieve user from database
-    user_account = db.query(User).filter(User.username == login_info.username).first()
-    
-    if not user_account:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password"
-        )
-    
-    # Validate password
-    password_valid = verify_password(login_info.password, user_account.hashed_password)
-    if not password_valid:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password"
-        )
-    
-    # Create JWT token
-    access_token_expires = timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
-    access_token = create_access_token(
-        data={"user_id": user_account.id, "username": user_account.username},
-        expires_delta=access_token_expires
-    )
-    
-    return {
-        "message": "Authentication successful",
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": user_account
-    }
+    return login_user(db, login_info)
+
+
+# Revoke all tokens of the current user endpoint
+@router.post("/tokens/revoke", response_model=MessageResponse)
+def revoke_tokens(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    revoke_user_tokens(current_user, db)
+    return {"message": "All access tokens have been revoked"}
 
 
-# List all businesses endpoint
-@app.get("/businesses", response_model=List[BusinessResponse])
-def list_businesses(db: Session = Depends(get_db)):
-    business_list = db.query(Business).all()
-    return business_list
+# List businesses endpoint
+@router.get("/businesses", response_model=List[BusinessResponse])
+def list_businesses(
+    request: Request,
+    category: Optional[str] = None,
+    min_score: Optional[float] = Query(None, ge=0, le=100),
+    sort: BusinessSort = BusinessSort.id,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    return business_page(db, request, category, min_score, sort, limit, cursor)
 
 
 # Get single business endpoint
-@app.get("/businesses/{business_id}", response_model=BusinessResponse)
-def retrieve_business(business_id: int, db: Session = Depends(get_db)):
-    business_record = db.query(Business).filter(Business.id == business_id).first()
-    
-    if not business_record:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Business with ID {business_id} not found"
-        )
-    
-    return business_record
+@router.get("/businesses/{business_id}", response_model=BusinessResponse)
+def retrieve_business(business_id: int, request: Request, db: Session = Depends(get_read_db)):
+    return business_detail(db, request, business_id)
+
+
+# Trailing-window and time-decayed vibe score endpoint
+@router.get("/businesses/{business_id}/vibe", response_model=VibeSummaryResponse)
+def retrieve_business_vibe(
+    business_id: int,
+    window_days: int = Query(30, ge=1, le=365),
+    half_life_days: float = Query(30, gt=0, le=365),
+    db: Session = Depends(get_read_db)
+):
+    return business_vibe(db, business_id, window_days, half_life_days)
+
+
+# Vibe score trend endpoint (daily or wider buckets, oldest first)
+@router.get("/businesses/{business_id}/vibe/trend", response_model=VibeTrendResponse)
+def retrieve_business_vibe_trend(
+    business_id: int,
+    days: int = Query(90, ge=1, le=730),
+    bucket_days: int = Query(1, ge=1, le=90),
+    db: Session = Depends(get_read_db)
+):
+    return business_vibe_trend(db, business_id, days, bucket_days)
 
 
 # Create review endpoint
-@app.post("/businesses/{business_id}/reviews", response_model=ReviewResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/businesses/{business_id}/reviews",
+    response_model=ReviewResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"model": ReviewResponse}}
+)
 def submit_review(
     business_id: int,
     review_info: ReviewCreate,
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    current_user: TokenIdentity = Depends(get_current_identity),
     db: Session = Depends(get_db)
 ):
-    # Validate business existence
-    business_record = db.query(Business).filter(Business.id == business_id).first()
-    if not business_record:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Business with ID {business_id} does not exist"
-        )
-    
-    # Analyze sentiment using DS Service
-    sentiment_analysis = analyze_review_sentiment(review_info.content)
-    
-    # Create review record
-    review_instance = Review(
-        user_id=current_user.id,
-        business_id=business_id,
-        content=review_info.content,
-        vibe_score=sentiment_analysis.get("vibe_score"),
-        sentiment=sentiment_analysis.get("sentiment"),
-        keywords=sentiment_analysis.get("keywords")
-    )
+    require_business(db, business_id)
+    sentiment_analysis = initial_review_scores(review_info.content)
+    return store_review(db, response, business_id, review_info, sentiment_analysis, current_user.id)
+
+
+# Get reviews for business endpoint (newest first)
+@router.get("/businesses/{business_id}/reviews", response_model=List[ReviewResponse])
+def fetch_business_reviews(
+    business_id: int,
+    request: Request,
+    sentiment: Optional[ReviewSentiment] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    return business_reviews_page(db, request, business_id, sentiment, limit, cursor)
+
+
+# Full-text review search (best match first)
+@router.get("/search/reviews", response_model=List[ReviewSearchHit])
+def search_reviews(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    business_id: Optional[int] = None,
+    sentiment: Optional[ReviewSentiment] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    return review_search_results(db, response, q, business_id, sentiment, limit, cursor)
+
+
+# Full-text business search over names and categories
+@router.get("/search/businesses", response_model=List[BusinessSearchHit])
+def search_businesses(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    return business_search_results(db, response, q, category, limit, cursor)
+
+
+# Identity dependency of the routes shared by the sync and async layers
+current_identity = get_current_identity_async if DATABASE_ASYNC else get_current_identity
+
+
+# Bulk review ingestion endpoint for partners and backfills (JSON array or NDJSON stream)
+@app.post("/reviews/bulk", response_model=BulkReviewResponse, dependencies=[Depends(require_admin)])
+async def bulk_submit_reviews(
+    request: Request,
+    response: Response,
+    current_user: TokenIdentity = Depends(current_identity)
+):
+    report = BulkIngestReport()
     
-    db.add(review_instance)
-    db.commit()
-    db.refresh(review_instance)
+    # Store each chunk as soon as it has been read, off the event loop
+    chunk = []
+    async for record in read_bulk_records(request, report):
+        chunk.append(record)
+        if len(chunk) >= BULK_INGEST_CHUNK_SIZE:
+            await run_in_threadpool(ingest_review_chunk, chunk, current_user.id, report)
+            chunk = []
+    if chunk:
+        await run_in_threadpool(ingest_review_chunk, chunk, current_user.id, report)
     
-    # Update business metrics
-    refresh_business_metrics(business_id, db)
+    if report.created:
+        remember_write(response, current_user.id)
     
-    return review_instance
-
-
-# Get reviews for business endpoint
-@app.get("/businesses/{business_id}/reviews", response_model=List[ReviewResponse])
-def fetch_business_reviews(business_id: int, db: Session = Depends(get_db)):
-    # Check if business exists
-    business_record = db.query(Business).filter(Business.id == business_id).first()
-    if not business_record:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Business with ID {business_id} does not exist"
-        )
+    return report.as_dict()
+
+
+# Streaming review export endpoint
+@app.get("/export/reviews", response_class=StreamingResponse)
+def export_reviews(
+    format: ExportFormat = ExportFormat.ndjson,
+    business_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sentiment: Optional[ReviewSentiment] = None,
+    current_user: TokenIdentity = Depends(current_identity)
+):
+    statement = review_export_statement(business_id, since, until, sentiment)
+    return StreamingResponse(
+        export_rows(statement, REVIEW_EXPORT_COLUMNS, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="reviews.{format.value}"'}
+    )
+
+
+# Streaming business export endpoint
+@app.get("/export/businesses", response_class=StreamingResponse)
+def export_businesses(
+    format: ExportFormat = ExportFormat.ndjson,
+    category: Optional[str] = None,
+    current_user: TokenIdentity = Depends(current_identity)
+):
+    statement = business_export_statement(category)
+    return StreamingResponse(
+        export_rows(statement, BUSINESS_EXPORT_COLUMNS, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="businesses.{format.value}"'}
+    )
+
+
+# Recompute business aggregates from reviews (maintenance)
+@app.post(
+    "/admin/recompute-metrics",
+    response_model=RecomputeMetricsResponse,
+    dependencies=[Depends(require_admin)]
+)
+def recompute_metrics(
+    business_id: Optional[List[int]] = Query(None),
+    chunk_size: int = Query(1000, ge=1, le=10000),
+    max_changes: int = Query(1000, ge=0),
+    db: Session = Depends(get_db)
+):
+    checked, changes = reconcile_business_metrics(db, chunk_size, business_id)
     
-    # Get all reviews
-    review_list = db.query(Review).filter(Review.business_id == business_id).all()
-    return review_list
+    return {
+        "businesses_checked": checked,
+        "businesses_changed": len(changes),
+        "changes": changes[:max_changes]
+    }
+
+
+# Async routes replace the sync ones when the async database layer is enabled
+if DATABASE_ASYNC:
+    from app.async_api import router as async_router
+    app.include_router(async_router)
+else:
+    app.include_router(router)
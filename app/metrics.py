@@ -0,0 +1,353 @@
+"""
+In-process metrics served in the Prometheus text format on /metrics.
+
+Route latency and in-flight requests are recorded by MetricsMiddleware,
+SQL statements and commits by SQLAlchemy event hooks (counted per request
+as well as globally), and scoring and aggregation work by the timed()
+blocks in app.scoring, app.utils and app.rollups. Caches report their
+hit/miss counters through the collectors passed to register_cache_stats.
+
+Each worker process keeps its own metrics; with several uvicorn workers
+every scrape sees one of them.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.routing import Match
+
+# Media type of the Prometheus text exposition format
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+# Route label of requests that match no route, so stray paths cannot
+# create new label values
+UNMATCHED_ROUTE = "unmatched"
+
+SQL_OPERATIONS = frozenset(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA"))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    A named metric with one value per combination of label values.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _labels(self, labels: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, labels)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._samples(items))
+        return lines
+
+    def _samples(self, items) -> List[str]:
+        return [f"{self.name}{self._labels(labels)} {_number(value)}" for labels, value in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    """
+    Cumulative-bucket histogram; observations are counted in their first
+    bucket and the buckets are summed when rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value: float, labels: Tuple[str, ...] = ()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # Per-bucket counts, then the sum of the observations
+                series = self._values[labels] = [0] * len(self.buckets) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def _samples(self, items) -> List[str]:
+        lines = []
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                bound_label = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{self._labels(labels, bound_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+HTTP_REQUESTS = Counter(
+    "vibecheck_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "vibecheck_http_request_duration_seconds", "HTTP request latency.", ("method", "route")
+)
+HTTP_IN_FLIGHT = Gauge(
+    "vibecheck_http_requests_in_flight", "HTTP requests being served.", ("method", "route")
+)
+REQUEST_DB_QUERIES = Histogram(
+    "vibecheck_http_request_db_queries", "SQL statements executed per HTTP request.",
+    ("method", "route"), COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = Histogram(
+    "vibecheck_http_request_db_seconds", "Time spent in SQL statements per HTTP request.",
+    ("method", "route"), FAST_BUCKETS
+)
+DB_QUERY_SECONDS = Histogram(
+    "vibecheck_db_query_duration_seconds", "SQL statement latency.", ("operation",), FAST_BUCKETS
+)
+DB_COMMIT_SECONDS = Histogram(
+    "vibecheck_db_commit_duration_seconds", "Session commit latency, flush included.", (), FAST_BUCKETS
+)
+SCORING_SECONDS = Histogram(
+    "vibecheck_scoring_duration_seconds", "Sentiment scorer calls, cache misses only.", ("mode",), FAST_BUCKETS
+)
+SCORED_REVIEWS = Counter(
+    "vibecheck_scored_reviews_total", "Reviews sent to the sentiment scorer.", ("mode",)
+)
+AGGREGATION_SECONDS = Histogram(
+    "vibecheck_aggregation_duration_seconds", "Business aggregate and rollup updates.", ("operation",),
+    FAST_BUCKETS
+)
+
+
+@contextmanager
+def timed(histogram: Histogram, labels: Tuple[str, ...] = ()):
+    """
+    Observe the duration of a block (or, as a decorator, of each call).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started, labels)
+
+
+# ============================================
+# Cache statistics
+# ============================================
+
+# LRUCache.stats() key, metric name, type and help of each cache sample
+CACHE_SAMPLES = (
+    ("hits", "vibecheck_cache_hits_total", "counter", "Cache lookups answered from the cache."),
+    ("misses", "vibecheck_cache_misses_total", "counter", "Cache lookups that missed."),
+    ("evictions", "vibecheck_cache_evictions_total", "counter", "Entries evicted to make room."),
+    ("size", "vibecheck_cache_entries", "gauge", "Entries held by the cache."),
+)
+
+# Callables returning {cache name: stats dict}, read on every scrape
+_cache_collectors: List[Callable[[], Dict[str, dict]]] = []
+
+
+def register_cache_stats(collector: Callable[[], Dict[str, dict]]):
+    """
+    Report caches on /metrics, labelled by name.
+
+    Parameters:
+        collector: Returns a stats dict (hits, misses and optionally
+            evictions and size) per cache name; called on each scrape
+    """
+    _cache_collectors.append(collector)
+
+
+def _render_cache_stats() -> List[str]:
+    caches: Dict[str, dict] = {}
+    for collector in _cache_collectors:
+        caches.update(collector())
+
+    lines = []
+    for key, name, kind, documentation in CACHE_SAMPLES:
+        samples = [
+            f'{name}{{cache="{_escape(cache)}"}} {_number(stats[key])}'
+            for cache, stats in sorted(caches.items())
+            if key in stats
+        ]
+        if samples:
+            lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"])
+            lines.extend(samples)
+    return lines
+
+
+def render_metrics() -> str:
+    """
+    All metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(_render_cache_stats())
+    return "\n".join(lines) + "\n"
+
+
+# ============================================
+# Request tracking
+# ============================================
+
+# [statements, seconds] of the SQL run for the current request, if any
+_request_db_usage: ContextVar[Optional[list]] = ContextVar("request_db_usage", default=None)
+
+
+def route_template(scope) -> str:
+    """
+    Path template of the route serving an ASGI request, e.g. /businesses/{business_id}.
+    """
+    for route in getattr(scope.get("app"), "routes", ()):
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            return route.path
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, status and SQL usage per route.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        labels = (scope["method"], route_template(scope))
+        status_code = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        db_usage = [0, 0.0]
+        token = _request_db_usage.set(db_usage)
+        HTTP_IN_FLIGHT.inc(labels)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec(labels)
+            _request_db_usage.reset(token)
+            HTTP_REQUESTS.inc(labels + (str(status_code[0]),))
+            HTTP_REQUEST_SECONDS.observe(elapsed, labels)
+            REQUEST_DB_QUERIES.observe(db_usage[0], labels)
+            REQUEST_DB_SECONDS.observe(db_usage[1], labels)
+
+
+# ============================================
+# SQLAlchemy hooks
+# ============================================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["metrics_query_started"].pop()
+    elapsed = time.perf_counter() - started
+
+    operation = statement.split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    DB_QUERY_SECONDS.observe(elapsed, (operation if operation in SQL_OPERATIONS else "OTHER",))
+
+    db_usage = _request_db_usage.get()
+    if db_usage is not None:
+        db_usage[0] += 1
+        db_usage[1] += elapsed
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("metrics_query_started"):
+        connection.info["metrics_query_started"].pop()
+
+
+def _before_commit(session):
+    session.info["metrics_commit_started"] = time.perf_counter()
+
+
+def _after_commit(session):
+    started = session.info.pop("metrics_commit_started", None)
+    if started is not None:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+
+_hooks_installed = False
+
+
+def install_sqlalchemy_hooks():
+    """
+    Time every statement and commit of every engine and session.
+
+    Async engines are covered too: their statements run on the sync engine
+    and session underneath.
+    """
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    event.listen(Session, "before_commit", _before_commit)
+    event.listen(Session, "after_commit", _after_commit)
+    _hooks_installed = True
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey, Date, DateTime, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -14,6 +14,8 @@ class User(Base):
     email = Column(String(100), unique=True, nullable=False, index=True)
     hashed_password = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Tokens issued with an older version are rejected (revocation)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     
     reviews = relationship("Review", back_populates="user")
 
@@ -27,9 +29,24 @@ class Business(Base):
     location = Column(String(255), nullable=False)
     aggregated_vibe_score = Column(Float, default=0.0)
     total_reviews = Column(Integer, default=0)
+    # Running totals kept in step with every review insert so the
+    # aggregated score never needs a rescan of the reviews table
+    vibe_score_sum = Column(Float, nullable=False, default=0.0, server_default="0")
+    scored_reviews = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped with the running totals on every review write; read responses
+    # derive their ETags from it
+    version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     
     reviews = relationship("Review", back_populates="business")
+    
+    # Keyset pagination indexes for the GET /businesses sort orders
+    __table_args__ = (
+        Index("ix_businesses_category_score_id", "category", "aggregated_vibe_score", "id"),
+        Index("ix_businesses_score_id", "aggregated_vibe_score", "id"),
+        Index("ix_businesses_total_reviews_id", "total_reviews", "id"),
+        Index("ix_businesses_created_at_id", "created_at", "id"),
+    )
 
 
 class Review(Base):
@@ -46,3 +63,24 @@ class Review(Base):
     
     user = relationship("User", back_populates="reviews")
     business = relationship("Business", back_populates="reviews")
+    
+    # Serves per-business lookups and newest-first keyset pagination
+    __table_args__ = (
+        Index("ix_reviews_business_created_at_id", "business_id", "created_at", "id"),
+    )
+
+
+class BusinessDailyRollup(Base):
+    __tablename__ = "business_daily_rollups"
+    
+    # One row per business and UTC day with reviews, kept in step with
+    # every review insert so windowed scores never rescan the reviews table
+    business_id = Column(Integer, ForeignKey("businesses.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
+    scored_reviews = Column(Integer, nullable=False, default=0, server_default="0")
+    vibe_score_sum = Column(Float, nullable=False, default=0.0, server_default="0")
+    # Sentiment histogram of the day's scored reviews
+    positive_reviews = Column(Integer, nullable=False, default=0, server_default="0")
+    neutral_reviews = Column(Integer, nullable=False, default=0, server_default="0")
+    negative_reviews = Column(Integer, nullable=False, default=0, server_default="0")
@@ -0,0 +1,258 @@
+"""
+Background review-scoring pipeline.
+
+In async scoring mode submit_review stores a review with the pending
+sentiment and hands its ID to the pipeline. Worker threads drain the queue
+in batches, score each batch in one call and update the reviews, their
+businesses' running totals and daily rollups in a single transaction per
+batch.
+
+A batch that fails is requeued after an exponential backoff, at most
+SCORING_MAX_RETRIES times. The pending reviews themselves are the durable
+job list: reviews still pending when the process stops, or whose retries
+ran out, are picked up again on the next start.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+
+from app.config import (
+    SCORING_WORKERS, SCORING_BATCH_SIZE, SCORING_BATCH_WAIT_MS,
+    SCORING_MAX_RETRIES, SCORING_RETRY_BACKOFF_MS
+)
+from app.database import SessionLocal
+from app.models import Review
+from app.rollups import DailyRollupDeltas
+from app.scoring import score_reviews
+from app.utils import apply_business_metrics_delta
+
+logger = logging.getLogger(__name__)
+
+# Sentiment of a review that is stored but not scored yet
+PENDING_SENTIMENT = "pending"
+
+
+class ReviewScoringPipeline:
+    """
+    In-process queue of review IDs served by a pool of scoring workers.
+    """
+
+    def __init__(
+        self,
+        workers: int = SCORING_WORKERS,
+        batch_size: int = SCORING_BATCH_SIZE,
+        batch_wait_ms: float = SCORING_BATCH_WAIT_MS,
+        max_retries: int = SCORING_MAX_RETRIES,
+        retry_backoff_ms: float = SCORING_RETRY_BACKOFF_MS,
+        session_factory=SessionLocal,
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000.0
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff_ms / 1000.0
+        self.session_factory = session_factory
+
+        self._queue: "queue.Queue[Optional[int]]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        # Failed attempts per review ID, and the timers that will requeue them
+        self._attempts: Dict[int, int] = {}
+        self._retry_timers: List[threading.Timer] = []
+        self._retry_lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the workers and requeue reviews left pending by a previous run.
+        """
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._work_loop, name=f"review-scorer-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        self._recover_pending()
+
+    def stop(self):
+        """
+        Finish the queued reviews and stop the workers.
+
+        Reviews waiting for a retry stay pending until the next start.
+        """
+        with self._retry_lock:
+            for timer in self._retry_timers:
+                timer.cancel()
+            self._retry_timers = []
+            self._attempts.clear()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, review_id: int):
+        """
+        Queue a committed pending review for scoring.
+        """
+        self._queue.put(review_id)
+
+    def _recover_pending(self):
+        db = self.session_factory()
+        try:
+            pending_ids = db.query(Review.id).filter(
+                Review.sentiment == PENDING_SENTIMENT
+            ).order_by(Review.id).all()
+        finally:
+            db.close()
+
+        for (review_id,) in pending_ids:
+            self.submit(review_id)
+        if pending_ids:
+            logger.info("Requeued %d pending reviews for scoring", len(pending_ids))
+
+    def _work_loop(self):
+        stopping = False
+        while not stopping:
+            review_id = self._queue.get()
+            if review_id is None:
+                break
+            batch = [review_id]
+
+            # Gather more work for up to batch_wait seconds
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    review_id = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if review_id is None:
+                    stopping = True
+                    break
+                batch.append(review_id)
+
+            try:
+                self.process_batch(batch)
+            except Exception:
+                logger.exception("Failed to score review batch %s", batch)
+                self._schedule_retry(batch)
+            else:
+                with self._retry_lock:
+                    for review_id in batch:
+                        self._attempts.pop(review_id, None)
+
+    def _schedule_retry(self, review_ids: List[int]):
+        # Requeue the reviews of a failed batch after a backoff that doubles
+        # with each of their failures; give up after max_retries
+        with self._retry_lock:
+            retry_ids = []
+            attempts = 0
+            for review_id in review_ids:
+                count = self._attempts.get(review_id, 0) + 1
+                if count > self.max_retries:
+                    self._attempts.pop(review_id, None)
+                    continue
+                self._attempts[review_id] = count
+                retry_ids.append(review_id)
+                attempts = max(attempts, count)
+
+            abandoned = len(review_ids) - len(retry_ids)
+            if abandoned:
+                logger.error(
+                    "Giving up on %d reviews after %d retries; they stay pending until restart",
+                    abandoned, self.max_retries
+                )
+            if not retry_ids:
+                return
+
+            timer = threading.Timer(
+                self.retry_backoff * 2 ** (attempts - 1), self._requeue, args=(retry_ids,)
+            )
+            timer.daemon = True
+            self._retry_timers = [t for t in self._retry_timers if t.is_alive()]
+            self._retry_timers.append(timer)
+            timer.start()
+
+    def _requeue(self, review_ids: List[int]):
+        for review_id in review_ids:
+            self.submit(review_id)
+
+    def process_batch(self, review_ids: List[int]):
+        """
+        Score a batch of pending reviews and fold them into their businesses.
+
+        Parameters:
+            review_ids: IDs of reviews to score; ones no longer pending are skipped
+        """
+        db = self.session_factory()
+        try:
+            pending = db.query(Review.id, Review.business_id, Review.content, Review.created_at).filter(
+                Review.id.in_(review_ids),
+                Review.sentiment == PENDING_SENTIMENT
+            ).all()
+            if not pending:
+                return
+
+            results = score_reviews([row.content for row in pending])
+
+            score_sums = defaultdict(float)
+            scored_counts = defaultdict(int)
+            claimed_businesses = set()
+            rollups = DailyRollupDeltas()
+            for row, result in zip(pending, results):
+                # The pending guard makes a review count once even if two
+                # workers or processes race on it
+                claimed = db.execute(
+                    update(Review)
+                    .where(Review.id == row.id, Review.sentiment == PENDING_SENTIMENT)
+                    .values(
+                        vibe_score=result.get("vibe_score"),
+                        sentiment=result.get("sentiment"),
+                        keywords=result.get("keywords"),
+                    )
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                if not claimed:
+                    continue
+                claimed_businesses.add(row.business_id)
+                # Counted in the day's review_count on insert already
+                rollups.add(
+                    row.business_id,
+                    row.created_at,
+                    result.get("vibe_score"),
+                    result.get("sentiment"),
+                    reviews=0,
+                )
+                if result.get("vibe_score") is not None:
+                    score_sums[row.business_id] += result["vibe_score"]
+                    scored_counts[row.business_id] += 1
+
+            # The reviews were already counted in total_reviews on insert.
+            # Businesses whose reviews got no score still change version,
+            # since the reviews' sentiment did change
+            for business_id in sorted(claimed_businesses):
+                apply_business_metrics_delta(
+                    business_id,
+                    db,
+                    score_sum=score_sums[business_id],
+                    scored_reviews=scored_counts[business_id],
+                )
+            rollups.apply(db)
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+scoring_pipeline = ReviewScoringPipeline()
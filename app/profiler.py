@@ -0,0 +1,198 @@
+"""
+On-demand sampling profiler for individual requests.
+
+ProfilerMiddleware profiles a request when it carries "X-Profile: 1" and a
+valid X-Admin-Key, or at random for PROFILE_SAMPLE_RATE of the requests.
+While the request runs, a sampler thread reads the Python stack of every
+busy thread each PROFILE_INTERVAL_MS and counts identical stacks. The
+counts are written to PROFILE_DIR as collapsed stacks, one
+"frame;frame;frame count" line per stack, ready for flamegraph.pl or
+speedscope. Frames are labelled by function and its first line, so the
+samples of one function merge into one box. Requested profiles name their
+file in an X-Profile-Id header; only the newest PROFILE_MAX_FILES profiles
+are kept.
+
+Sync routes run on threadpool threads, so every busy thread is sampled:
+other requests served by the same worker at the same time show up in the
+profile too. Unprofiled requests only pay for a header scan and, with a
+sample rate set, one random number.
+"""
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.auth import is_admin_key
+from app.config import PROFILE_DIR, PROFILE_INTERVAL_MS, PROFILE_MAX_FILES, PROFILE_SAMPLE_RATE
+from app.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+# Frames kept per stack, innermost first
+MAX_STACK_DEPTH = 128
+
+# Innermost frames of threads waiting for work, left out of profiles
+IDLE_FRAMES = frozenset((
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+))
+
+_PATH_PART = re.compile(r"[^A-Za-z0-9]+")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    path = Path(code.co_filename)
+    return f"{code.co_name} ({'/'.join(path.parts[-2:])}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame) -> Optional[str]:
+    """
+    Collapsed "outer;...;inner" form of a thread's stack, or None when idle.
+    """
+    if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES:
+        return None
+
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame).replace(";", ":"))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+# Thread IDs of running samplers, never sampled themselves
+_sampler_threads = set()
+_sampler_lock = threading.Lock()
+
+
+class StackSampler:
+    """
+    Background thread counting the stacks of busy threads at a fixed interval.
+    """
+
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000.0
+        self.samples = 0
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stopped.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        own_id = threading.get_ident()
+        with _sampler_lock:
+            _sampler_threads.add(own_id)
+        try:
+            while not self._stopped.wait(self.interval):
+                self.samples += 1
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id in _sampler_threads:
+                        continue
+                    stack = collapse_stack(frame)
+                    if stack is not None:
+                        self.stacks[stack] += 1
+        finally:
+            with _sampler_lock:
+                _sampler_threads.discard(own_id)
+
+
+def write_collapsed_stacks(path: Path, stacks: Counter, max_files: int = PROFILE_MAX_FILES):
+    """
+    Write a profile and delete the oldest ones beyond max_files.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as output:
+        for stack, count in stacks.most_common():
+            output.write(f"{stack} {count}\n")
+    prune_profiles(path.parent, max_files)
+
+
+def prune_profiles(directory: Path, max_files: int):
+    profiles = []
+    for entry in directory.glob("*.folded"):
+        try:
+            profiles.append((entry.stat().st_mtime, entry))
+        except FileNotFoundError:
+            continue
+    profiles.sort(reverse=True)
+    for _, entry in profiles[max_files:]:
+        try:
+            entry.unlink()
+        except FileNotFoundError:
+            # Pruned by another worker
+            pass
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware sampling the stacks of requested or randomly chosen requests.
+    """
+
+    def __init__(self, app, sample_rate: float = PROFILE_SAMPLE_RATE, directory: str = PROFILE_DIR):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.directory = Path(directory)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = _header(scope, b"x-profile") == "1" and is_admin_key(_header(scope, b"x-admin-key"))
+        if not requested and not (self.sample_rate and random.random() < self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        route = _PATH_PART.sub("_", route_template(scope)).strip("_") or "root"
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{scope['method']}-{route}-{uuid.uuid4().hex[:8]}"
+
+        async def send_with_profile_id(message):
+            if requested and message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler = StackSampler()
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            elapsed = time.perf_counter() - started
+            # Joining the sampler thread blocks, so not on the event loop
+            stacks = await run_in_threadpool(sampler.stop)
+            path = self.directory / f"{profile_id}.folded"
+            try:
+                await run_in_threadpool(write_collapsed_stacks, path, stacks)
+                logger.info(
+                    "Profiled %s %s in %.1f ms (%d samples) -> %s",
+                    scope["method"], scope["path"], elapsed * 1000, sampler.samples, path
+                )
+            except OSError:
+                logger.exception("Could not write profile %s", path)
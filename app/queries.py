@@ -0,0 +1,402 @@
+"""
+Statement builders and route logic shared by the sync and async routes.
+
+Each builder returns a SQLAlchemy 2.0 select() that runs unchanged on a
+Session or an AsyncSession, plus the keyset columns used for its cursor.
+
+The route functions below hold everything a route does besides receiving
+its parameters: validation, 404s, ETags and response bodies. They take a
+sync Session; the sync routes in app.main call them directly and the async
+routes in app.async_api hand them to AsyncSession.run_sync, which awaits
+each statement's IO on the event loop.
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.auth import hash_password, verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_HOURS
+from app.config import REVIEW_SCORING_MODE, DS_SERVICE_ENABLED
+from app.database import remember_write
+from app.models import Business, Review, User
+from app.pagination import encode_cursor, decode_cursor, keyset_after
+from app.pipeline import scoring_pipeline, PENDING_SENTIMENT
+from app.response_cache import (
+    make_etag, cached_response, store_response, serialize,
+    BUSINESS_ADAPTER, BUSINESS_LIST_ADAPTER, REVIEW_LIST_ADAPTER
+)
+from app.rollups import rollup_statement, summary_start, vibe_summary, vibe_trend
+from app.schemas import BusinessSort, ReviewCreate, ReviewSentiment, UserCreate, UserLogin
+from app.scoring import score_review
+from app.search import review_search_statement, business_search_statement, search_page
+from app.utils import record_review_metrics
+
+
+# Keyset columns, cursor value types and direction for each business sort
+BUSINESS_SORTS = {
+    BusinessSort.id: ((Business.id,), (int,), False),
+    BusinessSort.score: ((Business.aggregated_vibe_score, Business.id), (float, int), True),
+    BusinessSort.reviews: ((Business.total_reviews, Business.id), (int, int), True),
+    BusinessSort.recent: ((Business.created_at, Business.id), (datetime.fromisoformat, int), True),
+}
+
+# Reviews are listed newest first
+REVIEW_ORDER = (Review.created_at, Review.id)
+
+
+def business_listing_statement(
+    category: Optional[str] = None,
+    min_score: Optional[float] = None,
+    sort: BusinessSort = BusinessSort.id,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Tuple[Select, Sequence]:
+    """
+    Build the GET /businesses page query (one extra row to detect more pages).
+    """
+    statement = select(Business)
+    if category is not None:
+        statement = statement.where(Business.category == category)
+    if min_score is not None:
+        statement = statement.where(Business.aggregated_vibe_score >= min_score)
+
+    # Continue after the last row of the previous page
+    columns, cursor_types, descending = BUSINESS_SORTS[sort]
+    if cursor:
+        statement = statement.where(
+            keyset_after(columns, decode_cursor(cursor, *cursor_types), descending)
+        )
+
+    statement = statement.order_by(*(c.desc() if descending else c.asc() for c in columns))
+    return statement.limit(limit + 1), columns
+
+
+def review_listing_statement(
+    business_id: int,
+    sentiment: Optional[ReviewSentiment] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Tuple[Select, Sequence]:
+    """
+    Build the newest-first review page query for a business.
+    """
+    statement = select(Review).where(Review.business_id == business_id)
+    if sentiment is not None:
+        statement = statement.where(Review.sentiment == sentiment.value)
+
+    # Continue after the last review of the previous page
+    if cursor:
+        statement = statement.where(
+            keyset_after(REVIEW_ORDER, decode_cursor(cursor, datetime.fromisoformat, int), descending=True)
+        )
+
+    statement = statement.order_by(*(c.desc() for c in REVIEW_ORDER))
+    return statement.limit(limit + 1), REVIEW_ORDER
+
+
+def page_of(rows: List, limit: int, columns: Sequence) -> Tuple[List, Optional[str]]:
+    """
+    Trim a fetched page to limit rows and build the next-page cursor.
+
+    Returns:
+        The page rows and the cursor for the next page (None on the last page)
+    """
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(*(getattr(last, c.key) for c in columns))
+
+
+# ============================================
+# Route logic
+# ============================================
+
+def _next_cursor_headers(next_cursor: Optional[str]) -> dict:
+    return {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+
+def _business_version(db: Session, business_id: int, missing_detail: str) -> int:
+    """
+    Version of a business (see app.response_cache), or a 404 if it does not exist.
+    """
+    version = db.scalar(select(Business.version).where(Business.id == business_id))
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=missing_detail.format(business_id=business_id)
+        )
+    return version
+
+
+def register_user(db: Session, user_info: UserCreate) -> User:
+    """
+    Create a user account after checking the username and email are free.
+    """
+    # Check username availability
+    if db.scalar(select(User.id).where(User.username == user_info.username)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This username is already taken"
+        )
+
+    # Check email availability
+    if db.scalar(select(User.id).where(User.email == user_info.email)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This email is already registered"
+        )
+
+    user_instance = User(
+        username=user_info.username,
+        email=user_info.email,
+        hashed_password=hash_password(user_info.password)
+    )
+    db.add(user_instance)
+    db.commit()
+    db.refresh(user_instance)
+    return user_instance
+
+
+def login_user(db: Session, login_info: UserLogin) -> dict:
+    """
+    Check a username and password and issue an access token.
+    """
+    user_account = db.scalar(select(User).where(User.username == login_info.username))
+    if not user_account or not verify_password(login_info.password, user_account.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password"
+        )
+
+    access_token = create_access_token(
+        data={
+            "user_id": user_account.id,
+            "username": user_account.username,
+            "ver": user_account.token_version
+        },
+        expires_delta=timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
+    )
+    return {
+        "message": "Authentication successful",
+        "access_token": access_token,
+        "token_type": "bearer",
+        "user": user_account
+    }
+
+
+def business_page(
+    db: Session,
+    request: Request,
+    category: Optional[str],
+    min_score: Optional[float],
+    sort: BusinessSort,
+    limit: int,
+    cursor: Optional[str],
+) -> Response:
+    """
+    GET /businesses: a 304, a cached body or a freshly built page.
+    """
+    statement, columns = business_listing_statement(category, min_score, sort, limit, cursor)
+    businesses = db.scalars(statement).all()
+
+    # The page changes only if its businesses or their versions do; a 304
+    # or a cached body still saves the serialization
+    etag = make_etag(
+        "businesses", category, min_score, sort.value, limit, cursor,
+        [(business.id, business.version) for business in businesses]
+    )
+    cached = cached_response(request, etag)
+    if cached is not None:
+        return cached
+
+    business_list, next_cursor = page_of(businesses, limit, columns)
+    return store_response(
+        etag, serialize(BUSINESS_LIST_ADAPTER, business_list), _next_cursor_headers(next_cursor)
+    )
+
+
+def business_detail(db: Session, request: Request, business_id: int) -> Response:
+    """
+    GET /businesses/{id}: a 304, a cached body or the freshly loaded business.
+    """
+    version = _business_version(db, business_id, "Business with ID {business_id} not found")
+
+    etag = make_etag("business", business_id, version)
+    cached = cached_response(request, etag)
+    if cached is not None:
+        return cached
+
+    business_record = db.get(Business, business_id)
+    return store_response(etag, serialize(BUSINESS_ADAPTER, business_record))
+
+
+def business_vibe(db: Session, business_id: int, window_days: int, half_life_days: float) -> dict:
+    """
+    GET /businesses/{id}/vibe, answered from at most one rollup row per day.
+    """
+    business_record = db.get(Business, business_id)
+    if business_record is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Business with ID {business_id} not found"
+        )
+
+    today = datetime.utcnow().date()
+    statement = rollup_statement(business_id, summary_start(today, window_days, half_life_days), today)
+    return {
+        "business_id": business_id,
+        "aggregated_vibe_score": business_record.aggregated_vibe_score,
+        **vibe_summary(db.scalars(statement).all(), today, window_days, half_life_days)
+    }
+
+
+def business_vibe_trend(db: Session, business_id: int, days: int, bucket_days: int) -> dict:
+    """
+    GET /businesses/{id}/vibe/trend, oldest bucket first.
+    """
+    if db.scalar(select(Business.id).where(Business.id == business_id)) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Business with ID {business_id} not found"
+        )
+
+    today = datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+    rows = db.scalars(rollup_statement(business_id, start, today)).all()
+    return {
+        "business_id": business_id,
+        "bucket_days": bucket_days,
+        "points": vibe_trend(rows, start, days, bucket_days)
+    }
+
+
+def require_business(db: Session, business_id: int):
+    """
+    404 unless the business exists (checked before a review is scored).
+    """
+    _business_version(db, business_id, "Business with ID {business_id} does not exist")
+
+
+def initial_review_scores(content: str) -> dict:
+    """
+    Scores stored with a new review: pending when the pipeline scores it later.
+    """
+    if REVIEW_SCORING_MODE == "async":
+        return {"sentiment": PENDING_SENTIMENT}
+    return score_review(content)
+
+
+async def initial_review_scores_async(content: str) -> dict:
+    """
+    initial_review_scores for async routes; DS service calls block on HTTP
+    and run on the threadpool, the lexicon scorer runs inline.
+    """
+    if REVIEW_SCORING_MODE != "async" and DS_SERVICE_ENABLED:
+        return await run_in_threadpool(initial_review_scores, content)
+    return initial_review_scores(content)
+
+
+def store_review(
+    db: Session,
+    response: Response,
+    business_id: int,
+    review_info: ReviewCreate,
+    sentiment_analysis: dict,
+    user_id: int,
+) -> Review:
+    """
+    Insert a review with its business metrics in one transaction.
+
+    A review stored as pending is handed to the scoring pipeline and
+    answered with 202.
+    """
+    review_instance = Review(
+        user_id=user_id,
+        business_id=business_id,
+        content=review_info.content,
+        vibe_score=sentiment_analysis.get("vibe_score"),
+        sentiment=sentiment_analysis.get("sentiment"),
+        keywords=sentiment_analysis.get("keywords")
+    )
+    db.add(review_instance)
+
+    # Update business metrics in the same transaction as the insert
+    record_review_metrics(review_instance, db)
+
+    db.commit()
+    db.refresh(review_instance)
+
+    # Let the client read its own review from the primary (replica lag)
+    remember_write(response, user_id)
+
+    if REVIEW_SCORING_MODE == "async":
+        scoring_pipeline.submit(review_instance.id)
+        response.status_code = status.HTTP_202_ACCEPTED
+    return review_instance
+
+
+def business_reviews_page(
+    db: Session,
+    request: Request,
+    business_id: int,
+    sentiment: Optional[ReviewSentiment],
+    limit: int,
+    cursor: Optional[str],
+) -> Response:
+    """
+    GET /businesses/{id}/reviews: a 304, a cached body or a freshly built page.
+    """
+    # The business's version changes with every review write
+    version = _business_version(db, business_id, "Business with ID {business_id} does not exist")
+
+    etag = make_etag("reviews", business_id, version, sentiment and sentiment.value, limit, cursor)
+    cached = cached_response(request, etag)
+    if cached is not None:
+        return cached
+
+    statement, columns = review_listing_statement(business_id, sentiment, limit, cursor)
+    review_list, next_cursor = page_of(db.scalars(statement).all(), limit, columns)
+    return store_response(
+        etag, serialize(REVIEW_LIST_ADAPTER, review_list), _next_cursor_headers(next_cursor)
+    )
+
+
+def review_search_results(
+    db: Session,
+    response: Response,
+    q: str,
+    business_id: Optional[int],
+    sentiment: Optional[ReviewSentiment],
+    limit: int,
+    cursor: Optional[str],
+) -> List[dict]:
+    """
+    GET /search/reviews, best match first.
+    """
+    statement, offset = review_search_statement(q, business_id, sentiment, limit, cursor)
+    hits, next_cursor = search_page(db.execute(statement).all(), limit, offset)
+    response.headers.update(_next_cursor_headers(next_cursor))
+    return hits
+
+
+def business_search_results(
+    db: Session,
+    response: Response,
+    q: str,
+    category: Optional[str],
+    limit: int,
+    cursor: Optional[str],
+) -> List[dict]:
+    """
+    GET /search/businesses, best match first.
+    """
+    statement, offset = business_search_statement(q, category, limit, cursor)
+    hits, next_cursor = search_page(db.execute(statement).all(), limit, offset)
+    response.headers.update(_next_cursor_headers(next_cursor))
+    return hits
@@ -0,0 +1,108 @@
+"""
+Conditional GET and a versioned response cache for business and review reads.
+
+Every business carries a version, bumped in the same UPDATE as its running
+totals whenever one of its reviews is stored or scored. A read derives a
+strong ETag from its route, its parameters and the versions it depends on:
+
+- GET /businesses/{id} and /businesses/{id}/reviews: the business's version,
+  fetched first by a light query
+- GET /businesses: the (id, version) pairs of the page, read from the page
+  rows themselves (the listing is one query either way)
+
+A matching If-None-Match is answered with 304. Otherwise the serialized
+body is served from a bounded in-process LRU keyed by ETag, and only built
+(queried or serialized) on a miss. Old entries are never invalidated
+explicitly: a write changes the ETag, and they age out of the LRU.
+"""
+import hashlib
+from typing import List, Optional
+
+from fastapi import Request, Response, status
+from pydantic import TypeAdapter
+
+from app.cache import LRUCache
+from app.config import RESPONSE_CACHE_SIZE
+from app.metrics import register_cache_stats
+from app.schemas import BusinessResponse, ReviewResponse
+
+# Clients may keep responses but must revalidate them with their ETag
+CACHE_CONTROL = "no-cache"
+
+BUSINESS_ADAPTER = TypeAdapter(BusinessResponse)
+BUSINESS_LIST_ADAPTER = TypeAdapter(List[BusinessResponse])
+REVIEW_LIST_ADAPTER = TypeAdapter(List[ReviewResponse])
+
+# ETag -> (JSON body, extra headers)
+_bodies = LRUCache(RESPONSE_CACHE_SIZE)
+
+
+def make_etag(*parts) -> str:
+    """
+    Strong ETag of a response identified by its route, parameters and versions.
+    """
+    return '"' + hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison of an If-None-Match header against an ETag (RFC 9110).
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def serialize(adapter: TypeAdapter, value) -> bytes:
+    """
+    JSON body of ORM objects, as the route's response_model would render it.
+    """
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def _json_response(body: bytes, etag: str, headers: dict) -> Response:
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={**headers, "ETag": etag, "Cache-Control": CACHE_CONTROL}
+    )
+
+
+def cached_response(request: Request, etag: str) -> Optional[Response]:
+    """
+    A 304 or a cached body for the request, or None if it must be built.
+    """
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        )
+
+    entry = _bodies.get(etag)
+    if entry is not None:
+        body, headers = entry
+        return _json_response(body, etag, headers)
+    return None
+
+
+def store_response(etag: str, body: bytes, headers: Optional[dict] = None) -> Response:
+    """
+    Cache a freshly built body under its ETag and return it as the response.
+    """
+    headers = headers or {}
+    _bodies.set(etag, (body, headers))
+    return _json_response(body, etag, headers)
+
+
+def response_cache_stats() -> dict:
+    """
+    Hit/miss counters of the response body cache.
+    """
+    return {"responses": _bodies.stats()}
+
+
+register_cache_stats(response_cache_stats)
@@ -0,0 +1,257 @@
+"""
+Daily review rollups per business.
+
+Every review is folded into the business_daily_rollups row of its business
+and UTC day (review count, scored count, score sum and sentiment histogram)
+in the transaction that stores or scores it. Trailing-window scores,
+exponentially decayed scores and trend series are then computed from at
+most one row per day, however many reviews a business has.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional, Sequence
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.metrics import AGGREGATION_SECONDS, timed
+from app.models import BusinessDailyRollup, Review
+
+# Rollup column counting each sentiment label; other labels (e.g. pending)
+# are only counted in review_count
+SENTIMENT_COLUMNS = {
+    "positive": "positive_reviews",
+    "neutral": "neutral_reviews",
+    "negative": "negative_reviews",
+}
+
+COUNTER_COLUMNS = ("review_count", "scored_reviews", "vibe_score_sum") + tuple(SENTIMENT_COLUMNS.values())
+
+# Days older than this many half-lives weigh under 0.4% in a decayed score
+# and are left out of it
+DECAY_HORIZON_HALF_LIVES = 8
+
+
+class DailyRollupDeltas:
+    """
+    Rollup increments gathered per (business, day) and applied as one upsert.
+    """
+
+    def __init__(self):
+        self._deltas = defaultdict(lambda: dict.fromkeys(COUNTER_COLUMNS, 0))
+
+    def add(
+        self,
+        business_id: int,
+        created_at: datetime,
+        vibe_score: Optional[float] = None,
+        sentiment: Optional[str] = None,
+        reviews: int = 1,
+    ):
+        """
+        Count a review in the rollup of its business and day.
+
+        Parameters:
+            business_id: The ID of the review's business
+            created_at: The review's (naive UTC) creation time
+            vibe_score: Its vibe score, if it has been scored
+            sentiment: Its sentiment label
+            reviews: 1 for a new review, 0 when a stored review gets scored
+        """
+        delta = self._deltas[(business_id, created_at.date())]
+        delta["review_count"] += reviews
+        if vibe_score is not None:
+            delta["scored_reviews"] += 1
+            delta["vibe_score_sum"] += vibe_score
+        if sentiment in SENTIMENT_COLUMNS:
+            delta[SENTIMENT_COLUMNS[sentiment]] += 1
+
+    @timed(AGGREGATION_SECONDS, ("daily_rollups",))
+    def apply(self, database_session):
+        """
+        Upsert the gathered increments into business_daily_rollups.
+
+        Nothing is committed: the increments join the caller's transaction.
+        Rows are written in key order so concurrent writers lock them in
+        the same order.
+        """
+        if not self._deltas:
+            return
+
+        table = BusinessDailyRollup.__table__
+        dialect_name = database_session.get_bind().dialect.name
+        upsert = postgresql_insert if dialect_name == "postgresql" else sqlite_insert
+
+        statement = upsert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.business_id, table.c.day],
+            set_={
+                column: table.c[column] + statement.excluded[column]
+                for column in COUNTER_COLUMNS
+            },
+        )
+        database_session.execute(statement, [
+            {"business_id": business_id, "day": day, **self._deltas[(business_id, day)]}
+            for business_id, day in sorted(self._deltas)
+        ])
+        self._deltas.clear()
+
+
+@timed(AGGREGATION_SECONDS, ("rebuild_rollups",))
+def rebuild_daily_rollups(database_session, business_ids: Optional[Sequence[int]] = None) -> int:
+    """
+    Recompute the daily rollups from the reviews in one set-based pass.
+
+    Nothing is committed.
+
+    Parameters:
+        database_session: Active database session (or connection)
+        business_ids: Optional business IDs to limit the rebuild to
+
+    Returns:
+        The number of rollup rows written
+    """
+    table = BusinessDailyRollup.__table__
+    day = func.date(Review.created_at)
+
+    totals = select(
+        Review.business_id,
+        day,
+        func.count(Review.id),
+        func.count(Review.vibe_score),
+        func.coalesce(func.sum(Review.vibe_score), 0.0),
+        *(
+            func.coalesce(func.sum(case((Review.sentiment == label, 1), else_=0)), 0)
+            for label in SENTIMENT_COLUMNS
+        ),
+    ).group_by(Review.business_id, day)
+
+    clear = delete(table)
+    if business_ids is not None:
+        totals = totals.where(Review.business_id.in_(business_ids))
+        clear = clear.where(table.c.business_id.in_(business_ids))
+
+    database_session.execute(clear)
+    return database_session.execute(
+        insert(table).from_select(("business_id", "day") + COUNTER_COLUMNS, totals)
+    ).rowcount
+
+
+def rollup_statement(business_id: int, since: date, until: date):
+    """
+    Build the query of a business's rollups from since to until, inclusive.
+    """
+    return select(BusinessDailyRollup).where(
+        BusinessDailyRollup.business_id == business_id,
+        BusinessDailyRollup.day >= since,
+        BusinessDailyRollup.day <= until,
+    ).order_by(BusinessDailyRollup.day)
+
+
+def summary_start(today: date, window_days: int, half_life_days: float) -> date:
+    """
+    First day of the rollups needed by vibe_summary.
+    """
+    horizon_days = max(window_days, int(half_life_days * DECAY_HORIZON_HALF_LIVES))
+    return today - timedelta(days=horizon_days - 1)
+
+
+class _Totals:
+    """
+    Sums of a run of rollup rows.
+    """
+
+    def __init__(self):
+        self.reviews = 0
+        self.scored_reviews = 0
+        self.score_sum = 0.0
+        self.sentiment = dict.fromkeys(SENTIMENT_COLUMNS, 0)
+
+    def add(self, row: BusinessDailyRollup):
+        self.reviews += row.review_count
+        self.scored_reviews += row.scored_reviews
+        self.score_sum += row.vibe_score_sum
+        for label, column in SENTIMENT_COLUMNS.items():
+            self.sentiment[label] += getattr(row, column)
+
+    @property
+    def vibe_score(self) -> Optional[float]:
+        if not self.scored_reviews:
+            return None
+        return round(self.score_sum / self.scored_reviews, 2)
+
+
+def vibe_summary(
+    rows: Iterable[BusinessDailyRollup],
+    today: date,
+    window_days: int,
+    half_life_days: float,
+) -> dict:
+    """
+    Trailing-window and exponentially decayed vibe scores.
+
+    Parameters:
+        rows: Rollups of one business from summary_start() to today
+        today: The current UTC day, counted in the window
+        window_days: Days in the trailing window, today included
+        half_life_days: Age in days at which a review weighs half as much
+
+    Returns:
+        The window's review count, score and sentiment histogram, and the
+        decayed score (scores are None without scored reviews)
+    """
+    window_start = today - timedelta(days=window_days - 1)
+    window = _Totals()
+    decayed_sum = 0.0
+    decayed_count = 0.0
+
+    for row in rows:
+        if row.day >= window_start:
+            window.add(row)
+        weight = 0.5 ** (max((today - row.day).days, 0) / half_life_days)
+        decayed_sum += weight * row.vibe_score_sum
+        decayed_count += weight * row.scored_reviews
+
+    return {
+        "window_days": window_days,
+        "window_reviews": window.reviews,
+        "window_vibe_score": window.vibe_score,
+        "window_sentiment": window.sentiment,
+        "half_life_days": half_life_days,
+        "decayed_vibe_score": round(decayed_sum / decayed_count, 2) if decayed_count else None,
+    }
+
+
+def vibe_trend(
+    rows: Iterable[BusinessDailyRollup],
+    start: date,
+    days: int,
+    bucket_days: int,
+) -> List[dict]:
+    """
+    Per-bucket review counts, scores and sentiment histograms.
+
+    Every bucket from start is returned, including empty ones; the last
+    bucket is shorter when days is not a multiple of bucket_days.
+
+    Parameters:
+        rows: Rollups of one business from start to start + days - 1
+        start: First day of the series
+        days: Days covered by the series
+        bucket_days: Days per bucket (1 for daily, 7 for weekly points)
+    """
+    buckets = [_Totals() for _ in range(0, days, bucket_days)]
+    for row in rows:
+        buckets[(row.day - start).days // bucket_days].add(row)
+
+    return [
+        {
+            "start": start + timedelta(days=index * bucket_days),
+            "reviews": totals.reviews,
+            "scored_reviews": totals.scored_reviews,
+            "vibe_score": totals.vibe_score,
+            "sentiment": totals.sentiment,
+        }
+        for index, totals in enumerate(buckets)
+    ]
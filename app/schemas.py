@@ -1,6 +1,7 @@
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
+from enum import Enum
 
 
 # User schemas
@@ -26,6 +27,13 @@ class UserResponse(BaseModel):
 
 
 # Business schemas
+class BusinessSort(str, Enum):
+    id = "id"
+    score = "score"
+    reviews = "reviews"
+    recent = "recent"
+
+
 class BusinessResponse(BaseModel):
     id: int
     name: str
@@ -39,11 +47,67 @@ class BusinessResponse(BaseModel):
         from_attributes = True
 
 
+class SentimentHistogram(BaseModel):
+    positive: int
+    neutral: int
+    negative: int
+
+
+class VibeSummaryResponse(BaseModel):
+    business_id: int
+    aggregated_vibe_score: float
+    window_days: int
+    window_reviews: int
+    window_vibe_score: Optional[float]
+    window_sentiment: SentimentHistogram
+    half_life_days: float
+    decayed_vibe_score: Optional[float]
+
+
+class VibeTrendPoint(BaseModel):
+    start: date
+    reviews: int
+    scored_reviews: int
+    vibe_score: Optional[float]
+    sentiment: SentimentHistogram
+
+
+class VibeTrendResponse(BaseModel):
+    business_id: int
+    bucket_days: int
+    points: List[VibeTrendPoint]
+
+
 # Review schemas
+class ReviewSentiment(str, Enum):
+    positive = "positive"
+    neutral = "neutral"
+    negative = "negative"
+    pending = "pending"
+
+
 class ReviewCreate(BaseModel):
     content: str = Field(..., min_length=10)
 
 
+class BulkReviewItem(ReviewCreate):
+    business_id: int
+    # Original posting time of an imported review (defaults to now)
+    created_at: Optional[datetime] = None
+
+
+class BulkReviewError(BaseModel):
+    index: int
+    detail: str
+
+
+class BulkReviewResponse(BaseModel):
+    received: int
+    created: int
+    failed: int
+    errors: List[BulkReviewError]
+
+
 class ReviewResponse(BaseModel):
     id: int
     user_id: int
@@ -58,6 +122,38 @@ class ReviewResponse(BaseModel):
         from_attributes = True
 
 
+# Search schemas
+class ReviewSearchHit(ReviewResponse):
+    rank: float
+    snippet: str
+
+
+class BusinessSearchHit(BusinessResponse):
+    rank: float
+    snippet: str
+
+
+# Export schemas
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+# Admin schemas
+class MetricsChange(BaseModel):
+    business_id: int
+    old_score: Optional[float]
+    new_score: float
+    old_total_reviews: Optional[int]
+    new_total_reviews: int
+
+
+class RecomputeMetricsResponse(BaseModel):
+    businesses_checked: int
+    businesses_changed: int
+    changes: List[MetricsChange]
+
+
 # General response schemas
 class MessageResponse(BaseModel):
     message: str
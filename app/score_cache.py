@@ -0,0 +1,110 @@
+"""
+Cache of sentiment scores keyed by normalized review content.
+
+Keys combine the scorer version with a hash of the normalized text, so a
+new lexicon or model version never sees scores produced by the old one.
+Lookups hit a bounded in-memory LRU first and then, when SCORE_CACHE_PATH
+is set, a SQLite file shared by every worker on the host.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from typing import Iterable, Optional, Tuple
+
+from app.cache import LRUCache
+
+
+def normalize_review_text(review_content: str) -> str:
+    """
+    Normalize review text so trivially different copies share a cache entry.
+
+    The lexicon scorer is case-insensitive and ignores runs of whitespace
+    (as does the default uncased transformer model), so the normalized text
+    scores like the original.
+    """
+    return " ".join(review_content.lower().split())
+
+
+def content_key(scorer_version: str, normalized_text: str) -> str:
+    return hashlib.sha256(f"{scorer_version}\0{normalized_text}".encode()).hexdigest()
+
+
+class ScoringCache:
+    """
+    Two-tier (memory, optional SQLite) cache of scores for one scorer version.
+    """
+
+    def __init__(self, scorer_version: str, maxsize: int, path: str = ""):
+        self.scorer_version = scorer_version
+        self.memory = LRUCache(maxsize)
+        self.persistent_hits = 0
+        self.persistent_misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS score_cache ("
+                " key TEXT PRIMARY KEY, scorer_version TEXT NOT NULL, result TEXT NOT NULL)"
+            )
+            # Scores from any other lexicon/model version can never be hit again
+            self._db.execute(
+                "DELETE FROM score_cache WHERE scorer_version != ?", (scorer_version,)
+            )
+
+    def get(self, normalized_text: str) -> Optional[dict]:
+        """
+        Return the cached score for already-normalized text, or None.
+        """
+        key = content_key(self.scorer_version, normalized_text)
+        result = self.memory.get(key)
+        if result is not None or self._db is None:
+            return result
+
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT result FROM score_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.persistent_misses += 1
+                return None
+            self.persistent_hits += 1
+
+        result = json.loads(row[0])
+        self.memory.set(key, result)
+        return result
+
+    def set_many(self, entries: Iterable[Tuple[str, dict]]):
+        """
+        Store (normalized text, score) pairs in both tiers.
+        """
+        rows = []
+        for normalized_text, result in entries:
+            key = content_key(self.scorer_version, normalized_text)
+            self.memory.set(key, result)
+            rows.append((key, self.scorer_version, json.dumps(result)))
+
+        if self._db is not None and rows:
+            with self._db_lock:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO score_cache (key, scorer_version, result) VALUES (?, ?, ?)",
+                    rows,
+                )
+
+    def stats(self) -> dict:
+        stats = dict(self.memory.stats(), scorer_version=self.scorer_version)
+        if self._db is not None:
+            stats["persistent_hits"] = self.persistent_hits
+            stats["persistent_misses"] = self.persistent_misses
+        return stats
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
+
@@ -0,0 +1,164 @@
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from app.config import DS_SERVICE_ENABLED, SCORE_CACHE_SIZE, SCORE_CACHE_PATH
+from app.ds_client import get_ds_client
+from app.metrics import SCORED_REVIEWS, SCORING_SECONDS, register_cache_stats, timed
+from app.score_cache import ScoringCache, normalize_review_text
+from app.utils import analyze_review_sentiment, analyze_review_sentiments, lexicon_scorer
+
+
+def _active_scorer() -> Tuple[str, Callable[[str], dict], Callable[[List[str]], List[dict]]]:
+    """
+    Return (version, score one, score many) for the configured scorer.
+    """
+    if DS_SERVICE_ENABLED:
+        client = get_ds_client()
+        return client.version, client.score, client.score_many
+    return lexicon_scorer.version, analyze_review_sentiment, analyze_review_sentiments
+
+
+_cache: Optional[ScoringCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_scoring_cache() -> Optional[ScoringCache]:
+    """
+    Return the process-wide score cache, or None when caching is disabled.
+    """
+    global _cache
+    if _cache is None and (SCORE_CACHE_SIZE > 0 or SCORE_CACHE_PATH):
+        with _cache_lock:
+            if _cache is None:
+                _cache = ScoringCache(_active_scorer()[0], SCORE_CACHE_SIZE, SCORE_CACHE_PATH)
+    return _cache
+
+
+def close_scoring_cache():
+    """
+    Close the process-wide score cache if one was created.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+
+
+def scoring_cache_stats() -> dict:
+    """
+    Hit/miss counters of the score cache's memory and persistent tiers.
+    """
+    cache = _cache
+    if cache is None:
+        return {}
+    stats = cache.stats()
+    tiers = {"scores": stats}
+    if "persistent_hits" in stats:
+        tiers["scores_persistent"] = {
+            "hits": stats["persistent_hits"],
+            "misses": stats["persistent_misses"],
+        }
+    return tiers
+
+
+register_cache_stats(scoring_cache_stats)
+
+
+def _store(cache: ScoringCache, normalized_texts: List[str], results: List[dict]) -> List[dict]:
+    """
+    Cache results produced by the active scorer and strip their version tags.
+
+    Results from a fallback scorer carry a different scorer_version and are
+    returned but not cached.
+    """
+    cacheable = []
+    plain_results = []
+    for text, result in zip(normalized_texts, results):
+        version = result.pop("scorer_version", cache.scorer_version)
+        if version == cache.scorer_version:
+            cacheable.append((text, result))
+        plain_results.append(result)
+    cache.set_many(cacheable)
+    return plain_results
+
+
+def _timed_score_one(score_one: Callable[[str], dict], review_content: str) -> dict:
+    SCORED_REVIEWS.inc(("single",))
+    with timed(SCORING_SECONDS, ("single",)):
+        return score_one(review_content)
+
+
+def _timed_score_many(score_many: Callable[[List[str]], List[dict]], review_contents: List[str]) -> List[dict]:
+    SCORED_REVIEWS.inc(("batch",), len(review_contents))
+    with timed(SCORING_SECONDS, ("batch",)):
+        return score_many(review_contents)
+
+
+def score_review(review_content: str) -> dict:
+    """
+    Score a review with the configured scorer.
+    
+    Uses the DS service when DS_SERVICE_ENABLED is set (falling back to the
+    lexicon scorer if it is unavailable), otherwise the lexicon scorer.
+    Repeated texts are served from the score cache.
+    
+    Parameters:
+        review_content: The text content of the review
+        
+    Returns:
+        Dictionary with vibe_score, sentiment, and keywords (as JSON string)
+    """
+    _, score_one, _ = _active_scorer()
+    cache = get_scoring_cache()
+    if cache is None:
+        result = _timed_score_one(score_one, review_content)
+        result.pop("scorer_version", None)
+        return result
+    
+    normalized_text = normalize_review_text(review_content)
+    cached = cache.get(normalized_text)
+    if cached is not None:
+        return dict(cached)
+    
+    return dict(_store(cache, [normalized_text], [_timed_score_one(score_one, normalized_text)])[0])
+
+
+def score_reviews(review_contents: List[str]) -> List[dict]:
+    """
+    Score a batch of reviews with the configured scorer.
+    
+    Cached texts are answered from the cache; the remaining distinct texts
+    are scored in one call.
+    
+    Parameters:
+        review_contents: The text content of each review
+        
+    Returns:
+        One score_review result per review, in input order
+    """
+    _, _, score_many = _active_scorer()
+    cache = get_scoring_cache()
+    if cache is None:
+        results = _timed_score_many(score_many, review_contents)
+        for result in results:
+            result.pop("scorer_version", None)
+        return results
+    
+    normalized_texts = [normalize_review_text(content) for content in review_contents]
+    found = {}
+    missing = []
+    for text in normalized_texts:
+        if text in found:
+            continue
+        cached = cache.get(text)
+        if cached is None:
+            missing.append(text)
+            found[text] = None
+        else:
+            found[text] = cached
+    
+    if missing:
+        found.update(zip(missing, _store(cache, missing, _timed_score_many(score_many, missing))))
+    
+    return [dict(found[text]) for text in normalized_texts]
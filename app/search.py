@@ -0,0 +1,221 @@
+"""
+Full-text search over review content and business names (SQLite FTS5).
+
+The reviews_fts and businesses_fts indexes are external-content FTS5
+tables kept in sync with reviews and businesses by the triggers created in
+migration f51d8e3a6b70. Hits are ordered by BM25 (best match first).
+
+BM25 scores depend on corpus statistics that change with every write, so
+a score is no stable sort key across requests. Search pages therefore use
+an offset cursor capped at MAX_SEARCH_DEPTH hits; under live writes a hit
+can still move between pages, but only by its change in relative rank.
+
+User input never reaches the FTS5 query syntax: every word is quoted as a
+phrase and the words are ANDed, with a trailing * kept as a prefix search.
+Snippets are HTML-escaped with the matched terms wrapped in <mark>.
+
+Only SQLite databases have the indexes; elsewhere the search routes answer
+501.
+"""
+import html
+import re
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.sql import Select
+
+from app.database import READ_SQLALCHEMY_DATABASE_URL, is_sqlite
+from app.models import Business, Review
+from app.pagination import encode_cursor, decode_cursor
+from app.schemas import ReviewSentiment
+
+# Words of a search query used at most
+MAX_QUERY_TERMS = 16
+
+# Tokens of review text around the matches in a snippet
+SNIPPET_TOKENS = 16
+
+# Deepest hit reachable by paging; search is for finding, not crawling
+MAX_SEARCH_DEPTH = 500
+
+# BM25 weights of the businesses_fts columns (name, category)
+BUSINESS_COLUMN_WEIGHTS = (10.0, 1.0)
+
+# Private-use characters marking matches until the snippet is escaped
+_MARK_START = "\ue000"
+_MARK_END = "\ue001"
+
+_TERM = re.compile(r"\w+\*?")
+
+reviews_fts = table("reviews_fts", column("rowid"))
+businesses_fts = table("businesses_fts", column("rowid"))
+
+REVIEW_HIT_COLUMNS = (
+    Review.id, Review.user_id, Review.business_id, Review.content,
+    Review.vibe_score, Review.sentiment, Review.keywords, Review.created_at,
+)
+BUSINESS_HIT_COLUMNS = (
+    Business.id, Business.name, Business.category, Business.location,
+    Business.aggregated_vibe_score, Business.total_reviews, Business.created_at,
+)
+
+SEARCH_AVAILABLE = is_sqlite(READ_SQLALCHEMY_DATABASE_URL)
+
+
+def match_expression(query: str) -> str:
+    """
+    Turn free text into an FTS5 query matching rows containing every word.
+
+    Raises:
+        HTTPException: If the query has no searchable words
+    """
+    terms = []
+    for term in _TERM.findall(query)[:MAX_QUERY_TERMS]:
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if term:
+            terms.append(f'"{term}"*' if prefix else f'"{term}"')
+    if not terms:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Search query has no searchable words"
+        )
+    return " AND ".join(terms)
+
+
+def _require_search():
+    if not SEARCH_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Full-text search needs the SQLite FTS5 indexes"
+        )
+
+
+def search_offset(cursor: Optional[str]) -> int:
+    """
+    Number of hits skipped by a search page cursor (0 without one).
+
+    Raises:
+        HTTPException: If the cursor is malformed or past MAX_SEARCH_DEPTH
+    """
+    if not cursor:
+        return 0
+    offset, = decode_cursor(cursor, int)
+    if not 0 <= offset < MAX_SEARCH_DEPTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    return offset
+
+
+def _ranked_page(statement: Select, rank, key_column, limit: int, offset: int) -> Tuple[Select, int]:
+    # Best match first, ties broken by id; never past MAX_SEARCH_DEPTH
+    limit = min(limit, MAX_SEARCH_DEPTH - offset)
+    statement = statement.order_by(rank, key_column)
+    return statement.offset(offset).limit(limit + 1), offset
+
+
+def review_search_statement(
+    query: str,
+    business_id: Optional[int] = None,
+    sentiment: Optional[ReviewSentiment] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Tuple[Select, int]:
+    """
+    Build the GET /search/reviews page query (one extra row to detect more
+    pages) and return it with the offset of its first hit.
+    """
+    _require_search()
+    fts = literal_column("reviews_fts")
+    rank = func.bm25(fts)
+    snippet = func.snippet(fts, 0, _MARK_START, _MARK_END, "…", SNIPPET_TOKENS)
+
+    statement = (
+        select(*REVIEW_HIT_COLUMNS, rank.label("rank"), snippet.label("snippet"))
+        .select_from(reviews_fts)
+        .join(Review, Review.id == reviews_fts.c.rowid)
+        .where(fts.op("MATCH")(match_expression(query)))
+    )
+    if business_id is not None:
+        statement = statement.where(Review.business_id == business_id)
+    if sentiment is not None:
+        statement = statement.where(Review.sentiment == sentiment.value)
+
+    return _ranked_page(statement, rank, Review.id, limit, search_offset(cursor))
+
+
+def business_search_statement(
+    query: str,
+    category: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Tuple[Select, int]:
+    """
+    Build the GET /search/businesses page query and its offset; name matches
+    outrank category ones.
+    """
+    _require_search()
+    fts = literal_column("businesses_fts")
+    rank = func.bm25(fts, *BUSINESS_COLUMN_WEIGHTS)
+    highlight = func.highlight(fts, 0, _MARK_START, _MARK_END)
+
+    statement = (
+        select(*BUSINESS_HIT_COLUMNS, rank.label("rank"), highlight.label("snippet"))
+        .select_from(businesses_fts)
+        .join(Business, Business.id == businesses_fts.c.rowid)
+        .where(fts.op("MATCH")(match_expression(query)))
+    )
+    if category is not None:
+        statement = statement.where(Business.category == category)
+
+    return _ranked_page(statement, rank, Business.id, limit, search_offset(cursor))
+
+
+def highlight_snippet(snippet: Optional[str]) -> str:
+    """
+    HTML-escape a snippet and turn its match markers into <mark> tags.
+    """
+    escaped = html.escape(snippet or "", quote=False)
+    return escaped.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+def search_page(rows: List, limit: int, offset: int) -> Tuple[List[dict], Optional[str]]:
+    """
+    Response dicts of a fetched search page and the cursor of the next one.
+
+    Returns:
+        The page hits and the next-page cursor (None on the last reachable page)
+    """
+    limit = min(limit, MAX_SEARCH_DEPTH - offset)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        if offset + limit < MAX_SEARCH_DEPTH:
+            next_cursor = encode_cursor(offset + limit)
+
+    hits = []
+    for row in rows:
+        hit = dict(row._mapping)
+        hit["snippet"] = highlight_snippet(hit["snippet"])
+        hits.append(hit)
+    return hits, next_cursor
+
+
+def rebuild_search_index(connection, optimize: bool = False):
+    """
+    Reindex every review and business from scratch.
+
+    Needed after writes that bypassed the triggers (e.g. a restored backup);
+    optimize merges the index segments afterwards for faster queries.
+
+    Parameters:
+        connection: Connection or Session on the SQLite database
+        optimize: Also merge the FTS5 b-trees into one
+    """
+    for index in ("reviews_fts", "businesses_fts"):
+        connection.execute(text(f"INSERT INTO {index}({index}) VALUES ('rebuild')"))
+        if optimize:
+            connection.execute(text(f"INSERT INTO {index}({index}) VALUES ('optimize')"))
@@ -1,41 +1,99 @@
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import Float, Numeric, case, cast, exists, func, select, type_coerce, update
 from sqlalchemy.orm import Session
 from app.models import Business, Review
-import requests
-from app.config import DS_SERVICE_ENDPOINT
+from app.lexicon import LexiconScorer
+from app.metrics import AGGREGATION_SECONDS, timed
+from app.rollups import DailyRollupDeltas, rebuild_daily_rollups
+
+
+def _rounded_mean(score_sum, scored_count):
+    """
+    SQL expression for the 2-decimal mean used by aggregated_vibe_score.
+    """
+    return case(
+        (scored_count > 0, func.round(cast(score_sum / scored_count, Numeric), 2)),
+        else_=0.0,
+    )
 
 
-def compute_aggregated_vibe_score(business_id: int, database_session: Session) -> float:
+@timed(AGGREGATION_SECONDS, ("business_totals",))
+def apply_business_metrics_delta(
+    business_id: int,
+    database_session: Session,
+    score_sum: float = 0.0,
+    scored_reviews: int = 0,
+    total_reviews: int = 0,
+):
     """
-    Compute the aggregated Vibe Score for a business from all reviews.
+    Apply a delta to the running totals of a business in a single UPDATE.
+    
+    The cost is constant regardless of how many reviews the business has.
+    The business's version is bumped so cached read responses go stale.
+    Nothing is committed: the change joins the caller's transaction, so the
+    review insert and the aggregate update land (or roll back) together.
     
     Parameters:
         business_id: The ID of the business
         database_session: Active database session
-        
-    Returns:
-        The average vibe score (0-100)
+        score_sum: Sum of the vibe scores being added
+        scored_reviews: Number of added reviews that carry a vibe score
+        total_reviews: Number of added reviews
     """
-    all_reviews = database_session.query(Review).filter(
-        Review.business_id == business_id
-    ).all()
+    new_sum = Business.vibe_score_sum + score_sum
+    new_scored = Business.scored_reviews + scored_reviews
     
-    if not all_reviews:
-        return 0.0
+    database_session.execute(
+        update(Business)
+        .where(Business.id == business_id)
+        .values(
+            vibe_score_sum=new_sum,
+            scored_reviews=new_scored,
+            total_reviews=Business.total_reviews + total_reviews,
+            aggregated_vibe_score=_rounded_mean(new_sum, new_scored),
+            version=Business.version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def record_review_metrics(review: Review, database_session: Session):
+    """
+    Fold a newly inserted review into its business's running totals and
+    the daily rollup of its business and day.
     
-    # Get reviews with valid vibe scores
-    scores = [r.vibe_score for r in all_reviews if r.vibe_score is not None]
+    Parameters:
+        review: The review being inserted
+        database_session: Active database session
+    """
+    if review.created_at is None:
+        # Stamped now so the review is stored with the day it is rolled up on
+        review.created_at = datetime.utcnow()
     
-    if not scores:
-        return 0.0
+    scored = review.vibe_score is not None
+    apply_business_metrics_delta(
+        review.business_id,
+        database_session,
+        score_sum=review.vibe_score if scored else 0.0,
+        scored_reviews=1 if scored else 0,
+        total_reviews=1,
+    )
     
-    # Calculate mean
-    average = sum(scores) / len(scores)
-    return round(average, 2)
+    rollup = DailyRollupDeltas()
+    rollup.add(review.business_id, review.created_at, review.vibe_score, review.sentiment)
+    rollup.apply(database_session)
 
 
+@timed(AGGREGATION_SECONDS, ("refresh_business",))
 def refresh_business_metrics(business_id: int, database_session: Session):
     """
-    Refresh the aggregated metrics for a business.
+    Recompute the aggregated metrics for a business from its reviews.
+    
+    This is the repair path: it rescans every review of the business and
+    overwrites the running totals kept by apply_business_metrics_delta and
+    the business's daily rollups.
     
     Parameters:
         business_id: The ID of the business
@@ -46,18 +104,219 @@ def refresh_business_metrics(business_id: int, database_session: Session):
     ).first()
     
     if target_business:
-        # Update vibe score
-        target_business.aggregated_vibe_score = compute_aggregated_vibe_score(
-            business_id, database_session
-        )
-        
-        # Update review count
-        review_count = database_session.query(Review).filter(
+        review_count, scored_count, score_sum = database_session.query(
+            func.count(Review.id),
+            func.count(Review.vibe_score),
+            func.coalesce(func.sum(Review.vibe_score), 0.0),
+        ).filter(
             Review.business_id == business_id
-        ).count()
+        ).one()
+        
         target_business.total_reviews = review_count
+        target_business.scored_reviews = scored_count
+        target_business.vibe_score_sum = score_sum
+        target_business.aggregated_vibe_score = (
+            round(score_sum / scored_count, 2) if scored_count else 0.0
+        )
+        target_business.version = Business.version + 1
+        rebuild_daily_rollups(database_session, [business_id])
+        
+        database_session.commit()
+
+
+
+@timed(AGGREGATION_SECONDS, ("recompute_all",))
+def recompute_business_metrics(database_session: Session) -> int:
+    """
+    Recompute the running totals of every business in one set-based pass.
+    
+    A single GROUP BY over the reviews feeds one UPDATE of the businesses
+    that have reviews, and a second UPDATE zeroes those that have none.
+    Nothing is committed.
+    
+    Parameters:
+        database_session: Active database session (or connection)
+        
+    Returns:
+        The number of businesses with reviews
+    """
+    totals = select(
+        Review.business_id,
+        func.count(Review.id).label("total_reviews"),
+        func.count(Review.vibe_score).label("scored_reviews"),
+        func.coalesce(func.sum(Review.vibe_score), 0.0).label("score_sum"),
+    ).group_by(Review.business_id).subquery()
+    
+    result = database_session.execute(
+        update(Business)
+        .where(Business.id == totals.c.business_id)
+        .values(
+            total_reviews=totals.c.total_reviews,
+            scored_reviews=totals.c.scored_reviews,
+            vibe_score_sum=totals.c.score_sum,
+            aggregated_vibe_score=_rounded_mean(totals.c.score_sum, totals.c.scored_reviews),
+            version=Business.version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    
+    database_session.execute(
+        update(Business)
+        .where(~exists().where(Review.business_id == Business.id))
+        .values(
+            total_reviews=0, scored_reviews=0, vibe_score_sum=0.0, aggregated_vibe_score=0.0,
+            version=Business.version + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    
+    return result.rowcount
+
+
+@timed(AGGREGATION_SECONDS, ("reconcile",))
+def reconcile_business_metrics(
+    database_session: Session,
+    chunk_size: int = 1000,
+    business_ids: Optional[Sequence[int]] = None,
+) -> Tuple[int, List[dict]]:
+    """
+    Repair drifted business aggregates, chunk by chunk, alongside live traffic.
+    
+    Businesses are processed in ID order, chunk_size at a time, one
+    transaction per chunk:
+    
+    1. The chunk's business rows are locked (FOR UPDATE where supported)
+       so concurrent review inserts wait for the chunk instead of having
+       their running-total deltas overwritten.
+    2. One COUNT/SUM/AVG query grouped by business_id computes the true
+       totals of the chunk.
+    3. Only businesses whose stored values differ are rewritten, from
+       correlated subqueries so the write is consistent on its own, and
+       their daily rollups are rebuilt.
+    
+    Parameters:
+        database_session: Active database session
+        chunk_size: Businesses per chunk (and per transaction)
+        business_ids: Optional business IDs to limit the repair to
+        
+    Returns:
+        The number of businesses checked and one entry per changed business
+        with its old and new aggregated_vibe_score and total_reviews
+    """
+    checked = 0
+    changes = []
+    last_id = 0
+    
+    while True:
+        chunk_query = select(
+            Business.id,
+            Business.aggregated_vibe_score,
+            Business.total_reviews,
+            Business.scored_reviews,
+            Business.vibe_score_sum,
+        ).where(Business.id > last_id)
+        if business_ids:
+            chunk_query = chunk_query.where(Business.id.in_(business_ids))
+        stored = database_session.execute(
+            chunk_query.order_by(Business.id).limit(chunk_size).with_for_update()
+        ).all()
+        if not stored:
+            break
+        last_id = stored[-1].id
+        
+        scored_count = func.count(Review.vibe_score)
+        score_sum = func.coalesce(func.sum(Review.vibe_score), 0.0)
+        totals = {
+            row.business_id: row
+            for row in database_session.execute(
+                select(
+                    Review.business_id,
+                    func.count(Review.id).label("total_reviews"),
+                    scored_count.label("scored_reviews"),
+                    score_sum.label("score_sum"),
+                    type_coerce(_rounded_mean(score_sum, scored_count), Float).label("score"),
+                )
+                .where(Review.business_id.in_([row.id for row in stored]))
+                .group_by(Review.business_id)
+            )
+        }
+        
+        changed_ids = []
+        for row in stored:
+            actual = totals.get(row.id)
+            new_total, new_scored, new_sum, new_score = (
+                (actual.total_reviews, actual.scored_reviews, float(actual.score_sum), float(actual.score))
+                if actual else (0, 0, 0.0, 0.0)
+            )
+            if (
+                row.total_reviews != new_total
+                or row.scored_reviews != new_scored
+                or abs((row.vibe_score_sum or 0.0) - new_sum) > 1e-6
+                or row.aggregated_vibe_score is None
+                or abs(row.aggregated_vibe_score - new_score) > 1e-9
+            ):
+                changed_ids.append(row.id)
+                changes.append({
+                    "business_id": row.id,
+                    "old_score": row.aggregated_vibe_score,
+                    "new_score": new_score,
+                    "old_total_reviews": row.total_reviews,
+                    "new_total_reviews": new_total,
+                })
+        
+        if changed_ids:
+            review_count = select(func.count(Review.id)).where(Review.business_id == Business.id).scalar_subquery()
+            review_scored = select(scored_count).where(Review.business_id == Business.id).scalar_subquery()
+            review_sum = select(score_sum).where(Review.business_id == Business.id).scalar_subquery()
+            database_session.execute(
+                update(Business)
+                .where(Business.id.in_(changed_ids))
+                .values(
+                    total_reviews=review_count,
+                    scored_reviews=review_scored,
+                    vibe_score_sum=review_sum,
+                    aggregated_vibe_score=_rounded_mean(review_sum, review_scored),
+                    version=Business.version + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            rebuild_daily_rollups(database_session, changed_ids)
         
         database_session.commit()
+        checked += len(stored)
+    
+    return checked, changes
+
+# Sentiment lexicon
+POSITIVE_WORDS = {
+    'good', 'great', 'excellent', 'amazing', 'awesome', 'fantastic', 'wonderful',
+    'love', 'best', 'perfect', 'brilliant', 'outstanding', 'superb', 'exceptional',
+    'impressed', 'satisfied', 'happy', 'friendly', 'clean', 'nice', 'pleasant',
+    'delicious', 'tasty', 'professional', 'quick', 'efficient', 'helpful', 'recommend'
+}
+
+NEGATIVE_WORDS = {
+    'bad', 'terrible', 'awful', 'horrible', 'hate', 'worst', 'poor', 'disgusting',
+    'rude', 'slow', 'dirty', 'overpriced', 'disappointing', 'waste', 'useless',
+    'unprofessional', 'broken', 'uncomfortable', 'cold', 'bland', 'stale',
+    'quit', 'avoid', 'disgusted', 'angry', 'frustrated', 'disappointed',
+    'below', 'subpar', 'lacking', 'missing', 'incomplete', 'mediocre'
+}
+
+# Phrases are weighted heavier than single words
+NEGATIVE_PHRASES = [
+    'not good', 'not great', 'not recommended', 'not worth',
+    'don\'t recommend', 'would not', 'will not', 'never again', 'extremely disappointed', 'highly disappointed','waste of time'
+]
+
+POSITIVE_PHRASES = [
+    'highly recommend', 'would recommend', 'definitely recommend'
+]
+
+# Compiled once at import and shared by every request
+lexicon_scorer = LexiconScorer(
+    POSITIVE_WORDS, NEGATIVE_WORDS, POSITIVE_PHRASES, NEGATIVE_PHRASES
+)
 
 
 def analyze_review_sentiment(review_content: str) -> dict:
@@ -70,68 +329,27 @@ def analyze_review_sentiment(review_content: str) -> dict:
     Returns:
         Dictionary with vibe_score, sentiment, and keywords (as JSON string)
     """
-    import json
-    
-    # Convert to lowercase for analysis
-    review_lower = review_content.lower()
-    
-    # Define sentiment keywords
-    positive_words = {
-        'good', 'great', 'excellent', 'amazing', 'awesome', 'fantastic', 'wonderful',
-        'love', 'best', 'perfect', 'brilliant', 'outstanding', 'superb', 'exceptional',
-        'impressed', 'satisfied', 'happy', 'friendly', 'clean', 'nice', 'pleasant',
-        'delicious', 'tasty', 'professional', 'quick', 'efficient', 'helpful', 'recommend'
-    }
-    
-    negative_words = {
-        'bad', 'terrible', 'awful', 'horrible', 'hate', 'worst', 'poor', 'disgusting',
-        'rude', 'slow', 'dirty', 'overpriced', 'disappointing', 'waste', 'useless',
-        'unprofessional', 'broken', 'uncomfortable', 'cold', 'bland', 'stale',
-        'quit', 'avoid', 'disgusted', 'angry', 'frustrated', 'disappointed',
-        'below', 'subpar', 'lacking', 'missing', 'incomplete', 'mediocre'
-    }
-    
-    # Check for negative phrases (higher weight)
-    negative_phrases = [
-        'not good', 'not great', 'not recommended', 'not worth',
-        'don\'t recommend', 'would not', 'will not', 'never again', 'extremely disappointed', 'highly disappointed','waste of time'
-    ]
-    
-    positive_phrases = [
-        'highly recommend', 'would recommend', 'definitely recommend'
-    ]
-    
-    # Count positive and negative words
-    positive_count = sum(1 for word in positive_words if ' ' + word + ' ' in ' ' + review_lower + ' ')
-    negative_count = sum(1 for word in negative_words if ' ' + word + ' ' in ' ' + review_lower + ' ')
-    
-    # Check for phrases (weighted heavier)
-    positive_phrase_count = sum(2 for phrase in positive_phrases if phrase in review_lower)
-    negative_phrase_count = sum(2 for phrase in negative_phrases if phrase in review_lower)
-    
-    # Calculate vibe score (0-100)
-    # Base score of 50 (neutral), +15 per positive word, -15 per negative word
-    # Phrases count as 2x weight
-    vibe_score = 50 + (positive_count * 15) + (positive_phrase_count * 15) - (negative_count * 15) - (negative_phrase_count * 15)
-    vibe_score = max(0, min(100, vibe_score))  # Clamp between 0-100
-    
-    # Determine sentiment
-    if vibe_score >= 65:
-        sentiment = "positive"
-    elif vibe_score >= 40:
-        sentiment = "neutral"
-    else:
-        sentiment = "negative"
-    
-    # Extract keywords (words longer than 4 characters)
-    words = review_content.lower().split()
-    keywords_list = [w.strip('.,!?;:') for w in words if len(w) > 4][:5]
-    
-    # Convert keywords to JSON string for storage
-    keywords_json = json.dumps(keywords_list)
-    
-    return {
-        "vibe_score": vibe_score,
-        "sentiment": sentiment,
-        "keywords": keywords_json
-    }
+    return lexicon_scorer.score(review_content)
+
+
+def analyze_review_sentiments(review_contents: List[str]) -> List[dict]:
+    """
+    Analyze the sentiment of a batch of reviews in one call.
+    
+    Parameters:
+        review_contents: The text content of each review
+        
+    Returns:
+        One analyze_review_sentiment result per review, in input order
+    """
+    return lexicon_scorer.score_many(review_contents)
+
+
+def to_utc_naive(moment: datetime) -> datetime:
+    """
+    Convert a datetime to naive UTC, the form timestamps are stored in (like
+    datetime.utcnow()). Naive values are taken to be UTC already.
+    """
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
@@ -0,0 +1,520 @@
+"""
+Benchmark Script for VibeCheck Business
+Measures the API hot paths on a generated SQLite dataset and reports
+throughput and p50/p95/p99 latency as JSON, so runs on different commits
+can be compared.
+
+Suites:
+    micro   in-process: lexicon scorer, JWT decode (cold and cached),
+            record_review_metrics and refresh_business_metrics
+    load    end-to-end against the app launched locally with uvicorn:
+            register and login storms, a review write burst against one
+            hot business, and paginated business and review reads
+
+The dataset is built with the migrations and populate_db.py on first use
+(or with --rebuild) and kept as a pristine template. Every run works on a
+fresh copy of it, since the write scenarios add reviews and users, so
+runs of the same size always start from the same data.
+
+Usage:
+    python benchmark.py micro
+    python benchmark.py load --duration 20 --concurrency 16
+    python benchmark.py all --businesses 1000 --users 10000 --reviews 1000000 --output main.json
+    python benchmark.py compare main.json branch.json
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+BASE_DIR = Path(__file__).resolve().parent
+SCENARIO_STATS = ("throughput", "p50_ms", "p95_ms", "p99_ms")
+
+
+# ============================================
+# Measurement
+# ============================================
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an ascending list
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def summarize(latencies_ns, elapsed, errors=0):
+    """
+    Throughput and latency percentiles (in milliseconds) of one scenario.
+    """
+    latencies = sorted(value / 1e6 for value in latencies_ns)
+    return {
+        "operations": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 4) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 4),
+        "p95_ms": round(percentile(latencies, 0.95), 4),
+        "p99_ms": round(percentile(latencies, 0.99), 4),
+        "max_ms": round(latencies[-1], 4) if latencies else 0.0,
+    }
+
+
+def time_calls(operation, arguments, warmup):
+    """
+    Call operation once per argument, timing each call.
+    """
+    for argument in arguments[:warmup]:
+        operation(argument)
+
+    latencies = []
+    started = time.perf_counter()
+    for argument in arguments:
+        call_started = time.perf_counter_ns()
+        operation(argument)
+        latencies.append(time.perf_counter_ns() - call_started)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def run_load(operation_factory, duration, concurrency, warmup):
+    """
+    Run an HTTP scenario from concurrent worker threads for duration seconds.
+
+    Parameters:
+        operation_factory: Called with (worker index, requests.Session) in
+            each worker; returns the operation repeated by that worker,
+            which returns True when the request succeeded
+        duration: Measured seconds, after warmup seconds not recorded
+        concurrency: Number of worker threads
+    """
+    lock = threading.Lock()
+    latencies = []
+    errors = [0]
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    def worker(index):
+        session = requests.Session()
+        operation = operation_factory(index, session)
+        local_latencies = []
+        local_errors = 0
+        while True:
+            call_started = time.perf_counter_ns()
+            try:
+                succeeded = operation()
+            except requests.RequestException:
+                succeeded = False
+            finished = time.perf_counter()
+            if finished >= deadline:
+                break
+            if finished >= measure_from:
+                if succeeded:
+                    local_latencies.append(time.perf_counter_ns() - call_started)
+                else:
+                    local_errors += 1
+        session.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, duration, errors[0])
+
+
+# ============================================
+# Dataset
+# ============================================
+
+def configure_environment(database):
+    """
+    Point the app at a database before any app module is imported.
+    """
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+    # Measure the scorer, not the score cache
+    os.environ.setdefault("SCORE_CACHE_SIZE", "0")
+    return dict(os.environ)
+
+
+def sqlite_files(database):
+    database = Path(database)
+    return [database, Path(f"{database}-wal"), Path(f"{database}-shm")]
+
+
+def prepare_dataset(args, env):
+    """
+    Build the template dataset unless one of the requested size already exists.
+    """
+    database = Path(args.database)
+    marker = database.with_name(database.name + ".json")
+    size = {"businesses": args.businesses, "users": args.users, "reviews": args.reviews, "seed": args.seed}
+
+    if not args.rebuild and database.exists() and marker.exists():
+        if json.loads(marker.read_text()) == size:
+            return size
+
+    for path in sqlite_files(database) + [marker]:
+        if path.exists():
+            path.unlink()
+
+    print(f"Building dataset {database} ({args.businesses:,} businesses, "
+          f"{args.users:,} users, {args.reviews:,} reviews)...")
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=BASE_DIR, env=env, check=True)
+    subprocess.run(
+        [
+            sys.executable, "populate_db.py", "--synthetic",
+            "--businesses", str(args.businesses),
+            "--users", str(args.users),
+            "--reviews", str(args.reviews),
+            "--seed", str(args.seed),
+        ],
+        cwd=BASE_DIR, env=env, check=True,
+    )
+    marker.write_text(json.dumps(size))
+    return size
+
+
+def scratch_copy(database) -> str:
+    """
+    Copy the template dataset to a scratch database for one run.
+
+    Uses SQLite's backup API, so pages still in the template's WAL are
+    copied too.
+    """
+    scratch = Path(database).with_name(Path(database).name + ".run")
+    remove_scratch(scratch)
+    source = sqlite3.connect(database)
+    target = sqlite3.connect(scratch)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return str(scratch)
+
+
+def remove_scratch(scratch):
+    for path in sqlite_files(scratch):
+        if path.exists():
+            path.unlink()
+
+
+def hot_business_id():
+    """
+    The business with the most reviews (synthetic reviews are skewed).
+    """
+    from app.database import SessionLocal
+    from app.models import Business
+
+    db = SessionLocal()
+    try:
+        return db.query(Business.id).order_by(Business.total_reviews.desc(), Business.id).first()[0]
+    finally:
+        db.close()
+
+
+# ============================================
+# Micro-benchmarks
+# ============================================
+
+def micro_suite(args):
+    """
+    Time the scorer, token decoding and business metrics updates in-process.
+    """
+    from app.auth import create_access_token, decode_access_token
+    from app.database import SessionLocal
+    from app.models import Review
+    from app.utils import analyze_review_sentiment, analyze_review_sentiments
+    from app.utils import record_review_metrics, refresh_business_metrics
+    from populate_db import synthetic_reviews
+
+    rng = random.Random(args.seed)
+    corpus = [record["content"] for record in synthetic_reviews(args.iterations, [1], [1], rng)]
+    results = {}
+
+    results["scorer.single"] = time_calls(analyze_review_sentiment, corpus, args.warmup)
+    batches = [corpus[start:start + 100] for start in range(0, len(corpus), 100)]
+    results["scorer.batch_100"] = time_calls(analyze_review_sentiments, batches, 1)
+
+    # Distinct tokens miss the verified-token cache; one token always hits it
+    tokens = [
+        create_access_token({"user_id": number, "username": f"user{number}", "ver": 0})
+        for number in range(1, args.iterations + args.warmup + 1)
+    ]
+    results["token.decode_cold"] = time_calls(decode_access_token, tokens[args.warmup:], 0)
+    results["token.decode_cached"] = time_calls(
+        decode_access_token, [tokens[0]] * args.iterations, args.warmup
+    )
+
+    business_id = hot_business_id()
+    db = SessionLocal()
+    try:
+        metric_iterations = max(args.iterations // 100, 10)
+
+        def insert_review(content):
+            review = Review(user_id=1, business_id=business_id, content=content, **analyze_review_sentiment(content))
+            db.add(review)
+            record_review_metrics(review, db)
+            db.commit()
+
+        results["metrics.record_review"] = time_calls(insert_review, corpus[:metric_iterations], 1)
+        results["metrics.refresh_hot_business"] = time_calls(
+            lambda _: refresh_business_metrics(business_id, db), range(metric_iterations), 1
+        )
+    finally:
+        db.close()
+
+    return results
+
+
+# ============================================
+# End-to-end load scenarios
+# ============================================
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def launch_app(args, env):
+    """
+    Start uvicorn on a free local port and wait until the API answers.
+    """
+    port = free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ],
+        cwd=BASE_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("The app exited during startup")
+        try:
+            if requests.get(base_url + "/", timeout=1).ok:
+                return server, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("The app did not start within 30 seconds")
+
+
+def login(session, base_url, username, password="password"):
+    response = session.post(base_url + "/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def load_suite(args, env):
+    """
+    Run the HTTP scenarios against a locally launched app.
+    """
+    business_id = hot_business_id()
+    server, base_url = launch_app(args, env)
+    results = {}
+    run_id = f"{os.getpid()}{int(time.time())}"
+
+    def scenario(name, operation_factory):
+        print(f"  {name}...")
+        results[name] = run_load(operation_factory, args.duration, args.concurrency, args.warmup_seconds)
+
+    try:
+        def register(index, session):
+            counter = iter(range(10 ** 9))
+
+            def operation():
+                username = f"bench{run_id}w{index}n{next(counter)}"
+                response = session.post(base_url + "/register", json={
+                    "username": username[:50],
+                    "email": f"{username}@example.com",
+                    "password": "password",
+                })
+                return response.status_code == 201
+            return operation
+
+        def login_storm(index, session):
+            rng = random.Random(args.seed + index)
+
+            def operation():
+                username = f"user{rng.randint(1, args.users)}"
+                response = session.post(base_url + "/login", json={"username": username, "password": "password"})
+                return response.ok
+            return operation
+
+        def review_burst(index, session):
+            token = login(session, base_url, f"user{index % args.users + 1}")
+            session.headers["Authorization"] = f"Bearer {token}"
+            url = f"{base_url}/businesses/{business_id}/reviews"
+            rng = random.Random(args.seed + index)
+
+            def operation():
+                word = rng.choice(("great", "terrible", "okay", "amazing", "slow"))
+                response = session.post(url, json={"content": f"Benchmark review, the service was {word}."})
+                return response.status_code in (201, 202)
+            return operation
+
+        def paged_reader(url):
+            def factory(index, session):
+                cursor = [None]
+
+                def operation():
+                    params = {"limit": args.page_size}
+                    if cursor[0]:
+                        params["cursor"] = cursor[0]
+                    response = session.get(url, params=params)
+                    # Start over from the first page after the last one
+                    cursor[0] = response.headers.get("X-Next-Cursor")
+                    return response.ok
+                return operation
+            return factory
+
+        scenario("http.register", register)
+        scenario("http.login", login_storm)
+        scenario("http.review_burst_hot_business", review_burst)
+        scenario("http.businesses_paginated", paged_reader(f"{base_url}/businesses?sort=score"))
+        scenario("http.reviews_paginated_hot_business", paged_reader(f"{base_url}/businesses/{business_id}/reviews"))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    return results
+
+
+# ============================================
+# Reporting
+# ============================================
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    print(f"\n  {'scenario':<36} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, stats in results.items():
+        print(
+            f"  {name:<36} {stats['throughput']:>10,.1f} {stats['p50_ms']:>9.3f} "
+            f"{stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f} {stats['errors']:>7}"
+        )
+    print()
+
+
+def compare_results(baseline_path, candidate_path):
+    """
+    Print the change of each scenario's throughput and latencies between two runs.
+    """
+    baseline = json.loads(Path(baseline_path).read_text())
+    candidate = json.loads(Path(candidate_path).read_text())
+    print(f"\n  {baseline.get('commit')} -> {candidate.get('commit')}")
+    print(f"  {'scenario':<36} " + " ".join(f"{stat:>12}" for stat in SCENARIO_STATS))
+    for name, stats in candidate["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        changes = []
+        for stat in SCENARIO_STATS:
+            change = (stats[stat] - before[stat]) / before[stat] * 100 if before[stat] else 0.0
+            changes.append(f"{change:>+11.1f}%")
+        print(f"  {name:<36} " + " ".join(changes))
+    print()
+
+
+def run_benchmarks(args):
+    dataset = prepare_dataset(args, configure_environment(args.database))
+
+    # The suites write reviews and users; keep them off the template
+    scratch = scratch_copy(args.database)
+    env = configure_environment(scratch)
+    results = {}
+    try:
+        if args.suite in ("micro", "all"):
+            print("Micro-benchmarks...")
+            results.update(micro_suite(args))
+        if args.suite in ("load", "all"):
+            print("Load scenarios...")
+            results.update(load_suite(args, env))
+    finally:
+        remove_scratch(scratch)
+
+    report = {
+        "commit": current_commit(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset": dataset,
+        "settings": {
+            "iterations": args.iterations,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "page_size": args.page_size,
+        },
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print_results(results)
+    print(f"✓ Results written to {args.output}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the VibeCheck API hot paths")
+    parser.add_argument("suite", choices=("micro", "load", "all", "compare"), help="Suite to run")
+    parser.add_argument("files", nargs="*", help="compare: baseline and candidate result files")
+    dataset = parser.add_argument_group("dataset")
+    dataset.add_argument("--database", default="benchmark.db", help="Template SQLite file (default: benchmark.db)")
+    dataset.add_argument("--rebuild", action="store_true", help="Rebuild the dataset even if it exists")
+    dataset.add_argument("--businesses", type=int, default=200, help="Businesses (default: 200)")
+    dataset.add_argument("--users", type=int, default=2000, help="Users (default: 2000)")
+    dataset.add_argument("--reviews", type=int, default=100000, help="Reviews (default: 100000)")
+    dataset.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    micro = parser.add_argument_group("micro suite")
+    micro.add_argument("--iterations", type=int, default=20000, help="Calls per micro-benchmark (default: 20000)")
+    micro.add_argument("--warmup", type=int, default=500, help="Untimed calls first (default: 500)")
+    load = parser.add_argument_group("load suite")
+    load.add_argument("--duration", type=float, default=10, help="Measured seconds per scenario (default: 10)")
+    load.add_argument("--warmup-seconds", type=float, default=2, help="Unmeasured seconds first (default: 2)")
+    load.add_argument("--concurrency", type=int, default=8, help="Concurrent clients (default: 8)")
+    load.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (default: 1)")
+    load.add_argument("--page-size", type=int, default=50, help="Page size of the read scenarios (default: 50)")
+    parser.add_argument("--output", default="benchmark-results.json", help="JSON results file")
+    args = parser.parse_args()
+
+    if args.suite == "compare":
+        if len(args.files) != 2:
+            parser.error("compare needs a baseline and a candidate results file")
+        compare_results(*args.files)
+    else:
+        args.database = str(Path(args.database).resolve())
+        print("=" * 60)
+        print("VibeCheck Business — Benchmarks")
+        print("=" * 60)
+        run_benchmarks(args)
+        print("=" * 60)
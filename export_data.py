@@ -0,0 +1,74 @@
+"""
+Data Export Script for VibeCheck Business
+Streams reviews or businesses to a file (or stdout) as NDJSON or CSV,
+with constant memory use however large the tables are.
+
+Usage:
+    python export_data.py reviews --format csv --output reviews.csv
+    python export_data.py reviews --business-id 3 --since 2026-01-01 --sentiment negative
+    python export_data.py businesses --category Restaurant > businesses.ndjson
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from app.export import (
+    review_export_statement, business_export_statement, export_rows,
+    REVIEW_EXPORT_COLUMNS, BUSINESS_EXPORT_COLUMNS
+)
+from app.schemas import ExportFormat, ReviewSentiment
+
+
+def export_data(args, output):
+    """
+    Write the selected table to output.
+
+    Parameters:
+        args: Parsed command line arguments
+        output: Text file to write to
+    """
+    if args.table == "reviews":
+        statement = review_export_statement(args.business_id, args.since, args.until, args.sentiment)
+        columns = REVIEW_EXPORT_COLUMNS
+    else:
+        statement = business_export_statement(args.category)
+        columns = BUSINESS_EXPORT_COLUMNS
+
+    for chunk in export_rows(statement, columns, args.format):
+        output.write(chunk)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export reviews or businesses")
+    parser.add_argument("table", choices=["reviews", "businesses"])
+    parser.add_argument(
+        "--format",
+        type=ExportFormat,
+        choices=list(ExportFormat),
+        default=ExportFormat.ndjson,
+        help="Output format (default: ndjson)",
+    )
+    parser.add_argument("--output", help="File to write (default: stdout)")
+    parser.add_argument("--business-id", type=int, help="Reviews of this business only")
+    parser.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="Reviews created at or after this ISO date/time",
+    )
+    parser.add_argument(
+        "--until",
+        type=datetime.fromisoformat,
+        help="Reviews created before this ISO date/time",
+    )
+    parser.add_argument("--sentiment", type=ReviewSentiment, choices=list(ReviewSentiment))
+    parser.add_argument("--category", help="Businesses of this category only")
+    args = parser.parse_args()
+
+    if args.output:
+        # newline="" keeps the csv module's \r\n line endings intact
+        with open(args.output, "w", newline="", encoding="utf-8") as output:
+            export_data(args, output)
+        print(f"✓ Exported {args.table} to {args.output}", file=sys.stderr)
+    else:
+        export_data(args, sys.stdout)
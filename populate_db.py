@@ -1,131 +1,417 @@
 """
 Database Population Script for VibeCheck Business
+Bulk-loads businesses, users and reviews, from files or a seeded synthetic
+generator, for development and load tests.
 Run this script ONLY after migrations have been applied.
 
+Rows are streamed into Core executemany INSERTs of --batch-size rows,
+committed every --transaction-size rows, with SQLite durability relaxed for
+the duration of the load. Business aggregates and daily rollups are
+recomputed in set-based passes at the end.
+
+Files are CSV (.csv) or NDJSON (.ndjson, .jsonl) with these fields:
+    businesses: name, category, location
+    users:      username, email, password (or hashed_password)
+    reviews:    user_id, business_id, content, [created_at]
+                [vibe_score, sentiment, keywords] (scored on load if missing)
+
 Usage:
-    python scripts/populate_db.py
+    python populate_db.py --sample
+    python populate_db.py --synthetic --businesses 1000 --users 10000 --reviews 1000000 --seed 7
+    python populate_db.py --businesses-file businesses.csv --reviews-file reviews.ndjson
 """
 
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app.models import Business
+import argparse
+import csv
+import json
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+
+from sqlalchemy import func, insert, select
+from app.auth import hash_password
+from app.config import SQLITE_SYNCHRONOUS, SQLITE_CACHE_SIZE
+from app.database import engine, is_sqlite, SQLALCHEMY_DATABASE_URL
+from app.models import Business, User, Review
+from app.rollups import rebuild_daily_rollups
+from app.scoring import score_reviews
+from app.utils import recompute_business_metrics, POSITIVE_WORDS, NEGATIVE_WORDS
+
+
+SAMPLE_BUSINESSES = [
+    {
+        "name": "Cosmic Coffee Roasters",
+        "category": "Coffee Shop",
+        "location": "742 Starlight Avenue, San Francisco, CA 94102",
+    },
+    {
+        "name": "The Golden Spoon Diner",
+        "category": "Restaurant",
+        "location": "159 Heritage Road, Philadelphia, PA 19102",
+    },
+    {
+        "name": "Elite Auto Solutions",
+        "category": "Auto Repair",
+        "location": "368 Mechanic Street, Detroit, MI 48201",
+    },
+    {
+        "name": "Zen Balance Fitness",
+        "category": "Fitness",
+        "location": "951 Harmony Lane, Phoenix, AZ 85001",
+    },
+    {
+        "name": "Circuit City Electronics",
+        "category": "Electronics Store",
+        "location": "753 Digital Plaza, San Jose, CA 95101",
+    },
+    {
+        "name": "Chic Avenue Clothing",
+        "category": "Fashion Retail",
+        "location": "246 Fashion Boulevard, New York, NY 10001",
+    },
+    {
+        "name": "Pawsitive Pet Care",
+        "category": "Pet Services",
+        "location": "802 Animal Way, Houston, TX 77001",
+    },
+    {
+        "name": "Sunrise Artisan Bakery",
+        "category": "Bakery",
+        "location": "135 Baker Street, Minneapolis, MN 55401",
+    },
+    {
+        "name": "Sharp Styles Barber Lounge",
+        "category": "Barbershop",
+        "location": "579 Clipper Avenue, Las Vegas, NV 89101",
+    },
+    {
+        "name": "Chapter & Verse Bookshop",
+        "category": "Bookstore",
+        "location": "913 Literary Lane, Seattle, WA 98101",
+    },
+    {
+        "name": "Harvest Fresh Market",
+        "category": "Grocery Store",
+        "location": "468 Produce Place, Charlotte, NC 28201",
+    },
+    {
+        "name": "Serenity Wellness Spa",
+        "category": "Spa",
+        "location": "824 Tranquil Trail, Tampa, FL 33601",
+    },
+    {
+        "name": "Mountain Peak Adventure Gear",
+        "category": "Outdoor Equipment",
+        "location": "357 Summit Street, Denver, CO 80201",
+    },
+    {
+        "name": "Melody Music Academy",
+        "category": "Music School",
+        "location": "691 Harmony Avenue, Nashville, TN 37201",
+    },
+]
 
+# Vocabulary of the synthetic generator
+NAME_WORDS = ["Cosmic", "Golden", "Elite", "Zen", "Sunrise", "Harvest", "Serenity", "Summit", "Melody", "Urban"]
+CITIES = ["San Francisco, CA", "Philadelphia, PA", "Detroit, MI", "Phoenix, AZ", "Seattle, WA", "Denver, CO"]
+NEUTRAL_WORDS = ["service", "staff", "place", "food", "prices", "visit", "location", "experience", "team", "time"]
+POSITIVE_VOCABULARY = sorted(POSITIVE_WORDS)
+NEGATIVE_VOCABULARY = sorted(NEGATIVE_WORDS)
 
-def populate_database():
+
+# ============================================
+# Sources
+# ============================================
+
+def read_records(path):
     """
-    Populate the database with sample businesses.
+    Stream records from a CSV or NDJSON file as dictionaries.
     """
-    db: Session = SessionLocal()
+    path = Path(path)
+    with open(path, newline="", encoding="utf-8") as source:
+        if path.suffix.lower() == ".csv":
+            yield from csv.DictReader(source)
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
 
-    try:
-        existing_count = db.query(Business).count()
 
-        if existing_count > 0:
-            print(f"Database already contains {existing_count} businesses.")
-            user_input = input("Do you want to add more businesses anyway? (yes/no): ")
-            if user_input.lower() not in ("yes", "y"):
-                print("Operation cancelled.")
-                return
+def synthetic_businesses(count, rng):
+    categories = [b["category"] for b in SAMPLE_BUSINESSES]
+    for index in range(count):
+        category = rng.choice(categories)
+        yield {
+            "name": f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)} {category} #{index + 1}",
+            "category": category,
+            "location": f"{rng.randint(1, 9999)} Main Street, {rng.choice(CITIES)}",
+        }
 
-        sample_businesses = [
-            {
-                "name": "Cosmic Coffee Roasters",
-                "category": "Coffee Shop",
-                "location": "742 Starlight Avenue, San Francisco, CA 94102",
-            },
-            {
-                "name": "The Golden Spoon Diner",
-                "category": "Restaurant",
-                "location": "159 Heritage Road, Philadelphia, PA 19102",
-            },
-            {
-                "name": "Elite Auto Solutions",
-                "category": "Auto Repair",
-                "location": "368 Mechanic Street, Detroit, MI 48201",
-            },
-            {
-                "name": "Zen Balance Fitness",
-                "category": "Fitness",
-                "location": "951 Harmony Lane, Phoenix, AZ 85001",
-            },
-            {
-                "name": "Circuit City Electronics",
-                "category": "Electronics Store",
-                "location": "753 Digital Plaza, San Jose, CA 95101",
-            },
-            {
-                "name": "Chic Avenue Clothing",
-                "category": "Fashion Retail",
-                "location": "246 Fashion Boulevard, New York, NY 10001",
-            },
-            {
-                "name": "Pawsitive Pet Care",
-                "category": "Pet Services",
-                "location": "802 Animal Way, Houston, TX 77001",
-            },
-            {
-                "name": "Sunrise Artisan Bakery",
-                "category": "Bakery",
-                "location": "135 Baker Street, Minneapolis, MN 55401",
-            },
-            {
-                "name": "Sharp Styles Barber Lounge",
-                "category": "Barbershop",
-                "location": "579 Clipper Avenue, Las Vegas, NV 89101",
-            },
-            {
-                "name": "Chapter & Verse Bookshop",
-                "category": "Bookstore",
-                "location": "913 Literary Lane, Seattle, WA 98101",
-            },
-            {
-                "name": "Harvest Fresh Market",
-                "category": "Grocery Store",
-                "location": "468 Produce Place, Charlotte, NC 28201",
-            },
-            {
-                "name": "Serenity Wellness Spa",
-                "category": "Spa",
-                "location": "824 Tranquil Trail, Tampa, FL 33601",
-            },
-            {
-                "name": "Mountain Peak Adventure Gear",
-                "category": "Outdoor Equipment",
-                "location": "357 Summit Street, Denver, CO 80201",
-            },
+
+def synthetic_users(count, first_number):
+    # Every synthetic user logs in with the password "password"
+    for number in range(first_number, first_number + count):
+        yield {
+            "username": f"user{number}",
+            "email": f"user{number}@example.com",
+            "password": "password",
+        }
+
+
+def synthetic_reviews(count, user_ids, business_ids, rng):
+    now = datetime.utcnow()
+    for _ in range(count):
+        mood = rng.random()
+        if mood < 0.5:
+            words = rng.sample(POSITIVE_VOCABULARY, 2)
+        elif mood < 0.8:
+            words = rng.sample(NEGATIVE_VOCABULARY, 2)
+        else:
+            words = [rng.choice(POSITIVE_VOCABULARY), rng.choice(NEGATIVE_VOCABULARY)]
+        subjects = rng.sample(NEUTRAL_WORDS, 2)
+        yield {
+            "user_id": rng.choice(user_ids),
+            # Skewed so a few businesses collect most of the reviews
+            "business_id": business_ids[int(len(business_ids) * rng.random() ** 2)],
+            "content": f"The {subjects[0]} was {words[0]} and the {subjects[1]} was {words[1]}.",
+            "created_at": now - timedelta(seconds=rng.randrange(365 * 24 * 3600)),
+        }
+
+
+# ============================================
+# Row preparation
+# ============================================
+
+def business_rows(records):
+    for record in records:
+        yield {
+            "name": record["name"],
+            "category": record["category"],
+            "location": record["location"],
+            "aggregated_vibe_score": 0.0,
+            "total_reviews": 0,
+        }
+
+
+def user_rows(records):
+    for record in records:
+        yield {
+            "username": record["username"],
+            "email": record["email"],
+            "hashed_password": record.get("hashed_password") or hash_password(record["password"]),
+        }
+
+
+def _timestamp(value, default):
+    if not value:
+        return default
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def review_batches(records, batch_size):
+    """
+    Group review records into insert-ready batches, scoring unscored ones.
+    """
+    for batch in batched(records, batch_size):
+        now = datetime.utcnow()
+        unscored = [record for record in batch if not record.get("sentiment")]
+        for record, result in zip(unscored, score_reviews([r["content"] for r in unscored])):
+            record.update(result)
+
+        yield [
             {
-                "name": "Melody Music Academy",
-                "category": "Music School",
-                "location": "691 Harmony Avenue, Nashville, TN 37201",
-            },
+                "user_id": int(record["user_id"]),
+                "business_id": int(record["business_id"]),
+                "content": record["content"],
+                "vibe_score": float(record["vibe_score"]) if record.get("vibe_score") not in (None, "") else None,
+                "sentiment": record.get("sentiment"),
+                "keywords": record.get("keywords"),
+                "created_at": _timestamp(record.get("created_at"), now),
+            }
+            for record in batch
         ]
 
-        businesses = [
-            Business(
-                name=b["name"],
-                category=b["category"],
-                location=b["location"],
-                aggregated_vibe_score=0.0,
-                total_reviews=0,
-            )
-            for b in sample_businesses
-        ]
 
-        db.add_all(businesses)
-        db.commit()
+# ============================================
+# Loading
+# ============================================
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
 
-        print(f"\n✓ Successfully added {len(businesses)} businesses.\n")
 
-    except Exception as e:
-        db.rollback()
-        print(f"\n✗ Error occurred: {str(e)}")
+@contextmanager
+def relaxed_durability(connection):
+    """
+    Trade crash safety for load speed on this connection (SQLite only).
+
+    A crash mid-load can lose the last committed transactions, which a
+    re-run of the loader replaces anyway.
+    """
+    if not is_sqlite(SQLALCHEMY_DATABASE_URL):
+        yield
+        return
+
+    connection.exec_driver_sql("PRAGMA synchronous=OFF")
+    connection.exec_driver_sql("PRAGMA cache_size=-262144")
+    connection.exec_driver_sql("PRAGMA temp_store=MEMORY")
+    try:
+        yield
     finally:
-        db.close()
+        connection.exec_driver_sql(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        connection.exec_driver_sql(f"PRAGMA cache_size={SQLITE_CACHE_SIZE:d}")
+        connection.exec_driver_sql("PRAGMA temp_store=DEFAULT")
+
+
+def load_batches(connection, table, batches, transaction_size):
+    """
+    Insert row batches with executemany, committing every transaction_size rows.
+
+    Returns:
+        The number of rows inserted
+    """
+    statement = insert(table)
+    loaded = 0
+    uncommitted = 0
+    for batch in batches:
+        connection.execute(statement, batch)
+        loaded += len(batch)
+        uncommitted += len(batch)
+        if uncommitted >= transaction_size:
+            connection.commit()
+            uncommitted = 0
+    connection.commit()
+    return loaded
+
+
+def report(label, rows, started):
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f"  {label:<12} {rows:>10,} rows  {elapsed:8.2f}s  {rate:>10,.0f} rows/s")
+
+
+def populate_database(args):
+    """
+    Load the requested businesses, users and reviews, then rebuild aggregates.
+
+    Parameters:
+        args: Parsed command line arguments
+    """
+    rng = random.Random(args.seed)
+    load_started = time.perf_counter()
+    total_rows = 0
+
+    with engine.connect() as connection, relaxed_durability(connection):
+        try:
+            # Businesses
+            business_records = []
+            if args.sample:
+                business_records = SAMPLE_BUSINESSES
+            elif args.businesses_file:
+                business_records = read_records(args.businesses_file)
+            elif args.synthetic:
+                business_records = synthetic_businesses(args.businesses, rng)
+
+            started = time.perf_counter()
+            rows = load_batches(
+                connection, Business.__table__,
+                batched(business_rows(business_records), args.batch_size), args.transaction_size
+            )
+            report("businesses", rows, started)
+            total_rows += rows
+
+            # Users
+            user_records = []
+            if args.users_file:
+                user_records = read_records(args.users_file)
+            elif args.synthetic:
+                existing_users = connection.execute(select(func.count(User.id))).scalar()
+                user_records = synthetic_users(args.users, existing_users + 1)
+
+            started = time.perf_counter()
+            rows = load_batches(
+                connection, User.__table__,
+                batched(user_rows(user_records), args.batch_size), args.transaction_size
+            )
+            report("users", rows, started)
+            total_rows += rows
+
+            # Reviews
+            review_records = []
+            if args.reviews_file:
+                review_records = read_records(args.reviews_file)
+            elif args.synthetic and args.reviews:
+                user_ids = connection.execute(select(User.id)).scalars().all()
+                business_ids = connection.execute(select(Business.id)).scalars().all()
+                if not user_ids or not business_ids:
+                    raise ValueError("Synthetic reviews need at least one user and one business")
+                review_records = synthetic_reviews(args.reviews, user_ids, business_ids, rng)
+
+            started = time.perf_counter()
+            rows = load_batches(
+                connection, Review.__table__,
+                review_batches(review_records, args.batch_size), args.transaction_size
+            )
+            report("reviews", rows, started)
+            total_rows += rows
+
+            # Aggregates, in one pass over the reviews table
+            started = time.perf_counter()
+            businesses_with_reviews = recompute_business_metrics(connection)
+            connection.commit()
+            report("aggregates", businesses_with_reviews, started)
+
+            # Daily rollups, in one more pass
+            started = time.perf_counter()
+            rollup_rows = rebuild_daily_rollups(connection)
+            connection.commit()
+            report("rollups", rollup_rows, started)
+
+            report("total", total_rows, load_started)
+            print(f"\n✓ Loaded {total_rows:,} rows.\n")
+
+        except Exception as e:
+            connection.rollback()
+            print(f"\n✗ Error occurred: {str(e)}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load businesses, users and reviews")
+    source = parser.add_argument_group("sources")
+    source.add_argument("--sample", action="store_true", help="Load the 14 sample businesses")
+    source.add_argument("--synthetic", action="store_true", help="Generate businesses, users and reviews")
+    source.add_argument("--businesses-file", help="CSV/NDJSON file of businesses")
+    source.add_argument("--users-file", help="CSV/NDJSON file of users")
+    source.add_argument("--reviews-file", help="CSV/NDJSON file of reviews")
+    synthetic = parser.add_argument_group("synthetic data")
+    synthetic.add_argument("--businesses", type=int, default=100, help="Businesses to generate (default: 100)")
+    synthetic.add_argument("--users", type=int, default=1000, help="Users to generate (default: 1000)")
+    synthetic.add_argument("--reviews", type=int, default=10000, help="Reviews to generate (default: 10000)")
+    synthetic.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per INSERT (default: 5000)")
+    parser.add_argument(
+        "--transaction-size",
+        type=int,
+        default=100000,
+        help="Rows per commit (default: 100000)",
+    )
+    args = parser.parse_args()
+
+    if not (args.sample or args.synthetic or args.businesses_file or args.users_file or args.reviews_file):
+        parser.error("choose --sample, --synthetic or at least one --*-file source")
+
     print("=" * 60)
     print("VibeCheck Business — Database Population")
     print("=" * 60)
-    populate_database()
+    populate_database(args)
     print("=" * 60)
@@ -0,0 +1,57 @@
+"""
+Search Index Rebuild Script for VibeCheck Business
+Reindexes every review and business in the full-text search indexes. The
+triggers keep the indexes current on their own; run this after loading
+data in a way that bypassed them, or with --optimize after large imports.
+
+Usage:
+    python rebuild_search_index.py
+    python rebuild_search_index.py --optimize
+"""
+
+import argparse
+
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, SQLALCHEMY_DATABASE_URL, is_sqlite
+from app.search import rebuild_search_index
+
+
+def rebuild_index(optimize=False):
+    """
+    Rebuild the reviews_fts and businesses_fts indexes from their tables.
+
+    Parameters:
+        optimize: Also merge each index into a single b-tree
+    """
+    if not is_sqlite(SQLALCHEMY_DATABASE_URL):
+        print("\n✗ Full-text search indexes only exist on SQLite databases.")
+        return
+
+    db: Session = SessionLocal()
+
+    try:
+        rebuild_search_index(db, optimize)
+        db.commit()
+        print("\n✓ Search indexes rebuilt.\n")
+
+    except Exception as e:
+        db.rollback()
+        print(f"\n✗ Error occurred: {str(e)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the full-text search indexes")
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="Merge the index segments after rebuilding",
+    )
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VibeCheck Business — Search Index Rebuild")
+    print("=" * 60)
+    rebuild_index(args.optimize)
+    print("=" * 60)
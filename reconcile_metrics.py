@@ -0,0 +1,70 @@
+"""
+Business Metrics Reconciliation Script for VibeCheck Business
+Recomputes the running review totals of businesses from their reviews and
+lists the businesses whose stored metrics had drifted. Safe to run while
+the API is serving traffic.
+
+Usage:
+    python reconcile_metrics.py                  # every business
+    python reconcile_metrics.py --business-id 3 --business-id 7
+    python reconcile_metrics.py --chunk-size 5000
+"""
+
+import argparse
+
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.utils import reconcile_business_metrics
+
+
+def reconcile_metrics(business_ids=None, chunk_size=1000):
+    """
+    Rebuild aggregated_vibe_score and the running totals from the reviews.
+
+    Parameters:
+        business_ids: Optional list of business IDs; defaults to all businesses
+        chunk_size: Businesses recomputed per transaction
+    """
+    db: Session = SessionLocal()
+
+    try:
+        checked, changes = reconcile_business_metrics(db, chunk_size, business_ids)
+
+        for change in changes:
+            print(
+                f"  business {change['business_id']}: "
+                f"score {change['old_score']} -> {change['new_score']}, "
+                f"reviews {change['old_total_reviews']} -> {change['new_total_reviews']}"
+            )
+
+        print(f"\n✓ Reconciled metrics for {checked} businesses ({len(changes)} changed).\n")
+
+    except Exception as e:
+        db.rollback()
+        print(f"\n✗ Error occurred: {str(e)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute business review metrics")
+    parser.add_argument(
+        "--business-id",
+        type=int,
+        action="append",
+        dest="business_ids",
+        help="Business to reconcile (repeatable; default: all)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1000,
+        help="Businesses per transaction (default: 1000)",
+    )
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VibeCheck Business — Metrics Reconciliation")
+    print("=" * 60)
+    reconcile_metrics(args.business_ids, args.chunk_size)
+    print("=" * 60)
@@ -1,89 +1,122 @@
 # -*- coding: utf-8 -*-
-"""sentimetal-analysis.ipynb
+"""Transformer sentiment analysis for VibeCheck reviews.
 
-Automatically generated by Colab.
+Originally exported from the sentimetal-analysis.ipynb Colab notebook.
 
-Original file is located at
-    https://colab.research.google.com/drive/1MHaFEWlQeabfvbyfsbLOYIqg6VApon0Z
-"""
+Requires `pip install 'transformers[torch]'`.
 
-!pip install 'transformers[torch]'
+The model is loaded once per process by get_engine(). The returned
+BatchInferenceEngine accepts texts from any number of threads and runs them
+through the model in dynamically formed batches, grouping texts of similar
+length so little work is wasted on padding.
 
-from transformers import pipeline
+The model can run on one of several backends (SENTIMENT_BACKEND):
 
-# This will automatically download a default model for sentiment analysis
-classifier = pipeline("sentiment-analysis")
+    torch       full-precision PyTorch model
+    torch-int8  PyTorch with dynamic int8 quantization of the Linear layers
+    onnx        exported ONNX graph on ONNX Runtime (needs `optimum[onnxruntime]`);
+                the graph is exported once into ONNX_EXPORT_DIR and loaded
+                from there by later processes
 
-result = classifier("I love learning about machine learning!")
-print(result)
+It can also serve the DS service protocol used by app/ds_client.py:
 
-result = classifier("I  the game")
-print(result)
+    python sentimetal_analysis.py --serve --port 8001
 
-reviews = [
-  "The interface is incredibly intuitive and I love the new dark mode theme.",
-  "I am extremely disappointed with the slow response times of the customer support team.",
-  "The package arrived today at 3:00 PM as scheduled.",
-  "This is the best purchase I have made all year; it exceeded all my expectations!",
-  "I hate how the application crashes every time I try to upload a high-resolution image.",
-  "The weather in London is currently cloudy with a slight chance of rain later today.",
-  "Oh great, another update that breaks more features than it actually fixes.",
-  "The customer service representative was polite, but they ultimately couldn't solve my problem.",
-  "I'm feeling quite indifferent about the new design; it's neither better nor worse than the old one.",
-  "Warning: This product contains chemicals known to cause irritation if handled without gloves.",
-  "The film was a cinematic masterpiece with breathtaking visuals and a gripping storyline.",
-  "I wouldn't recommend this restaurant to my worst enemy; the food was cold and the staff was rude.",
-  "To reset your password, please click the link sent to your registered email address.",
-  "The battery life is decent, but for this price point, I expected it to last much longer.",
-  "Absolutely phenomenal service! I will definitely be coming back again next week."
-]
-
-for review in reviews:
-  print(classifier(review))
-
-result = classifier("I killed the game")
-print(result)
+and compare a backend against the fp32 model on a fixed review corpus:
 
-"""### Sentiment Analysis Class
-
-Below is a Python class `SentimentAnalyzer` that encapsulates the sentiment analysis functionality. This makes it easier to reuse the sentiment analysis model without re-initializing it every time you want to analyze a new text. It uses the `pipeline` from the `transformers` library.  
-
-Start with installation.
+    python sentimetal_analysis.py --parity torch-int8
+"""
 
-`pip install 'transformers[torch]'`
+import argparse
+import json
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
 
+from app.config import (
+    SENTIMENT_MODEL, SENTIMENT_BACKEND, ONNX_EXPORT_DIR,
+    INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_LATENCY_MS, INFERENCE_BUCKET_SIZE,
+    INFERENCE_RESULT_TIMEOUT,
+)
+from app.lexicon import extract_keywords, sentiment_label
 
-"""
+logger = logging.getLogger(__name__)
 
-from transformers import pipeline
 
 class SentimentAnalyzer:
     """
     A class to perform sentiment analysis on text(s) using the Hugging Face transformers library.
 
     The class initializes a sentiment-analysis pipeline upon instantiation, which downloads
-    a default pre-trained model (typically `distilbert-base-uncased-finetuned-sst-2-english`)
-    if one is not specified or already cached.
+    the pre-trained model (by default `distilbert-base-uncased-finetuned-sst-2-english`)
+    if it is not already cached.
     """
 
-    def __init__(self):
+    BACKENDS = ("torch", "torch-int8", "onnx")
+
+    def __init__(self, model_name: str = SENTIMENT_MODEL, backend: str = SENTIMENT_BACKEND):
         """
         Initializes the SentimentAnalyzer by setting up the sentiment analysis pipeline.
-        The pipeline automatically loads a suitable model for sentiment analysis.
+
+        Args:
+            model_name (str): Hugging Face model to load.
+            backend (str): One of BACKENDS. "onnx" falls back to "torch-int8"
+                           when ONNX Runtime is not installed.
         """
-        print("Initializing Sentiment Analysis pipeline...")
-        # This will automatically download a default model for sentiment analysis
-        # (e.g., distilbert-base-uncased-finetuned-sst-2-english) if not already present.
-        self.classifier = pipeline("sentiment-analysis")
-        print("Sentiment Analysis pipeline initialized.")
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown sentiment backend {backend!r}; expected one of {self.BACKENDS}")
+
+        logger.info("Initializing Sentiment Analysis pipeline (%s, %s)...", model_name, backend)
+        started = time.perf_counter()
+        self.model_name = model_name
+        self.backend = backend
+        self.classifier = self._build_pipeline(model_name, backend)
+        self.load_seconds = time.perf_counter() - started
+        logger.info("Sentiment Analysis pipeline initialized in %.1fs.", self.load_seconds)
+
+    def _build_pipeline(self, model_name: str, backend: str):
+        from transformers import AutoTokenizer, pipeline
+
+        if backend == "onnx":
+            try:
+                from optimum.onnxruntime import ORTModelForSequenceClassification
+            except ImportError:
+                logger.warning("ONNX Runtime is not available; using the torch-int8 backend instead")
+                self.backend = "torch-int8"
+                return self._build_pipeline(model_name, "torch-int8")
 
-    def analyze_sentiment(self, texts):
+            export_dir = onnx_export(model_name)
+            tokenizer = AutoTokenizer.from_pretrained(export_dir)
+            model = ORTModelForSequenceClassification.from_pretrained(export_dir)
+            return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+        classifier = pipeline("sentiment-analysis", model=model_name)
+        if backend == "torch-int8":
+            import torch
+
+            # Weights of the Linear layers (nearly all of DistilBERT) are
+            # stored as int8; activations are quantized on the fly
+            classifier.model = torch.ao.quantization.quantize_dynamic(
+                classifier.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        return classifier
+
+    def analyze_sentiment(self, texts, batch_size: int = 1):
         """
         Analyzes the sentiment of one or more given texts.
 
         Args:
             texts (str or list[str]): A single string or a list of strings
                                      to be analyzed for sentiment.
+            batch_size (int): Number of texts run through the model together.
 
         Returns:
             list[dict]: A list of dictionaries, where each dictionary contains
@@ -103,17 +136,337 @@ class SentimentAnalyzer:
         """
         if isinstance(texts, str):
             # If a single string is provided, wrap it in a list for consistent processing
-            return self.classifier(texts)
+            return self.classifier([texts], truncation=True)
         elif isinstance(texts, list):
             # If a list of strings is provided, process all of them
-            return self.classifier(texts)
+            return self.classifier(texts, batch_size=batch_size, truncation=True)
         else:
             raise TypeError("Input 'texts' must be a string or a list of strings.")
 
-# instanciate the class
-sentiment_analyzer = SentimentAnalyzer()
 
-# analyze the text sentiment
-text = "I hate humans"
-single_text_result = sentiment_analyzer.analyze_sentiment(text)
-print(single_text_result)
\ No newline at end of file
+def onnx_export(model_name: str, export_root: str = ONNX_EXPORT_DIR) -> Path:
+    """
+    Directory holding the ONNX export of a model, exporting it on first use.
+
+    The export is written to a temporary directory and renamed into place,
+    so workers starting together never load a half-written model; a worker
+    losing the race discards its own copy.
+
+    Args:
+        model_name (str): Hugging Face model to export.
+        export_root (str): Directory of the exported models.
+
+    Returns:
+        Path: Directory to pass to from_pretrained().
+    """
+    export_dir = Path(export_root) / model_name.replace("/", "--")
+    if (export_dir / "model.onnx").exists():
+        return export_dir
+
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer
+
+    logger.info("Exporting %s to ONNX in %s...", model_name, export_dir)
+    export_dir.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f".{export_dir.name}-", dir=export_dir.parent))
+    try:
+        ORTModelForSequenceClassification.from_pretrained(model_name, export=True).save_pretrained(staging)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(staging)
+        try:
+            os.rename(staging, export_dir)
+        except OSError:
+            # Another process finished its export first
+            if not (export_dir / "model.onnx").exists():
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return export_dir
+
+
+def to_review_fields(text: str, result: dict) -> dict:
+    """
+    Map a classifier result onto the Review vibe_score/sentiment/keywords fields.
+
+    The probability of the POSITIVE label becomes a 0-100 vibe score, so a
+    low-confidence prediction lands in the neutral band.
+
+    Args:
+        text (str): The review text that was classified.
+        result (dict): Classifier output with 'label' and 'score'.
+
+    Returns:
+        dict: vibe_score, sentiment, and keywords (as JSON string).
+    """
+    positive_probability = result["score"] if result["label"].upper() == "POSITIVE" else 1.0 - result["score"]
+    vibe_score = round(positive_probability * 100, 2)
+    return {
+        "vibe_score": vibe_score,
+        "sentiment": sentiment_label(vibe_score),
+        "keywords": extract_keywords(text),
+    }
+
+
+class BatchInferenceEngine:
+    """
+    Dynamic batching front-end for a SentimentAnalyzer.
+
+    Callers submit texts from any thread. A single inference thread waits
+    for the first text, keeps collecting until max_batch_size texts are
+    queued or max_latency_ms has passed, then sorts the batch by length and
+    runs it in buckets of at most bucket_size similar-length texts.
+    """
+
+    def __init__(
+        self,
+        analyzer: Optional[SentimentAnalyzer] = None,
+        max_batch_size: int = INFERENCE_MAX_BATCH_SIZE,
+        max_latency_ms: float = INFERENCE_MAX_LATENCY_MS,
+        bucket_size: int = INFERENCE_BUCKET_SIZE,
+        result_timeout: float = INFERENCE_RESULT_TIMEOUT,
+    ):
+        self.analyzer = analyzer or SentimentAnalyzer()
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.bucket_size = bucket_size
+        self.result_timeout = result_timeout
+
+        self._queue: "queue.Queue[Optional[Tuple[str, Future]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="sentiment-inference", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a text for scoring; the future resolves to its review fields.
+        """
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def analyze(self, text: str) -> dict:
+        """
+        Score one text, batched together with concurrent callers.
+
+        Raises:
+            concurrent.futures.TimeoutError: If no result came within result_timeout
+        """
+        return self.submit(text).result(timeout=self.result_timeout)
+
+    def analyze_many(self, texts: List[str]) -> List[dict]:
+        """
+        Score a list of texts, batched together with concurrent callers.
+
+        Raises:
+            concurrent.futures.TimeoutError: If the results took longer than
+                result_timeout
+        """
+        futures = [self.submit(text) for text in texts]
+        deadline = time.monotonic() + self.result_timeout
+        return [future.result(timeout=max(0.0, deadline - time.monotonic())) for future in futures]
+
+    def close(self):
+        """
+        Score whatever is queued, then stop the inference thread.
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+
+            deadline = time.monotonic() + self.max_latency
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                self._infer(batch)
+            except Exception as exc:
+                # Keep the thread serving later batches; fail this one's callers
+                logger.exception("Inference batch of %d texts failed", len(batch))
+                self._fail(batch, exc)
+
+    def _infer(self, batch: List[Tuple[str, Future]]):
+        # Neighbouring texts after sorting have similar lengths, so each
+        # bucket pads to a length close to its own longest text
+        batch.sort(key=lambda item: len(item[0]))
+        for start in range(0, len(batch), self.bucket_size):
+            bucket = batch[start:start + self.bucket_size]
+            texts = [text for text, _ in bucket]
+            try:
+                results = self.analyzer.analyze_sentiment(texts, batch_size=len(texts))
+                for (text, future), result in zip(bucket, results):
+                    future.set_result(to_review_fields(text, result))
+            except Exception as exc:
+                self._fail(bucket, exc)
+            # A short result list would otherwise leave callers waiting
+            self._fail(bucket, RuntimeError("Sentiment model returned no result for the text"))
+
+    @staticmethod
+    def _fail(items: List[Tuple[str, Future]], exc: BaseException):
+        # Resolve every future still pending with exc
+        for _, future in items:
+            if not future.done():
+                future.set_exception(exc)
+
+
+_engine: Optional[BatchInferenceEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> BatchInferenceEngine:
+    """
+    Return this process's inference engine, loading the model on first use.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = BatchInferenceEngine()
+    return _engine
+
+
+def check_backend_parity(backend: str, corpus: Optional[List[str]] = None, reference_backend: str = "torch") -> dict:
+    """
+    Compare a backend's predictions with the reference (fp32) backend.
+
+    Args:
+        backend (str): Backend under test.
+        corpus (list[str]): Review texts to score; defaults to SAMPLE_REVIEWS.
+        reference_backend (str): Backend treated as ground truth.
+
+    Returns:
+        dict: Label agreement, vibe score deltas, load times and the texts
+              whose sentiment label differs.
+    """
+    corpus = corpus or SAMPLE_REVIEWS
+    reference = SentimentAnalyzer(backend=reference_backend)
+    candidate = SentimentAnalyzer(backend=backend)
+
+    expected = [to_review_fields(t, r) for t, r in zip(corpus, reference.analyze_sentiment(corpus, batch_size=len(corpus)))]
+    actual = [to_review_fields(t, r) for t, r in zip(corpus, candidate.analyze_sentiment(corpus, batch_size=len(corpus)))]
+
+    deltas = [abs(e["vibe_score"] - a["vibe_score"]) for e, a in zip(expected, actual)]
+    mismatches = [
+        {"text": text, "expected": e["sentiment"], "actual": a["sentiment"]}
+        for text, e, a in zip(corpus, expected, actual)
+        if e["sentiment"] != a["sentiment"]
+    ]
+    return {
+        "backend": candidate.backend,
+        "reference_backend": reference.backend,
+        "reviews": len(corpus),
+        "label_agreement": 1.0 - len(mismatches) / len(corpus),
+        "max_vibe_score_delta": max(deltas),
+        "mean_vibe_score_delta": sum(deltas) / len(deltas),
+        "load_seconds": {"reference": reference.load_seconds, "candidate": candidate.load_seconds},
+        "mismatches": mismatches,
+    }
+
+
+class _AnalyzeHandler(BaseHTTPRequestHandler):
+    """Serves the DS service protocol: {"reviews": [...]} -> {"results": [...]}."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            reviews = json.loads(self.rfile.read(length))["reviews"]
+            if not isinstance(reviews, list) or not all(isinstance(r, str) for r in reviews):
+                raise ValueError("'reviews' must be a list of strings")
+        except (ValueError, KeyError, TypeError) as exc:
+            self._reply(400, {"detail": str(exc)})
+            return
+        try:
+            results = get_engine().analyze_many(reviews)
+        except Exception as exc:
+            # Answer anyway, or the keep-alive client waits for its read timeout
+            logger.exception("Scoring %d reviews failed", len(reviews))
+            self._reply(500, {"detail": f"Scoring failed: {exc}"})
+            return
+        self._reply(200, {"results": results})
+
+    def _reply(self, status_code: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+SAMPLE_REVIEWS = [
+  "The interface is incredibly intuitive and I love the new dark mode theme.",
+  "I am extremely disappointed with the slow response times of the customer support team.",
+  "The package arrived today at 3:00 PM as scheduled.",
+  "This is the best purchase I have made all year; it exceeded all my expectations!",
+  "I hate how the application crashes every time I try to upload a high-resolution image.",
+  "The weather in London is currently cloudy with a slight chance of rain later today.",
+  "Oh great, another update that breaks more features than it actually fixes.",
+  "The customer service representative was polite, but they ultimately couldn't solve my problem.",
+  "I'm feeling quite indifferent about the new design; it's neither better nor worse than the old one.",
+  "Warning: This product contains chemicals known to cause irritation if handled without gloves.",
+  "The film was a cinematic masterpiece with breathtaking visuals and a gripping storyline.",
+  "I wouldn't recommend this restaurant to my worst enemy; the food was cold and the staff was rude.",
+  "To reset your password, please click the link sent to your registered email address.",
+  "The battery life is decent, but for this price point, I expected it to last much longer.",
+  "Absolutely phenomenal service! I will definitely be coming back again next week."
+]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transformer sentiment analysis")
+    parser.add_argument("--serve", action="store_true", help="Serve the DS service protocol over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--parity", metavar="BACKEND", choices=SentimentAnalyzer.BACKENDS,
+                        help="Check a backend against the fp32 model and exit")
+    parser.add_argument("--min-agreement", type=float, default=1.0,
+                        help="Minimum label agreement for --parity to pass")
+    parser.add_argument("--max-delta", type=float, default=5.0,
+                        help="Maximum vibe score difference for --parity to pass")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.parity:
+        report = check_backend_parity(args.parity)
+        print(json.dumps(report, indent=2))
+        passed = (
+            report["label_agreement"] >= args.min_agreement
+            and report["max_vibe_score_delta"] <= args.max_delta
+        )
+        raise SystemExit(0 if passed else 1)
+
+    engine = get_engine()
+
+    if args.serve:
+        server = ThreadingHTTPServer((args.host, args.port), _AnalyzeHandler)
+        print(f"Serving sentiment analysis on http://{args.host}:{args.port}/analyze")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            engine.close()
+    else:
+        for review, fields in zip(SAMPLE_REVIEWS, engine.analyze_many(SAMPLE_REVIEWS)):
+            print(fields["vibe_score"], fields["sentiment"], review)
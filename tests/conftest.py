@@ -0,0 +1,102 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# The app reads its settings at import time, so point it at a scratch
+# database before anything from app/ is imported
+_database_dir = tempfile.mkdtemp(prefix="vibecheck-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_database_dir}/test.db"
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+# Every request takes the full path instead of a cached body
+os.environ["RESPONSE_CACHE_SIZE"] = "0"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(scope="session")
+def seeded_business():
+    """
+    One business with 60 scored reviews; returns its ID.
+    """
+    from alembic import command
+    from alembic.config import Config
+    from app.database import SessionLocal
+    from app.models import Business, Review, User
+
+    # Migrate rather than create_all, so the FTS5 indexes and triggers exist
+    command.upgrade(Config(str(Path(__file__).resolve().parent.parent / "alembic.ini")), "head")
+    db = SessionLocal()
+    try:
+        user = User(username="reader", email="reader@example.com", hashed_password="x$y")
+        business = Business(name="Blue Bottle Coffee", category="cafe", location="Oakland")
+        db.add_all([user, business])
+        db.flush()
+        db.add_all([
+            Review(
+                user_id=user.id,
+                business_id=business.id,
+                content=f"Great coffee, visit {number}",
+                vibe_score=80.0,
+                sentiment="positive",
+            )
+            for number in range(60)
+        ])
+        db.commit()
+        return business.id
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="session")
+def client(seeded_business):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    """
+    Bearer token header of a freshly registered user.
+    """
+    credentials = {"username": "writer", "password": "writer-password"}
+    client.post("/register", json=dict(credentials, email="writer@example.com"))
+    token = client.post("/login", json=credentials).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def make_business(seeded_business):
+    """
+    Factory adding a business with the given reviews; returns its ID.
+
+    Extra keyword arguments set Business columns. Each review is a dict of
+    Review columns; content and the seeded user are filled in when missing.
+    """
+    from app.database import SessionLocal
+    from app.models import Business, Review, User
+
+    def make(name="Corner Bakery", category="bakery", reviews=(), **columns):
+        db = SessionLocal()
+        try:
+            user_id = db.query(User.id).filter(User.username == "reader").scalar()
+            business = Business(name=name, category=category, location="Berkeley", **columns)
+            db.add(business)
+            db.flush()
+            db.add_all([
+                Review(
+                    **{"user_id": user_id, "content": f"Review number {index}", **review},
+                    business_id=business.id,
+                )
+                for index, review in enumerate(reviews)
+            ])
+            db.commit()
+            return business.id
+        finally:
+            db.close()
+
+    return make
@@ -0,0 +1,30 @@
+import pytest
+
+from sentimetal_analysis import SAMPLE_REVIEWS, check_backend_parity
+
+# Minimum share of SAMPLE_REVIEWS labelled as by the fp32 model, and the
+# largest vibe score (0-100) difference allowed on any one review. Dynamic
+# int8 quantization moves scores a little; the ONNX export runs the same
+# fp32 weights and may only differ by rounding.
+PARITY_THRESHOLDS = {
+    "torch-int8": (0.9, 10.0),
+    "onnx": (1.0, 1.0),
+}
+
+BACKEND_MODULES = {
+    "torch-int8": ("torch", "transformers"),
+    "onnx": ("torch", "transformers", "onnxruntime", "optimum.onnxruntime"),
+}
+
+
+@pytest.mark.parametrize("backend", sorted(PARITY_THRESHOLDS))
+def test_backend_matches_fp32_on_sample_reviews(backend):
+    for module in BACKEND_MODULES[backend]:
+        pytest.importorskip(module)
+    min_label_agreement, max_vibe_score_delta = PARITY_THRESHOLDS[backend]
+
+    report = check_backend_parity(backend, SAMPLE_REVIEWS)
+
+    assert report["reviews"] == len(SAMPLE_REVIEWS)
+    assert report["label_agreement"] >= min_label_agreement, report["mismatches"]
+    assert report["max_vibe_score_delta"] <= max_vibe_score_delta
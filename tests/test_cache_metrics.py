@@ -0,0 +1,45 @@
+import re
+
+from app.metrics import render_metrics
+
+
+def _sample(name, cache):
+    match = re.search(rf'^{name}{{cache="{cache}"}} (\S+)$', render_metrics(), re.MULTILINE)
+    assert match, f"{name} for {cache} missing from /metrics"
+    return float(match.group(1))
+
+
+def test_score_cache_counters_are_exported():
+    from app.scoring import score_review
+
+    score_review("The croissants here are flaky and warm")
+    hits = _sample("vibecheck_cache_hits_total", "scores")
+    misses = _sample("vibecheck_cache_misses_total", "scores")
+
+    score_review("The croissants here are flaky and warm")
+
+    assert _sample("vibecheck_cache_hits_total", "scores") == hits + 1
+    assert _sample("vibecheck_cache_misses_total", "scores") == misses
+    assert _sample("vibecheck_cache_entries", "scores") >= 1
+
+
+
+def test_auth_cache_counters_are_exported(client, auth_headers):
+    review = {"content": "Lovely spot for a quiet coffee"}
+
+    # The token is verified once; the repeat is answered from the cache
+    client.post("/businesses/999999/reviews", json=review, headers=auth_headers)
+    hits = _sample("vibecheck_cache_hits_total", "auth_tokens")
+    response = client.post("/businesses/999999/reviews", json=review, headers=auth_headers)
+
+    assert response.status_code == 404
+    assert _sample("vibecheck_cache_hits_total", "auth_tokens") == hits + 1
+    _sample("vibecheck_cache_misses_total", "auth_users")
+
+
+def test_response_cache_counters_are_exported(client):
+    misses = _sample("vibecheck_cache_misses_total", "responses")
+    client.get("/businesses")
+
+    # The tests run with the body cache disabled, so every build is a miss
+    assert _sample("vibecheck_cache_misses_total", "responses") == misses + 1
@@ -0,0 +1,45 @@
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/businesses/{id}", "/businesses/{id}/reviews"])
+def test_matching_if_none_match_answers_304(client, make_business, path):
+    url = path.format(id=make_business(reviews=[{"vibe_score": 70.0, "sentiment": "positive"}]))
+    first = client.get(url)
+    etag = first.headers["ETag"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+
+def test_stale_if_none_match_gets_the_full_body(client, make_business):
+    url = f"/businesses/{make_business()}"
+
+    response = client.get(url, headers={"If-None-Match": '"not-the-current-etag"'})
+
+    assert response.status_code == 200
+    assert response.json()["name"] == "Corner Bakery"
+
+
+def test_review_write_changes_the_etags(client, make_business, auth_headers):
+    business_id = make_business()
+    detail_etag = client.get(f"/businesses/{business_id}").headers["ETag"]
+    reviews_etag = client.get(f"/businesses/{business_id}/reviews").headers["ETag"]
+
+    created = client.post(
+        f"/businesses/{business_id}/reviews",
+        json={"content": "Fresh sourdough and friendly staff"},
+        headers=auth_headers,
+    )
+    assert created.status_code == 201
+
+    detail = client.get(f"/businesses/{business_id}", headers={"If-None-Match": detail_etag})
+    reviews = client.get(f"/businesses/{business_id}/reviews", headers={"If-None-Match": reviews_etag})
+
+    assert detail.status_code == 200
+    assert detail.json()["total_reviews"] == 1
+    assert detail.headers["ETag"] != detail_etag
+    assert reviews.status_code == 200
+    assert [review["id"] for review in reviews.json()] == [created.json()["id"]]
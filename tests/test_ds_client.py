@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.ds_client import CircuitBreaker, DSServiceClient
+from app.utils import lexicon_scorer
+
+
+class _StubService:
+    """
+    Local DS service stub recording each POSTed batch.
+
+    status is the HTTP status answered and delay the seconds slept first.
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.status = 200
+        self.delay = 0.0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.batches.append(body["reviews"])
+                time.sleep(stub.delay)
+                payload = json.dumps({
+                    "results": [{"vibe_score": 75.0, "sentiment": "positive"} for _ in body["reviews"]]
+                }).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.endpoint = f"http://127.0.0.1:{self.server.server_address[1]}/analyze"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    service = _StubService()
+    yield service
+    service.close()
+
+
+def _client(stub, **options):
+    options.setdefault("circuit_breaker", CircuitBreaker(failure_threshold=2, reset_timeout=0.2))
+    return DSServiceClient(endpoint=stub.endpoint, model_version="test", **options)
+
+
+def test_concurrent_reviews_are_coalesced_into_one_post(stub):
+    client = _client(stub, batch_window_ms=200)
+    results = [None] * 5
+
+    def score(index):
+        results[index] = client.score(f"review number {index}")
+
+    threads = [threading.Thread(target=score, args=(index,)) for index in range(5)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        client.close()
+
+    assert len(stub.batches) == 1
+    assert sorted(stub.batches[0]) == [f"review number {index}" for index in range(5)]
+    assert all(result["scorer_version"] == "ds-test" for result in results)
+
+
+def test_slow_batch_falls_back_to_the_lexicon_scorer(stub):
+    stub.delay = 1.0
+    client = _client(stub, read_timeout=5, result_timeout=0.2)
+    try:
+        started = time.monotonic()
+        result = client.score("The staff were lovely")
+        elapsed = time.monotonic() - started
+    finally:
+        client.close()
+
+    assert result["scorer_version"] == lexicon_scorer.version
+    assert elapsed < 1.0
+
+
+def test_breaker_opens_then_lets_one_trial_through(stub):
+    stub.status = 500
+    client = _client(stub)
+    try:
+        client.score_many(["first"])
+        client.score_many(["second"])
+        assert client.circuit_breaker.state == CircuitBreaker.OPEN
+
+        # Refused without a call while open
+        assert client.score("third")["scorer_version"] == lexicon_scorer.version
+        assert len(stub.batches) == 2
+
+        # After reset_timeout one trial goes out; its success closes the circuit
+        time.sleep(0.25)
+        stub.status = 200
+        assert client.score_many(["fourth"])[0]["scorer_version"] == "ds-test"
+        assert len(stub.batches) == 3
+        assert client.circuit_breaker.state == CircuitBreaker.CLOSED
+    finally:
+        client.close()
+
+
+def test_any_failed_trial_reopens_the_breaker(stub, monkeypatch):
+    client = _client(stub)
+    breaker = client.circuit_breaker
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.25)
+
+    def broken_post(review_contents):
+        raise RuntimeError("unexpected")
+
+    monkeypatch.setattr(client, "_post", broken_post)
+    try:
+        result = client.score_many(["trial"])[0]
+    finally:
+        client.close()
+
+    assert result["scorer_version"] == lexicon_scorer.version
+    assert breaker.state == CircuitBreaker.OPEN
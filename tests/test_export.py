@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta, timezone
+
+from app.database import SessionLocal
+from app.export import review_export_statement
+
+
+def _exported_ids(business_id, **window):
+    db = SessionLocal()
+    try:
+        return [row.id for row in db.execute(review_export_statement(business_id, **window))]
+    finally:
+        db.close()
+
+
+def test_export_window_honours_utc_offsets(make_business):
+    # Stored as naive UTC: 2025-12-31 23:30 and 2026-01-01 00:30
+    business_id = make_business(reviews=[
+        {"created_at": datetime(2025, 12, 31, 23, 30)},
+        {"created_at": datetime(2026, 1, 1, 0, 30)},
+    ])
+    first_id, second_id = _exported_ids(business_id)
+    plus_two = timezone(timedelta(hours=2))
+
+    # 01:00+02:00 is 23:00 UTC the day before, so both reviews are inside
+    since = datetime(2026, 1, 1, 1, 0, tzinfo=plus_two)
+    assert len(_exported_ids(business_id, since=since)) == 2
+
+    # 02:00+02:00 is midnight UTC: only the first review is before it
+    until = datetime(2026, 1, 1, 2, 0, tzinfo=plus_two)
+    assert _exported_ids(business_id, until=until) == [first_id]
+    assert _exported_ids(business_id, since=until) == [second_id]
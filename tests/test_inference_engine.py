@@ -0,0 +1,61 @@
+import pytest
+
+from sentimetal_analysis import BatchInferenceEngine
+
+
+class _StubAnalyzer:
+    """Positive for every text; raises for texts containing "boom"."""
+
+    def analyze_sentiment(self, texts, batch_size=1):
+        if any("boom" in text for text in texts):
+            raise ValueError("model failed")
+        return [{"label": "POSITIVE", "score": 0.9} for _ in texts]
+
+
+class _ShortAnalyzer:
+    """Drops the last result of every batch."""
+
+    def analyze_sentiment(self, texts, batch_size=1):
+        return [{"label": "POSITIVE", "score": 0.9} for _ in texts[:-1]]
+
+
+def _engine(analyzer, **options):
+    options.setdefault("max_latency_ms", 20)
+    options.setdefault("result_timeout", 5)
+    return BatchInferenceEngine(analyzer=analyzer, **options)
+
+
+def test_failed_bucket_fails_its_callers_and_keeps_serving():
+    engine = _engine(_StubAnalyzer(), bucket_size=2)
+    try:
+        with pytest.raises(ValueError):
+            engine.analyze_many(["boom", "fine text", "another fine text"])
+        assert engine.analyze("a great place")["vibe_score"] == 90.0
+    finally:
+        engine.close()
+
+
+def test_post_processing_failure_does_not_hang_callers(monkeypatch):
+    import sentimetal_analysis
+
+    def broken_fields(text, result):
+        raise KeyError("label")
+
+    engine = _engine(_StubAnalyzer())
+    try:
+        monkeypatch.setattr(sentimetal_analysis, "to_review_fields", broken_fields)
+        with pytest.raises(KeyError):
+            engine.analyze_many(["one", "two"])
+        monkeypatch.undo()
+        assert engine.analyze("three")["sentiment"] == "positive"
+    finally:
+        engine.close()
+
+
+def test_missing_result_fails_the_caller():
+    engine = _engine(_ShortAnalyzer())
+    try:
+        with pytest.raises(RuntimeError):
+            engine.analyze_many(["one", "two"])
+    finally:
+        engine.close()
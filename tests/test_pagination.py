@@ -0,0 +1,112 @@
+import itertools
+from datetime import datetime
+
+import pytest
+
+_categories = (f"taqueria-{number}" for number in itertools.count())
+
+
+def _walk(client, url, params):
+    """
+    Follow X-Next-Cursor to the last page; returns the IDs of every page.
+    """
+    pages = []
+    params = dict(params)
+    while True:
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        pages.append([item["id"] for item in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+        params["cursor"] = cursor
+
+
+@pytest.fixture
+def tied_businesses(make_business):
+    """
+    Seven businesses of a new category: two distinct scores, the rest tied.
+
+    Returns the category and the business IDs.
+    """
+    category = next(_categories)
+    scores = [90.0, 75.0, 75.0, 75.0, 75.0, 40.0, 40.0]
+    return category, [
+        make_business(
+            name=f"Taqueria {index}", category=category,
+            aggregated_vibe_score=score, total_reviews=3,
+            created_at=datetime(2026, 5, 1, 12, 0),
+        )
+        for index, score in enumerate(scores)
+    ]
+
+
+@pytest.mark.parametrize("sort", ["id", "score", "reviews", "recent"])
+def test_business_pages_neither_skip_nor_repeat(client, tied_businesses, sort):
+    category, business_ids = tied_businesses
+    pages = _walk(client, "/businesses", {"category": category, "sort": sort, "limit": 2})
+    ids = [business_id for page in pages for business_id in page]
+
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert sorted(ids) == sorted(business_ids)
+    if sort == "id":
+        assert ids == sorted(business_ids)
+
+
+def test_business_score_sort_breaks_ties_by_id(client, tied_businesses):
+    category, business_ids = tied_businesses
+    pages = _walk(client, "/businesses", {"category": category, "sort": "score", "limit": 3})
+    ids = [business_id for page in pages for business_id in page]
+
+    first, tied, low = business_ids[0], business_ids[1:5], business_ids[5:]
+    assert ids == [first] + sorted(tied, reverse=True) + sorted(low, reverse=True)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WzFd", "WyJ4IiwgMV0"])
+def test_malformed_business_cursor_is_rejected(client, cursor):
+    response = client.get("/businesses", params={"sort": "score", "cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid pagination cursor"
+
+
+def test_review_pages_neither_skip_nor_repeat(client, make_business):
+    # Three reviews share each timestamp, so the id breaks every tie
+    reviews = [
+        {"created_at": datetime(2026, 6, day, 9, 30), "vibe_score": 60.0, "sentiment": "positive"}
+        for day in (1, 2, 3)
+        for _ in range(3)
+    ]
+    business_id = make_business(reviews=reviews)
+    newest_first = client.get(f"/businesses/{business_id}/reviews", params={"limit": 200}).json()
+
+    pages = _walk(client, f"/businesses/{business_id}/reviews", {"limit": 4})
+    ids = [review_id for page in pages for review_id in page]
+
+    assert [len(page) for page in pages] == [4, 4, 1]
+    assert ids == [review["id"] for review in newest_first]
+    assert len(set(ids)) == len(reviews)
+    assert [review["created_at"] for review in newest_first] == sorted(
+        (review["created_at"] for review in newest_first), reverse=True
+    )
+
+
+def test_review_sentiment_filter_pages(client, make_business):
+    business_id = make_business(reviews=[
+        {"vibe_score": 20.0 if index % 2 else 80.0, "sentiment": "negative" if index % 2 else "positive"}
+        for index in range(7)
+    ])
+
+    pages = _walk(
+        client, f"/businesses/{business_id}/reviews", {"sentiment": "negative", "limit": 2}
+    )
+
+    assert [len(page) for page in pages] == [2, 1]
+
+
+@pytest.mark.parametrize("cursor", ["%%%", "WzFd", "WyJub3QtYS1kYXRlIiwgMV0"])
+def test_malformed_review_cursor_is_rejected(client, seeded_business, cursor):
+    response = client.get(f"/businesses/{seeded_business}/reviews", params={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid pagination cursor"
@@ -0,0 +1,46 @@
+import threading
+import time
+
+from app.pipeline import ReviewScoringPipeline
+
+
+class _FlakyPipeline(ReviewScoringPipeline):
+    """Fails the first `failures` batches, then records the ones it gets."""
+
+    def __init__(self, failures, **options):
+        super().__init__(workers=1, batch_wait_ms=1, retry_backoff_ms=10, **options)
+        self.failures = failures
+        self.calls = []
+        self.succeeded = threading.Event()
+
+    def process_batch(self, review_ids):
+        self.calls.append(list(review_ids))
+        if len(self.calls) <= self.failures:
+            raise RuntimeError("database is locked")
+        self.succeeded.set()
+
+
+def test_failed_batch_is_retried_with_backoff(seeded_business):
+    pipeline = _FlakyPipeline(failures=2, max_retries=3)
+    pipeline.start()
+    try:
+        pipeline.submit(101)
+        assert pipeline.succeeded.wait(timeout=5)
+    finally:
+        pipeline.stop()
+
+    assert pipeline.calls == [[101], [101], [101]]
+
+
+def test_retries_are_bounded(seeded_business):
+    pipeline = _FlakyPipeline(failures=10, max_retries=2)
+    pipeline.start()
+    try:
+        pipeline.submit(102)
+        # First attempt and two retries, 10 ms then 20 ms apart
+        time.sleep(0.3)
+    finally:
+        pipeline.stop()
+
+    assert pipeline.calls == [[102], [102], [102]]
+    assert not pipeline.succeeded.is_set()
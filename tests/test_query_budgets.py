@@ -0,0 +1,44 @@
+import pytest
+
+from app.diagnostics import assert_max_queries
+
+
+@pytest.mark.parametrize("limit", [5, 50])
+def test_business_reviews_page_query_budget(client, seeded_business, limit):
+    # Business version for the ETag, then the page itself
+    with assert_max_queries(2, n_plus_one_threshold=2):
+        response = client.get(f"/businesses/{seeded_business}/reviews", params={"limit": limit})
+
+    assert response.status_code == 200
+    assert len(response.json()) == limit
+
+
+def test_business_reviews_next_page_query_budget(client, seeded_business):
+    first = client.get(f"/businesses/{seeded_business}/reviews", params={"limit": 5})
+    cursor = first.headers["X-Next-Cursor"]
+
+    with assert_max_queries(2, n_plus_one_threshold=2):
+        response = client.get(
+            f"/businesses/{seeded_business}/reviews", params={"limit": 5, "cursor": cursor}
+        )
+
+    assert response.status_code == 200
+    assert {review["id"] for review in response.json()}.isdisjoint(
+        review["id"] for review in first.json()
+    )
+
+
+def test_business_listing_query_budget(client, seeded_business):
+    # The page rows also give the versions for the ETag
+    with assert_max_queries(1):
+        response = client.get("/businesses", params={"limit": 10, "category": "cafe"})
+
+    assert response.status_code == 200
+    assert [business["id"] for business in response.json()] == [seeded_business]
+
+
+def test_missing_business_query_budget(client):
+    with assert_max_queries(1):
+        response = client.get("/businesses/999999/reviews")
+
+    assert response.status_code == 404
@@ -0,0 +1,113 @@
+import pytest
+
+
+def _search_ids(client, path, **params):
+    response = client.get(path, params=params)
+    assert response.status_code == 200
+    return [hit["id"] for hit in response.json()]
+
+
+def _update(model, row_id, **values):
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        db.query(model).filter(model.id == row_id).update(values)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_business_name_matches_outrank_category_matches(client, make_business):
+    by_category = make_business(name="Morning Rituals", category="zanzibarian")
+    by_name = make_business(name="Zanzibarian Kitchen", category="restaurant")
+
+    assert _search_ids(client, "/search/businesses", q="zanzibarian") == [by_name, by_category]
+
+
+def test_review_hits_are_ranked_by_relevance(client, make_business):
+    business_id = make_business(reviews=[
+        {"content": "A quiet room with good light and a long list of teas, plus one cortado"},
+        {"content": "Cortado, cortado, cortado: the best cortado in town"},
+    ])
+
+    hits = client.get("/search/reviews", params={"q": "cortado", "business_id": business_id}).json()
+
+    assert [hit["content"].startswith("Cortado") for hit in hits] == [True, False]
+    assert hits[0]["rank"] <= hits[1]["rank"]
+
+
+def test_prefix_query_matches_longer_words(client, make_business):
+    business_id = make_business(reviews=[{"content": "Their pistachio croissant is unreal"}])
+
+    assert len(_search_ids(client, "/search/reviews", q="pistach*", business_id=business_id)) == 1
+    assert _search_ids(client, "/search/reviews", q="pistach", business_id=business_id) == []
+
+
+def test_snippet_is_escaped_and_marks_matches(client, make_business):
+    business_id = make_business(reviews=[{"content": "<b>Shakshuka</b> & strong coffee, lovely"}])
+
+    hit, = client.get("/search/reviews", params={"q": "shakshuka", "business_id": business_id}).json()
+
+    assert "<mark>Shakshuka</mark>" in hit["snippet"]
+    assert "&lt;b&gt;" in hit["snippet"]
+    assert "&amp;" in hit["snippet"]
+
+
+def test_search_pages_cover_every_hit_once(client, make_business):
+    business_id = make_business(reviews=[
+        {"content": f"Gelato flavour number {index} was great"} for index in range(25)
+    ])
+
+    ids = []
+    params = {"q": "gelato", "business_id": business_id, "limit": 10}
+    while True:
+        response = client.get("/search/reviews", params=params)
+        ids.extend(hit["id"] for hit in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params["cursor"] = cursor
+
+    assert len(ids) == len(set(ids)) == 25
+
+
+@pytest.mark.parametrize("params", [{"q": "!!! ???"}, {"q": "coffee", "cursor": "bogus"}])
+def test_bad_search_requests_answer_400(client, params):
+    assert client.get("/search/reviews", params=params).status_code == 400
+
+
+def test_index_follows_review_edits_and_deletes(client, make_business):
+    from app.database import SessionLocal
+    from app.models import Review
+
+    business_id = make_business(reviews=[{"content": "The baklava was soaked in honey"}])
+    review_id, = _search_ids(client, "/search/reviews", q="baklava", business_id=business_id)
+
+    _update(Review, review_id, content="The kunafa was soaked in honey")
+    assert _search_ids(client, "/search/reviews", q="baklava", business_id=business_id) == []
+    assert _search_ids(client, "/search/reviews", q="kunafa", business_id=business_id) == [review_id]
+
+    # Score updates leave the indexed text alone
+    _update(Review, review_id, vibe_score=95.0, sentiment="positive")
+    assert _search_ids(client, "/search/reviews", q="kunafa", business_id=business_id) == [review_id]
+
+    db = SessionLocal()
+    try:
+        db.query(Review).filter(Review.id == review_id).delete()
+        db.commit()
+    finally:
+        db.close()
+    assert _search_ids(client, "/search/reviews", q="kunafa", business_id=business_id) == []
+
+
+def test_index_follows_business_renames(client, make_business):
+    from app.models import Business
+
+    business_id = make_business(name="Quokka Cafe")
+    assert _search_ids(client, "/search/businesses", q="quokka") == [business_id]
+
+    _update(Business, business_id, name="Wombat Cafe")
+
+    assert _search_ids(client, "/search/businesses", q="quokka") == []
+    assert _search_ids(client, "/search/businesses", q="wombat") == [business_id]